@@ -0,0 +1,54 @@
+"""add jsonb gin indexes on recording and session metadata
+
+Revision ID: 2026_10_17_0100
+Revises: 2025_11_13_0100
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_0100'
+down_revision = '2025_11_13_0100'
+branch_labels = None
+depends_on = None
+
+# (table, column, index name)
+GIN_INDEXES = [
+    ('recordings', 'extra_metadata', 'idx_recordings_metadata_gin'),
+    ('terminal_sessions', 'environment_variables', 'idx_terminal_sessions_env_gin'),
+    ('terminal_sessions', 'extra_metadata', 'idx_terminal_sessions_metadata_gin'),
+]
+
+
+def upgrade():
+    # JSONB and GIN indexes only exist on PostgreSQL; SQLite keeps generic JSON
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, column, index_name in GIN_INDEXES:
+        op.alter_column(
+            table, column,
+            type_=postgresql.JSONB(),
+            postgresql_using=f'{column}::jsonb'
+        )
+        op.create_index(
+            index_name, table, [column],
+            postgresql_using='gin',
+            postgresql_ops={column: 'jsonb_path_ops'}
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, column, index_name in GIN_INDEXES:
+        op.drop_index(index_name, table_name=table)
+        op.alter_column(
+            table, column,
+            type_=sa.JSON(),
+            postgresql_using=f'{column}::json'
+        )
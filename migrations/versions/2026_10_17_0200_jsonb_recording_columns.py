@@ -0,0 +1,48 @@
+"""store recording and session json columns as jsonb
+
+Revision ID: 2026_10_17_0200
+Revises: 2026_10_17_0100
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_0200'
+down_revision = '2026_10_17_0100'
+branch_labels = None
+depends_on = None
+
+JSONB_COLUMNS = {
+    'recordings': ['events', 'checkpoints', 'terminal_size', 'export_formats'],
+    'terminal_sessions': ['terminal_size'],
+}
+
+
+def upgrade():
+    # SQLite has no binary JSON type; the generic JSON columns stay as they are
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, columns in JSONB_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table, column,
+                type_=postgresql.JSONB(),
+                postgresql_using=f'{column}::jsonb'
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, columns in JSONB_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table, column,
+                type_=sa.JSON(),
+                postgresql_using=f'{column}::json'
+            )
@@ -0,0 +1,23 @@
+"""add recordings end_time index for retention cleanup
+
+Revision ID: 2026_10_17_0300
+Revises: 2026_10_17_0200
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_0300'
+down_revision = '2026_10_17_0200'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_recordings_end_time', 'recordings', ['end_time'])
+
+
+def downgrade():
+    op.drop_index('idx_recordings_end_time', table_name='recordings')
@@ -0,0 +1,39 @@
+"""store recordings.recording_id as native uuid
+
+Revision ID: 2026_10_17_0400
+Revises: 2026_10_17_0300
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_0400'
+down_revision = '2026_10_17_0300'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite has no uuid type; the column stays VARCHAR(36)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.alter_column(
+        'recordings', 'recording_id',
+        type_=postgresql.UUID(as_uuid=False),
+        postgresql_using='recording_id::uuid'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.alter_column(
+        'recordings', 'recording_id',
+        type_=sa.String(36),
+        postgresql_using='recording_id::text'
+    )
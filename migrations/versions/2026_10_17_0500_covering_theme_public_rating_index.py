@@ -0,0 +1,45 @@
+"""make the public theme rating index a covering partial index
+
+Revision ID: 2026_10_17_0500
+Revises: 2026_10_17_0400
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_0500'
+down_revision = '2026_10_17_0400'
+branch_labels = None
+depends_on = None
+
+INCLUDED_COLUMNS = ['name', 'author', 'download_count', 'created_at']
+
+
+def upgrade():
+    # INCLUDE and partial index predicates are PostgreSQL features; other
+    # databases keep the plain (is_public, rating) index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('idx_theme_configs_public_rating', table_name='theme_configurations')
+    op.create_index(
+        'idx_theme_configs_public_rating',
+        'theme_configurations',
+        ['is_public', 'rating'],
+        postgresql_include=INCLUDED_COLUMNS,
+        postgresql_where=sa.text('is_public = true')
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('idx_theme_configs_public_rating', table_name='theme_configurations')
+    op.create_index(
+        'idx_theme_configs_public_rating',
+        'theme_configurations',
+        ['is_public', 'rating']
+    )
@@ -0,0 +1,49 @@
+"""store theme json columns as jsonb and index animations
+
+Revision ID: 2026_10_17_0600
+Revises: 2026_10_17_0500
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_0600'
+down_revision = '2026_10_17_0500'
+branch_labels = None
+depends_on = None
+
+JSONB_COLUMNS = ['colors', 'fonts', 'animations', 'cursor', 'background', 'extra_metadata']
+
+
+def upgrade():
+    # JSONB and GIN indexes only exist on PostgreSQL; SQLite keeps generic JSON
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for column in JSONB_COLUMNS:
+        op.alter_column(
+            'theme_configurations', column,
+            type_=postgresql.JSONB(),
+            postgresql_using=f'{column}::jsonb'
+        )
+    op.create_index(
+        'idx_theme_configs_animations_gin', 'theme_configurations', ['animations'],
+        postgresql_using='gin',
+        postgresql_ops={'animations': 'jsonb_path_ops'}
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('idx_theme_configs_animations_gin', table_name='theme_configurations')
+    for column in JSONB_COLUMNS:
+        op.alter_column(
+            'theme_configurations', column,
+            type_=sa.JSON(),
+            postgresql_using=f'{column}::json'
+        )
@@ -0,0 +1,64 @@
+"""add stored scheme_type column to theme configurations
+
+Revision ID: 2026_10_17_0700
+Revises: 2026_10_17_0600
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_0700'
+down_revision = '2026_10_17_0600'
+branch_labels = None
+depends_on = None
+
+
+def _scheme_type(bg_color):
+    """Classify a background color the same way the model does."""
+    if isinstance(bg_color, str) and bg_color.startswith('#'):
+        hex_color = bg_color.lstrip('#')
+        if len(hex_color) == 3:
+            hex_color = ''.join([c * 2 for c in hex_color])
+        try:
+            r = int(hex_color[0:2], 16)
+            g = int(hex_color[2:4], 16)
+            b = int(hex_color[4:6], 16)
+        except ValueError:
+            return 'dark'
+        luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
+        return 'light' if luminance > 0.5 else 'dark'
+    return 'dark'
+
+
+def upgrade():
+    op.add_column(
+        'theme_configurations',
+        sa.Column('scheme_type', sa.String(5), nullable=False, server_default='dark',
+                  comment='Light or dark scheme derived from the background color')
+    )
+
+    # Backfill light themes from their stored background colors
+    themes = sa.table(
+        'theme_configurations',
+        sa.column('theme_id', sa.String),
+        sa.column('colors', sa.JSON),
+        sa.column('scheme_type', sa.String),
+    )
+    bind = op.get_bind()
+    light_ids = [
+        theme_id
+        for theme_id, colors in bind.execute(sa.select(themes.c.theme_id, themes.c.colors))
+        if _scheme_type((colors or {}).get('background', '#000000')) == 'light'
+    ]
+    if light_ids:
+        bind.execute(
+            themes.update()
+            .where(themes.c.theme_id.in_(light_ids))
+            .values(scheme_type='light')
+        )
+
+
+def downgrade():
+    op.drop_column('theme_configurations', 'scheme_type')
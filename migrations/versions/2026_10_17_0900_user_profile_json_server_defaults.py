@@ -0,0 +1,54 @@
+"""fill user profile json settings from server-side defaults
+
+Revision ID: 2026_10_17_0900
+Revises: 2026_10_17_0800
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_0900'
+down_revision = '2026_10_17_0800'
+branch_labels = None
+depends_on = None
+
+# Column -> default JSON document for new profiles
+JSON_DEFAULTS = {
+    'preferences': '{"terminal": {"fontSize": 14, "fontFamily": "monospace", "cursorStyle": "block", "scrollback": 1000, "bellStyle": "sound"}, "animations": {"enabled": true, "reducedMotion": false}, "media": {"autoLoadImages": true, "maxVideoSize": "50MB", "imageScaling": "fit"}, "recordings": {"autoRecord": false, "maxDuration": 3600, "compressionLevel": 5}}',
+    'keyboard_shortcuts': '{"copy": "Ctrl+C", "paste": "Ctrl+V", "clear": "Ctrl+L", "newTab": "Ctrl+T", "closeTab": "Ctrl+W", "search": "Ctrl+F"}',
+    'ai_settings': '{"enabled": true, "provider": "openai", "model": "gpt-4", "voiceEnabled": true, "voiceLanguage": "en-US", "autoSuggestions": true, "contextSharing": "full", "responseFormat": "text"}',
+    'recording_settings': '{"defaultEnabled": false, "maxDuration": 3600, "compressionLevel": 5, "retentionDays": 30, "autoDelete": true}',
+    'privacy_settings': '{"shareUsageData": false, "allowAnalytics": false, "sessionTracking": "minimal", "dataRetention": 30, "exportData": true}',
+    'extra_metadata': '{}',
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for column in JSON_DEFAULTS:
+            op.alter_column(
+                'user_profiles', column,
+                type_=postgresql.JSONB(),
+                postgresql_using=f'{column}::jsonb'
+            )
+
+    with op.batch_alter_table('user_profiles', schema=None) as batch_op:
+        for column, default in JSON_DEFAULTS.items():
+            batch_op.alter_column(column, server_default=sa.text(f"'{default}'"))
+
+
+def downgrade():
+    with op.batch_alter_table('user_profiles', schema=None) as batch_op:
+        for column in JSON_DEFAULTS:
+            batch_op.alter_column(column, server_default=None)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        for column in JSON_DEFAULTS:
+            op.alter_column(
+                'user_profiles', column,
+                type_=sa.JSON(),
+                postgresql_using=f'{column}::json'
+            )
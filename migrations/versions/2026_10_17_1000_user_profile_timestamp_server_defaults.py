@@ -0,0 +1,27 @@
+"""use database-generated timestamps for user profiles
+
+Revision ID: 2026_10_17_1000
+Revises: 2026_10_17_0900
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_1000'
+down_revision = '2026_10_17_0900'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_profiles', schema=None) as batch_op:
+        batch_op.alter_column('created_at', server_default=sa.func.now())
+        batch_op.alter_column('last_login_at', server_default=sa.func.now())
+
+
+def downgrade():
+    with op.batch_alter_table('user_profiles', schema=None) as batch_op:
+        batch_op.alter_column('created_at', server_default=None)
+        batch_op.alter_column('last_login_at', server_default=None)
@@ -0,0 +1,35 @@
+"""add indexes for listing active user profiles by last login
+
+Revision ID: 2026_10_17_1100
+Revises: 2026_10_17_1000
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_1100'
+down_revision = '2026_10_17_1000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'idx_user_profiles_active_login', 'user_profiles', ['is_active', 'last_login_at']
+    )
+
+    # Partial indexes are only created on PostgreSQL
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index(
+            'idx_user_profiles_active_partial', 'user_profiles', ['last_login_at'],
+            postgresql_where=sa.text('is_active')
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('idx_user_profiles_active_partial', table_name='user_profiles')
+
+    op.drop_index('idx_user_profiles_active_login', table_name='user_profiles')
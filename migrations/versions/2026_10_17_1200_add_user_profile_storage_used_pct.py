@@ -0,0 +1,38 @@
+"""add database-maintained storage usage percentage to user profiles
+
+Revision ID: 2026_10_17_1200
+Revises: 2026_10_17_1100
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_1200'
+down_revision = '2026_10_17_1100'
+branch_labels = None
+depends_on = None
+
+STORAGE_USED_PCT = (
+    "CASE WHEN storage_quota = 0 THEN 0.0 "
+    "ELSE CAST(storage_used AS FLOAT) * 100.0 / storage_quota END"
+)
+
+
+def upgrade():
+    # SQLite cannot ALTER TABLE ADD a stored generated column, so the batch
+    # context rebuilds the table there
+    with op.batch_alter_table('user_profiles') as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                'storage_used_pct', sa.Float(),
+                sa.Computed(STORAGE_USED_PCT, persisted=True),
+                comment='Storage usage as a percentage of the quota, maintained by the database'
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('user_profiles') as batch_op:
+        batch_op.drop_column('storage_used_pct')
@@ -0,0 +1,108 @@
+"""store AI conversation messages one row each
+
+Revision ID: 2026_10_17_1300
+Revises: 2026_10_17_1200
+Create Date: 2026-10-17
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2026_10_17_1300'
+down_revision = '2026_10_17_1200'
+branch_labels = None
+depends_on = None
+
+ai_contexts = sa.table(
+    'ai_contexts',
+    sa.column('context_id', sa.String(36)),
+    sa.column('conversation_history', sa.JSON()),
+)
+
+
+def upgrade():
+    ai_messages = op.create_table(
+        'ai_messages',
+        sa.Column('context_id', sa.String(length=36), nullable=False, comment='Reference to the AI context'),
+        sa.Column('seq', sa.Integer(), nullable=False, comment='Position of the message in the conversation'),
+        sa.Column('message_id', sa.String(length=36), nullable=False, comment='Message identifier'),
+        sa.Column('role', sa.String(length=20), nullable=False, comment='Message role (user, assistant, system)'),
+        sa.Column('message_type', sa.String(length=20), nullable=False,
+                  comment='Message type (text, voice, command, explanation)'),
+        sa.Column('content', sa.Text(), nullable=False, comment='Message content'),
+        sa.Column('tokens', sa.Integer(), nullable=False, comment='Tokens used by the message'),
+        sa.Column('processing_time', sa.Float(), nullable=False,
+                  comment='Time taken to produce the message in seconds'),
+        sa.Column('confidence', sa.Float(), nullable=False, comment='Response confidence (0-1)'),
+        sa.Column('sources', sa.JSON(), nullable=False, comment='Sources cited by the message'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, comment='Message timestamp'),
+        sa.ForeignKeyConstraint(['context_id'], ['ai_contexts.context_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('context_id', 'seq'),
+    )
+
+    # Move existing histories into the new table
+    conn = op.get_bind()
+    rows = []
+    for context_id, history in conn.execute(sa.select(ai_contexts.c.context_id, ai_contexts.c.conversation_history)):
+        for seq, message in enumerate(history or []):
+            timestamp = message.get('timestamp')
+            rows.append({
+                'context_id': context_id,
+                'seq': seq,
+                'message_id': message.get('messageId', ''),
+                'role': message.get('role', 'user'),
+                'message_type': message.get('type', 'text'),
+                'content': message.get('content', ''),
+                'tokens': message.get('tokens', 0),
+                'processing_time': message.get('processingTime', 0.0),
+                'confidence': message.get('confidence', 1.0),
+                'sources': message.get('sources') or [],
+                'created_at': datetime.fromisoformat(timestamp) if timestamp else datetime.now(timezone.utc),
+            })
+    if rows:
+        op.bulk_insert(ai_messages, rows)
+    conn.execute(ai_contexts.update().values(conversation_history=[]))
+
+
+def downgrade():
+    conn = op.get_bind()
+    ai_messages = sa.table(
+        'ai_messages',
+        sa.column('context_id', sa.String(36)),
+        sa.column('seq', sa.Integer()),
+        sa.column('message_id', sa.String(36)),
+        sa.column('role', sa.String(20)),
+        sa.column('message_type', sa.String(20)),
+        sa.column('content', sa.Text()),
+        sa.column('tokens', sa.Integer()),
+        sa.column('processing_time', sa.Float()),
+        sa.column('confidence', sa.Float()),
+        sa.column('sources', sa.JSON()),
+        sa.column('created_at', sa.DateTime(timezone=True)),
+    )
+
+    # Copy the stored messages back into the history column
+    histories = {}
+    for row in conn.execute(sa.select(ai_messages).order_by(ai_messages.c.context_id, ai_messages.c.seq)):
+        histories.setdefault(row.context_id, []).append({
+            'messageId': row.message_id,
+            'timestamp': row.created_at.isoformat(),
+            'role': row.role,
+            'content': row.content,
+            'type': row.message_type,
+            'tokens': row.tokens,
+            'processingTime': row.processing_time,
+            'confidence': row.confidence,
+            'sources': row.sources or [],
+        })
+    for context_id, history in histories.items():
+        conn.execute(
+            ai_contexts.update()
+            .where(ai_contexts.c.context_id == context_id)
+            .values(conversation_history=history[-100:])
+        )
+
+    op.drop_table('ai_messages')
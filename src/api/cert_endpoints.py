@@ -10,6 +10,7 @@ This module provides HTTP endpoints for certcat functionality including:
 T024: Implementation of certificate API endpoints.
 """
 
+import asyncio
 import ssl
 import socket
 from typing import Optional, List
@@ -156,6 +157,16 @@ async def parse_certificate(request: ParseCertRequest):
         )
 
 
+async def _load_certificate(path: Optional[str], url: Optional[str], name: str) -> Certificate:
+    """Load a certificate to compare from a local file or a remote endpoint."""
+    if path:
+        return await cert_service.parse_local_cert(path)
+    if url:
+        chain = await cert_service.fetch_remote_cert(url)
+        return chain.leaf
+    raise ValueError(f"Must provide either {name}_path or {name}_url")
+
+
 @router.post("/compare")
 async def compare_certificates(request: CompareCertsRequest):
     """Compare two certificates and return differences.
@@ -176,23 +187,11 @@ async def compare_certificates(request: CompareCertsRequest):
         HTTPException: If certificates cannot be loaded or compared
     """
     try:
-        # Load first certificate
-        if request.cert1_path:
-            cert1 = await cert_service.parse_local_cert(request.cert1_path)
-        elif request.cert1_url:
-            chain1 = await cert_service.fetch_remote_cert(request.cert1_url)
-            cert1 = chain1.leaf
-        else:
-            raise ValueError("Must provide either cert1_path or cert1_url")
-
-        # Load second certificate
-        if request.cert2_path:
-            cert2 = await cert_service.parse_local_cert(request.cert2_path)
-        elif request.cert2_url:
-            chain2 = await cert_service.fetch_remote_cert(request.cert2_url)
-            cert2 = chain2.leaf
-        else:
-            raise ValueError("Must provide either cert2_path or cert2_url")
+        # Load both certificates concurrently
+        cert1, cert2 = await asyncio.gather(
+            _load_certificate(request.cert1_path, request.cert1_url, "cert1"),
+            _load_certificate(request.cert2_path, request.cert2_url, "cert2")
+        )
 
         # Compare certificates
         comparison = cert_service.compare_certificates(cert1, cert2)
@@ -178,14 +178,10 @@ async def list_themes(
             ThemeConfiguration.is_builtin == False
         )
     elif category == "installed":
-        # Get user's installed themes from profile
-        profile_query = select(UserProfile).where(UserProfile.user_id == user_id)
-        profile_result = await db.execute(profile_query)
-        profile = profile_result.scalar_one_or_none()
-        if profile and profile.installed_themes:
-            query = query.where(ThemeConfiguration.theme_id.in_(profile.installed_themes))
-        else:
-            query = query.where(ThemeConfiguration.theme_id == None)  # Return empty
+        # Filter on the user's installed theme IDs without loading the profile
+        query = query.where(
+            ThemeConfiguration.theme_id.in_(UserProfile.installed_theme_ids_query(user_id))
+        )
 
     # Apply search filter
     if search:
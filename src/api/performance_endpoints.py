@@ -371,8 +371,7 @@ async def get_performance_preferences(
         user_id = "00000000-0000-0000-0000-000000000001"
 
         # Get user profile
-        from sqlalchemy import select
-        query = select(UserProfile).where(UserProfile.user_id == user_id)
+        query = UserProfile.profile_query(with_themes=False).where(UserProfile.user_id == user_id)
         result = await db.execute(query)
         user = result.scalar_one_or_none()
 
@@ -5,6 +5,8 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 import os
 
+from src.utils import fast_json
+
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./webterminal.db")
 
@@ -13,6 +15,9 @@ engine = create_async_engine(
     DATABASE_URL,
     echo=os.getenv("TERMINAL_DEBUG", "false").lower() == "true",
     future=True,
+    # Serialize JSON columns with orjson when available
+    json_serializer=fast_json.dumps,
+    json_deserializer=fast_json.loads,
 )
 
 # Create async session factory
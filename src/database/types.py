@@ -0,0 +1,18 @@
+"""Shared SQLAlchemy column types."""
+
+from sqlalchemy import JSON, String
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.mutable import MutableDict
+
+# Generic JSON everywhere, stored as binary JSONB on PostgreSQL so the
+# columns can be GIN-indexed and are not re-parsed as text on every read.
+JSONVariant = JSON().with_variant(JSONB(), "postgresql")
+
+# JSON object column whose top-level key assignments are change-tracked.
+# Built from its own type instance: as_mutable() applies to every column
+# sharing the instance, and JSONVariant is also used for list columns.
+MutableJSONDict = MutableDict.as_mutable(JSON().with_variant(JSONB(), "postgresql"))
+
+# UUID primary keys handled as strings in Python. Stored as VARCHAR(36) on
+# SQLite and as the 16-byte native uuid type on PostgreSQL.
+UUIDString = String(36).with_variant(UUID(as_uuid=False), "postgresql")
@@ -48,11 +48,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Create default user if not exists
     try:
         from src.models.user_profile import UserProfile
-        from sqlalchemy import select
 
         async with AsyncSessionLocal() as db:
             # Check if default user exists
-            query = select(UserProfile).where(
+            query = UserProfile.profile_query(with_themes=False).where(
                 UserProfile.user_id == "00000000-0000-0000-0000-000000000001"
             )
             result = await db.execute(query)
@@ -131,6 +130,23 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         except asyncio.CancelledError:
             pass
 
+    # Close pooled AI provider connections
+    try:
+        from src.services.ai_service import ai_service
+        from src.api.ai_endpoints import ai_service as endpoint_ai_service
+
+        await ai_service.close()
+        await endpoint_ai_service.close()
+    except Exception as e:
+        print(f"⚠️  Warning: Could not close AI service connections: {e}")
+
+    try:
+        from src.services.cert_service import get_cert_service
+
+        await get_cert_service().close()
+    except Exception as e:
+        print(f"⚠️  Warning: Could not close certificate service connections: {e}")
+
     await engine.dispose()
 
 
@@ -15,7 +15,6 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from src.models.user_profile import UserProfile
@@ -239,7 +238,7 @@ async def get_current_user(
         )
 
     # Get user from database
-    query = select(UserProfile).where(UserProfile.user_id == token_data.user_id)
+    query = UserProfile.profile_query(with_themes=False).where(UserProfile.user_id == token_data.user_id)
     result = await db.execute(query)
     user = result.scalar_one_or_none()
 
@@ -265,7 +264,7 @@ async def verify_api_key(api_key: str, db: AsyncSession) -> Optional[UserProfile
     """
     # Query for user with this API key
     # Note: In production, API keys should be hashed and stored securely
-    query = select(UserProfile).where(UserProfile.api_key == api_key)
+    query = UserProfile.profile_query(with_themes=False).where(UserProfile.api_key == api_key)
     result = await db.execute(query)
     user = result.scalar_one_or_none()
 
@@ -328,7 +327,7 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
                         token_data = JWTHandler.decode_token(token)
 
                         # Get user from database
-                        query = select(UserProfile).where(UserProfile.user_id == token_data.user_id)
+                        query = UserProfile.profile_query(with_themes=False).where(UserProfile.user_id == token_data.user_id)
                         result = await db.execute(query)
                         user = result.scalar_one_or_none()
 
@@ -5,7 +5,7 @@ from .recording import Recording
 from .media_asset import MediaAsset
 from .theme_config import ThemeConfiguration
 from .extension import Extension
-from .ai_context import AIContext
+from .ai_context import AIContext, AIContextMessage
 from .user_profile import UserProfile
 from .ebook_metadata import EbookMetadata, EbookFileType
 from .performance_snapshot import PerformanceSnapshot
@@ -26,6 +26,7 @@ __all__ = [
     "ThemeConfiguration",
     "Extension",
     "AIContext",
+    "AIContextMessage",
     "UserProfile",
     "EbookMetadata",
     "EbookFileType",
@@ -40,12 +40,13 @@ class AIContext(Base):
         comment="Reference to the user"
     )
 
-    # Conversation data
+    # Conversation data. Stored messages live in ai_messages; this column
+    # holds the in-memory history and is not written once messages are stored
     conversation_history = Column(
         JSON,
         nullable=False,
         default=list,
-        comment="Array of AI conversation messages"
+        comment="Array of AI conversation messages (superseded by ai_messages)"
     )
     terminal_context = Column(
         JSON,
@@ -150,6 +151,12 @@ class AIContext(Base):
         "UserProfile",
         back_populates="ai_contexts"
     )
+    messages = relationship(
+        "AIContextMessage",
+        back_populates="context",
+        cascade="all, delete-orphan",
+        order_by="AIContextMessage.seq"
+    )
 
     # Indexes for performance
     __table_args__ = (
@@ -224,7 +231,7 @@ class AIContext(Base):
             if message.get("role") not in valid_roles:
                 raise ValueError(f"Invalid role in message {i}: {message.get('role')}")
 
-            valid_types = ["text", "voice", "command", "explanation"]
+            valid_types = ["text", "voice", "command", "explanation", "suggestion"]
             if message.get("type") not in valid_types:
                 raise ValueError(f"Invalid type in message {i}: {message.get('type')}")
 
@@ -286,9 +293,16 @@ class AIContext(Base):
                    tokens: int = 0, processing_time: float = 0.0,
                    confidence: float = 1.0, sources: List[str] = None) -> str:
         """Add a new message to the conversation history."""
+        current_history = list(self.conversation_history or [])
+
+        # Position of the message in the context; pruning keeps system
+        # messages first, so the newest message is not always the last one
+        seq = max((m.get("seq", i) for i, m in enumerate(current_history)), default=-1) + 1
+
         message_id = str(uuid.uuid4())
         message = {
             "messageId": message_id,
+            "seq": seq,
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "role": role,
             "content": content,
@@ -299,7 +313,6 @@ class AIContext(Base):
             "sources": sources or []
         }
 
-        current_history = list(self.conversation_history or [])
         current_history.append(message)
 
         # Limit to 100 messages
@@ -473,4 +486,122 @@ class AIContext(Base):
             f"<AIContext(context_id='{self.context_id}', "
             f"session_id='{self.session_id}', provider='{self.model_provider}', "
             f"model='{self.model_name}', messages={len(self.conversation_history or [])})>"
-        )
\ No newline at end of file
+        )
+
+
+class AIContextMessage(Base):
+    """
+    A single stored message of an AI context's conversation.
+
+    Messages are stored one row each, so recording a turn inserts the new
+    messages instead of rewriting the whole conversation history.
+    """
+    __tablename__ = "ai_messages"
+
+    context_id = Column(
+        String(36),
+        ForeignKey("ai_contexts.context_id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="Reference to the AI context"
+    )
+    seq = Column(
+        Integer,
+        primary_key=True,
+        comment="Position of the message in the conversation"
+    )
+    message_id = Column(
+        String(36),
+        nullable=False,
+        comment="Message identifier"
+    )
+    role = Column(
+        String(20),
+        nullable=False,
+        comment="Message role (user, assistant, system)"
+    )
+    message_type = Column(
+        String(20),
+        nullable=False,
+        default="text",
+        comment="Message type (text, voice, command, explanation)"
+    )
+    content = Column(
+        Text,
+        nullable=False,
+        comment="Message content"
+    )
+    tokens = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Tokens used by the message"
+    )
+    processing_time = Column(
+        Float,
+        nullable=False,
+        default=0.0,
+        comment="Time taken to produce the message in seconds"
+    )
+    confidence = Column(
+        Float,
+        nullable=False,
+        default=1.0,
+        comment="Response confidence (0-1)"
+    )
+    sources = Column(
+        JSON,
+        nullable=False,
+        default=list,
+        comment="Sources cited by the message"
+    )
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        comment="Message timestamp"
+    )
+
+    # Relationships
+    context = relationship(
+        "AIContext",
+        back_populates="messages"
+    )
+
+    @staticmethod
+    def values_from_message(context_id: str, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the column values storing a conversation history message."""
+        return {
+            "context_id": context_id,
+            "seq": message["seq"],
+            "message_id": message["messageId"],
+            "role": message["role"],
+            "message_type": message.get("type", "text"),
+            "content": message["content"],
+            "tokens": message.get("tokens", 0),
+            "processing_time": message.get("processingTime", 0.0),
+            "confidence": message.get("confidence", 1.0),
+            "sources": message.get("sources") or [],
+            "created_at": datetime.fromisoformat(message["timestamp"])
+        }
+
+    def to_message(self) -> Dict[str, Any]:
+        """Convert the stored message to a conversation history entry."""
+        return {
+            "messageId": self.message_id,
+            "seq": self.seq,
+            "timestamp": self.created_at.isoformat() if self.created_at else None,
+            "role": self.role,
+            "content": self.content,
+            "type": self.message_type,
+            "tokens": self.tokens,
+            "processingTime": self.processing_time,
+            "confidence": self.confidence,
+            "sources": self.sources or []
+        }
+
+    def __repr__(self) -> str:
+        """String representation of the stored message."""
+        return (
+            f"<AIContextMessage(context_id='{self.context_id}', seq={self.seq}, "
+            f"role='{self.role}')>"
+        )
@@ -9,10 +9,12 @@ This module provides X.509 certificate representations including:
 T021: Certificate model implementation.
 """
 
+import ssl
 from dataclasses import dataclass, field
+from functools import cached_property
 from datetime import datetime, timezone
 from enum import Enum
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, FrozenSet
 
 
 class KeyAlgorithm(Enum):
@@ -103,15 +105,29 @@ class Certificate:
     # Extensions
     key_usage: List[str] = field(default_factory=list)
     extended_key_usage: List[str] = field(default_factory=list)
+    ca_issuer_url: Optional[str] = None  # Issuer download URL from AIA
 
-    # Raw data (for export)
-    pem_data: Optional[str] = None
+    # Raw data (for export); PEM is derived from it when first needed
     der_data: Optional[bytes] = None
 
     # Additional metadata
     version: int = 3
     signature_algorithm: str = "sha256WithRSAEncryption"
 
+    # SANs as a set, for comparisons
+    san_set: FrozenSet[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        """Index the SANs for comparisons."""
+        self.san_set = frozenset(self.san)
+
+    @cached_property
+    def pem_data(self) -> Optional[str]:
+        """PEM encoding of the certificate."""
+        if self.der_data is None:
+            return None
+        return ssl.DER_cert_to_PEM_cert(self.der_data)
+
     @property
     def is_expired(self) -> bool:
         """Check if certificate is currently expired."""
@@ -1,13 +1,24 @@
 """Recording SQLAlchemy model."""
 
+import bisect
+import time
 import uuid
 from datetime import datetime, timezone, timedelta
 from enum import Enum
-from typing import Dict, Any, Optional, List
-from sqlalchemy import Column, String, DateTime, Boolean, Integer, JSON, Index, ForeignKey, BigInteger
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship, validates
+from itertools import chain, islice
+from typing import Dict, Any, Optional, List, Iterator
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, Index, ForeignKey, BigInteger, Select, event, select
+from sqlalchemy.orm import Session, relationship, validates
 from src.database.base import Base
+from src.database.types import JSONVariant, UUIDString
+from src.models.terminal_session import DEFAULT_TERMINAL_SIZE
+from src.utils import fast_json
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MILLISECOND = timedelta(milliseconds=1)
+
+# Number of buffered events that triggers a write to the events column
+EVENT_FLUSH_THRESHOLD = 256
 
 
 class RecordingStatus(str, Enum):
@@ -30,7 +41,7 @@ class Recording(Base):
 
     # Primary fields
     recording_id = Column(
-        String(36),
+        UUIDString,
         primary_key=True,
         default=lambda: str(uuid.uuid4()),
         comment="Unique identifier for the recording"
@@ -94,15 +105,15 @@ class Recording(Base):
 
     # Terminal configuration
     terminal_size = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
-        default=lambda: {"cols": 80, "rows": 24},
+        default=DEFAULT_TERMINAL_SIZE.copy,
         comment="Terminal dimensions during recording"
     )
 
     # Export and processing
     export_formats = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
         default=lambda: ["json"],
         comment="Available export formats"
@@ -116,19 +127,19 @@ class Recording(Base):
 
     # Data storage
     events = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
         default=list,
         comment="Array of recorded events"
     )
     checkpoints = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
         default=list,
         comment="Playback checkpoints for seeking"
     )
     extra_metadata = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
         default=dict,
         comment="Additional recording metadata"
@@ -149,6 +160,13 @@ class Recording(Base):
         Index("idx_recordings_user_status", "user_id", "status"),
         Index("idx_recordings_start_time", "start_time"),
         Index("idx_recordings_file_size", "file_size"),
+        Index("idx_recordings_end_time", "end_time"),
+        Index(
+            "idx_recordings_metadata_gin",
+            "extra_metadata",
+            postgresql_using="gin",
+            postgresql_ops={"extra_metadata": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
     )
 
     @validates('status')
@@ -172,23 +190,41 @@ class Recording(Base):
         if not isinstance(value, list):
             return value
 
+        # Events are only ever appended, so when the new list extends the one
+        # already validated, only the appended tail needs to be checked.
+        previous = self.__dict__.get('events')
+        start_index = 0
+        last_ts_ms = None
+        if (
+            isinstance(previous, list)
+            and previous
+            and len(value) > len(previous)
+            and value[len(previous) - 1] is previous[-1]
+            and '_last_event_ts_ms' in self.__dict__
+        ):
+            start_index = len(previous)
+            last_ts_ms = self._last_event_ts_ms
+
         # Check chronological ordering
-        last_timestamp = None
-        for event in value:
-            if isinstance(event, dict) and 'timestamp' in event:
+        for ev in islice(value, start_index, None):
+            if isinstance(ev, dict) and ('ts_ms' in ev or 'timestamp' in ev):
                 try:
-                    timestamp = datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00'))
-                    if last_timestamp and timestamp < last_timestamp:
+                    ts_ms = self._event_ts_ms(ev)
+                    if last_ts_ms and ts_ms < last_ts_ms:
                         raise ValueError("Events must be chronologically ordered")
-                    last_timestamp = timestamp
+                    last_ts_ms = ts_ms
                 except (ValueError, TypeError):
                     continue  # Skip invalid timestamp formats
 
+        self._last_event_ts_ms = last_ts_ms
         return value
 
     @validates('terminal_size')
     def validate_terminal_size(self, key: str, value: Dict[str, Any]) -> Dict[str, Any]:
         """Validate terminal size dimensions."""
+        if value is DEFAULT_TERMINAL_SIZE:
+            return dict(value)
+
         if not isinstance(value, dict):
             raise ValueError("Terminal size must be a dictionary")
 
@@ -206,6 +242,19 @@ class Recording(Base):
 
         return {"cols": cols, "rows": rows}
 
+    @staticmethod
+    def _event_ts_ms(event: Dict[str, Any]) -> int:
+        """Get an event timestamp in epoch milliseconds.
+
+        Events recorded by add_event carry an integer ``ts_ms``; older events
+        and those written by the recording service only have an ISO string.
+        """
+        ts_ms = event.get('ts_ms')
+        if ts_ms is not None:
+            return ts_ms
+        timestamp = datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00'))
+        return (timestamp - _EPOCH) // _ONE_MILLISECOND
+
     def can_transition_to(self, new_status: RecordingStatus) -> bool:
         """
         Check if recording can transition to the new status.
@@ -234,9 +283,10 @@ class Recording(Base):
         if self.status != RecordingStatus.RECORDING:
             raise ValueError("Cannot add events to non-recording session")
 
-        now = datetime.now(timezone.utc)
+        ts_ms = time.time_ns() // 1_000_000
         event = {
-            "timestamp": now.isoformat(),
+            "timestamp": (_EPOCH + ts_ms * _ONE_MILLISECOND).isoformat(),
+            "ts_ms": ts_ms,
             "deltaTime": 0,  # Will be calculated
             "type": event_type,
             "data": data,
@@ -244,28 +294,47 @@ class Recording(Base):
             "extra_metadata": metadata or {}
         }
 
-        # Calculate delta time from previous event
-        if self.events:
-            last_event = self.events[-1]
-            try:
-                last_timestamp = datetime.fromisoformat(last_event['timestamp'].replace('Z', '+00:00'))
-                delta = int((now - last_timestamp).total_seconds() * 1000)
-                event["deltaTime"] = delta
-            except (ValueError, KeyError):
-                pass
-
-        # Add event and update counters
-        current_events = list(self.events or [])
-        current_events.append(event)
-        self.events = current_events
-        self.event_count = len(current_events)
+        # Calculate delta time from previous event, reusing the timestamp
+        # already resolved by validate_events when it is available
+        pending = self.__dict__.get('_pending_events')
+        if pending:
+            event["deltaTime"] = ts_ms - pending[-1]["ts_ms"]
+        elif self.events:
+            last_ts_ms = self.__dict__.get('_last_event_ts_ms')
+            if last_ts_ms is None:
+                try:
+                    last_ts_ms = self._event_ts_ms(self.events[-1])
+                except (ValueError, KeyError):
+                    pass
+            if last_ts_ms is not None:
+                event["deltaTime"] = ts_ms - last_ts_ms
+
+        # Buffer the event and update counters; the events column is only
+        # rewritten once per batch in flush_events()
+        if pending is None:
+            pending = self._pending_events = []
+        pending.append(event)
+        self.event_count = (self.event_count or 0) + 1
         self.file_size += event["size"]
 
+        if len(pending) >= EVENT_FLUSH_THRESHOLD:
+            self.flush_events()
+
+    def flush_events(self) -> None:
+        """Append buffered events to the events column in a single assignment."""
+        pending = self.__dict__.get('_pending_events')
+        if not pending:
+            return
+
+        self.events = list(self.events or []) + pending
+        self._pending_events = []
+
     def add_checkpoint(self, description: str, terminal_state: str) -> None:
         """Add a playback checkpoint."""
+        self.flush_events()
         checkpoint = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
-            "eventIndex": len(self.events or []),
+            "eventIndex": self.event_count or 0,
             "terminalState": terminal_state,
             "description": description
         }
@@ -277,14 +346,16 @@ class Recording(Base):
     def stop_recording(self) -> None:
         """Stop the recording and calculate final duration."""
         if self.can_transition_to(RecordingStatus.STOPPED):
+            self.flush_events()
+            end_time = datetime.now(timezone.utc)
             self.status = RecordingStatus.STOPPED
-            self.end_time = datetime.now(timezone.utc)
+            self.end_time = end_time
             if self.start_time:
                 # Ensure start_time is timezone-aware for proper calculation
                 start_time = self.start_time
                 if start_time.tzinfo is None:
                     start_time = start_time.replace(tzinfo=timezone.utc)
-                self.duration = int((self.end_time - start_time).total_seconds() * 1000)
+                self.duration = int((end_time - start_time).total_seconds() * 1000)
         else:
             raise ValueError(f"Cannot stop recording from status: {self.status}")
 
@@ -318,39 +389,67 @@ class Recording(Base):
         expiry_date = self.end_time + timedelta(days=retention_days)
         return datetime.now(timezone.utc) > expiry_date
 
-    def get_events_in_range(self, start_index: int, end_index: int) -> List[Dict[str, Any]]:
-        """Get events within a specific index range."""
+    @classmethod
+    def expired_query(cls, retention_days: int = 30) -> Select:
+        """
+        Build a query selecting recordings expired under the retention policy.
+
+        Same condition as is_expired, evaluated by the database against the
+        end_time index instead of loading every recording into Python.
+        """
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        return select(cls).where(cls.end_time.isnot(None), cls.end_time < cutoff_date)
+
+    def get_events_in_range(self, start_index: int, end_index: int) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over events within a specific index range.
+
+        Returns a lazy view over the stored events rather than a copied slice;
+        callers that need len() or random access should wrap it in list().
+        """
+        self.flush_events()
         if not self.events:
-            return []
+            return iter(())
 
         start_index = max(0, start_index)
         end_index = min(len(self.events), end_index)
 
-        return self.events[start_index:end_index]
+        return islice(self.events, start_index, end_index)
+
+    def _get_checkpoint_timestamps(self) -> List[str]:
+        """
+        Return checkpoint timestamps, rebuilding the cache when checkpoints change.
+
+        The cache remembers the checkpoint list it was built from, so assigning
+        or reloading the list invalidates it even when the length is unchanged.
+        """
+        checkpoints = self.checkpoints or []
+        cache = self.__dict__.get('_checkpoint_ts_cache')
+        if cache is None or cache[0] is not checkpoints or len(cache[1]) != len(checkpoints):
+            cache = (checkpoints, [checkpoint.get('timestamp', '') for checkpoint in checkpoints])
+            self._checkpoint_ts_cache = cache
+        return cache[1]
 
     def get_checkpoint_at_time(self, timestamp: datetime) -> Optional[Dict[str, Any]]:
         """Find the nearest checkpoint before or at the given timestamp."""
         if not self.checkpoints:
             return None
 
+        # Checkpoints are appended in time order and ISO-8601 strings sort
+        # chronologically, so a binary search over the timestamps is exact.
         target_timestamp = timestamp.isoformat()
-        nearest_checkpoint = None
+        index = bisect.bisect_right(self._get_checkpoint_timestamps(), target_timestamp) - 1
 
-        for checkpoint in self.checkpoints:
-            if checkpoint.get('timestamp', '') <= target_timestamp:
-                nearest_checkpoint = checkpoint
-            else:
-                break
-
-        return nearest_checkpoint
+        return self.checkpoints[index] if index >= 0 else None
 
     def calculate_compression_savings(self) -> Dict[str, Any]:
         """Calculate compression statistics."""
+        self.flush_events()
         if not self.events:
             return {"original_size": 0, "compressed_size": 0, "savings": 0}
 
-        # Estimate original size (uncompressed JSON)
-        original_size = len(str(self.events).encode('utf-8'))
+        # Original size is the size of the uncompressed JSON payload
+        original_size = len(fast_json.dumps_bytes(self.events))
         compressed_size = self.file_size
         savings = max(0, original_size - compressed_size)
 
@@ -386,4 +485,12 @@ class Recording(Base):
             f"<Recording(recording_id='{self.recording_id}', "
             f"session_id='{self.session_id}', status='{self.status}', "
             f"duration={self.duration}ms, events={self.event_count})>"
-        )
\ No newline at end of file
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _flush_pending_recording_events(session: Session, flush_context: Any, instances: Any) -> None:
+    """Write buffered recording events before the ORM flushes to the database."""
+    for instance in chain(session.new, session.dirty):
+        if isinstance(instance, Recording):
+            instance.flush_events()
@@ -4,10 +4,14 @@ import uuid
 from datetime import datetime, timezone
 from enum import Enum
 from typing import Dict, Any, Optional, List
-from sqlalchemy import Column, String, DateTime, Boolean, Integer, JSON, Index, ForeignKey
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, Index, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, validates
 from src.database.base import Base
+from src.database.types import JSONVariant
+
+# Terminal dimensions used by the vast majority of sessions
+DEFAULT_TERMINAL_SIZE = {"cols": 80, "rows": 24}
 
 
 class SessionStatus(str, Enum):
@@ -72,9 +76,9 @@ class TerminalSession(Base):
 
     # Terminal configuration
     terminal_size = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
-        default=lambda: {"cols": 80, "rows": 24},
+        default=DEFAULT_TERMINAL_SIZE.copy,
         comment="Terminal dimensions in columns and rows"
     )
     working_directory = Column(
@@ -84,7 +88,7 @@ class TerminalSession(Base):
         comment="Current working directory path"
     )
     environment_variables = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
         default=dict,
         comment="Session environment variables"
@@ -124,7 +128,7 @@ class TerminalSession(Base):
 
     # Metadata
     extra_metadata = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
         default=dict,
         comment="Additional session metadata"
@@ -169,6 +173,18 @@ class TerminalSession(Base):
         Index("idx_terminal_sessions_user_status", "user_id", "status"),
         Index("idx_terminal_sessions_created_at", "created_at"),
         Index("idx_terminal_sessions_last_active", "last_active_at"),
+        Index(
+            "idx_terminal_sessions_env_gin",
+            "environment_variables",
+            postgresql_using="gin",
+            postgresql_ops={"environment_variables": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "idx_terminal_sessions_metadata_gin",
+            "extra_metadata",
+            postgresql_using="gin",
+            postgresql_ops={"extra_metadata": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
     )
 
     @validates('status')
@@ -181,6 +197,9 @@ class TerminalSession(Base):
     @validates('terminal_size')
     def validate_terminal_size(self, key: str, value: Dict[str, Any]) -> Dict[str, Any]:
         """Validate terminal size dimensions."""
+        if value is DEFAULT_TERMINAL_SIZE:
+            return dict(value)
+
         if not isinstance(value, dict):
             raise ValueError("Terminal size must be a dictionary")
 
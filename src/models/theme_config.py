@@ -1,13 +1,170 @@
 """Theme Configuration SQLAlchemy model."""
 
+import copy
 import uuid
 import re
 from datetime import datetime, timezone
+from itertools import zip_longest
 from typing import Dict, Any, Optional, List
-from sqlalchemy import Column, String, DateTime, Boolean, Integer, JSON, Index, Text
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, Index, Select, Text, event, func, inspect, select, text
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship, validates
+from sqlalchemy.orm import relationship, selectinload, validates
 from src.database.base import Base
+from src.database.types import JSONVariant
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Validation patterns, compiled once at import time
+_SEMVER_RE = re.compile(
+    r'^(\d+)\.(\d+)\.(\d+)(?:-([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?(?:\+([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?$'
+)
+_HEX_DIGITS = '0123456789abcdefABCDEF'
+_RGBA_COLOR_RE = re.compile(r'^rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*(0?\.\d+|1|0))?\s*\)$')
+
+# Relative luminance weights for the R, G and B channels
+_LUMINANCE_WEIGHTS = (0.299, 0.587, 0.114)
+
+# Default configuration objects for new themes
+_DEFAULT_COLORS = {
+    "background": "#000000",
+    "foreground": "#ffffff",
+    "cursor": "#ffffff",
+    "selection": "#ffffff40",
+    "black": "#000000",
+    "red": "#ff0000",
+    "green": "#00ff00",
+    "yellow": "#ffff00",
+    "blue": "#0000ff",
+    "magenta": "#ff00ff",
+    "cyan": "#00ffff",
+    "white": "#ffffff",
+    "brightBlack": "#808080",
+    "brightRed": "#ff8080",
+    "brightGreen": "#80ff80",
+    "brightYellow": "#ffff80",
+    "brightBlue": "#8080ff",
+    "brightMagenta": "#ff80ff",
+    "brightCyan": "#80ffff",
+    "brightWhite": "#ffffff"
+}
+_DEFAULT_FONTS = {
+    "family": "monospace",
+    "size": 14,
+    "weight": "normal",
+    "lineHeight": 1.2,
+    "letterSpacing": 0
+}
+_DEFAULT_ANIMATIONS = {
+    "enabled": True,
+    "fadeInText": {
+        "enabled": True,
+        "duration": 200,
+        "easing": "ease-out"
+    },
+    "cursorBlink": {
+        "enabled": True,
+        "interval": 1000
+    },
+    "typewriterEffect": {
+        "enabled": False,
+        "speed": 50
+    },
+    "particleEffects": {
+        "enabled": False,
+        "type": "stars"
+    }
+}
+_DEFAULT_CURSOR = {
+    "style": "block",
+    "blink": True,
+    "color": "#ffffff"
+}
+_DEFAULT_BACKGROUND = {
+    "color": "#000000",
+    "image": None,
+    "opacity": 1.0,
+    "blur": 0
+}
+
+# Colors every theme palette must define
+_REQUIRED_COLORS = (
+    "background", "foreground", "cursor", "selection",
+    "black", "red", "green", "yellow", "blue", "magenta", "cyan", "white",
+    "brightBlack", "brightRed", "brightGreen", "brightYellow",
+    "brightBlue", "brightMagenta", "brightCyan", "brightWhite"
+)
+_REQUIRED_COLOR_SET = frozenset(_REQUIRED_COLORS)
+
+# Fields import_config() copies from an external theme definition
+_IMPORTABLE_FIELDS = (
+    "name", "description", "version", "author",
+    "colors", "fonts", "animations", "cursor", "background",
+    "custom_css", "extra_metadata"
+)
+
+# Basic security validation - prevent dangerous CSS. The alternatives are
+# combined so the stylesheet is scanned once instead of once per pattern.
+_DANGEROUS_CSS_RE = re.compile(
+    r'@import\s+url\s*\('  # Prevent external imports
+    r'|expression\s*\('    # Prevent IE expressions
+    r'|javascript:'         # Prevent JavaScript URLs
+    r'|vbscript:'           # Prevent VBScript URLs
+    r'|data:.*script',      # Prevent script data URLs
+    re.IGNORECASE
+)
+
+
+def _scheme_type_for_background(bg_color: str) -> str:
+    """Classify a background color as a light or dark scheme."""
+    if bg_color.startswith("#"):
+        # Convert hex to RGB
+        hex_color = bg_color.lstrip("#")
+        if len(hex_color) == 3:
+            hex_color = ''.join([c*2 for c in hex_color])
+
+        try:
+            r = int(hex_color[0:2], 16)
+            g = int(hex_color[2:4], 16)
+            b = int(hex_color[4:6], 16)
+
+            # Calculate luminance
+            red_weight, green_weight, blue_weight = _LUMINANCE_WEIGHTS
+            luminance = (red_weight * r + green_weight * g + blue_weight * b) / 255
+            return "light" if luminance > 0.5 else "dark"
+        except ValueError:
+            pass
+
+    return "dark"  # Default to dark
+
+
+def _bulk_scheme_types(backgrounds: List[str]) -> List[str]:
+    """Classify many background colors with one NumPy matrix-vector product."""
+    scheme_types = ["dark"] * len(backgrounds)
+    positions = []
+    hex_parts = []
+    for index, bg_color in enumerate(backgrounds):
+        if not bg_color.startswith("#"):
+            continue
+        hex_color = bg_color.lstrip("#")
+        if len(hex_color) == 3:
+            hex_color = ''.join([c*2 for c in hex_color])
+        hex_color = hex_color[:6]
+        if len(hex_color) == 6 and not hex_color.strip(_HEX_DIGITS):
+            positions.append(index)
+            hex_parts.append(hex_color)
+
+    if hex_parts:
+        rgb = np.frombuffer(bytes.fromhex(''.join(hex_parts)), dtype=np.uint8).reshape(-1, 3)
+        luminance = rgb @ np.array(_LUMINANCE_WEIGHTS) / 255
+        for index, is_light in zip(positions, (luminance > 0.5).tolist()):
+            if is_light:
+                scheme_types[index] = "light"
+
+    return scheme_types
 
 
 class ThemeConfiguration(Base):
@@ -66,88 +223,39 @@ class ThemeConfiguration(Base):
 
     # Configuration objects
     colors = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
-        default=lambda: {
-            "background": "#000000",
-            "foreground": "#ffffff",
-            "cursor": "#ffffff",
-            "selection": "#ffffff40",
-            "black": "#000000",
-            "red": "#ff0000",
-            "green": "#00ff00",
-            "yellow": "#ffff00",
-            "blue": "#0000ff",
-            "magenta": "#ff00ff",
-            "cyan": "#00ffff",
-            "white": "#ffffff",
-            "brightBlack": "#808080",
-            "brightRed": "#ff8080",
-            "brightGreen": "#80ff80",
-            "brightYellow": "#ffff80",
-            "brightBlue": "#8080ff",
-            "brightMagenta": "#ff80ff",
-            "brightCyan": "#80ffff",
-            "brightWhite": "#ffffff"
-        },
+        default=_DEFAULT_COLORS.copy,
         comment="Color palette configuration"
     )
+    scheme_type = Column(
+        String(5),
+        nullable=False,
+        default="dark",
+        comment="Light or dark scheme derived from the background color"
+    )
     fonts = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
-        default=lambda: {
-            "family": "monospace",
-            "size": 14,
-            "weight": "normal",
-            "lineHeight": 1.2,
-            "letterSpacing": 0
-        },
+        default=_DEFAULT_FONTS.copy,
         comment="Font configuration"
     )
     animations = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
-        default=lambda: {
-            "enabled": True,
-            "fadeInText": {
-                "enabled": True,
-                "duration": 200,
-                "easing": "ease-out"
-            },
-            "cursorBlink": {
-                "enabled": True,
-                "interval": 1000
-            },
-            "typewriterEffect": {
-                "enabled": False,
-                "speed": 50
-            },
-            "particleEffects": {
-                "enabled": False,
-                "type": "stars"
-            }
-        },
+        default=lambda: copy.deepcopy(_DEFAULT_ANIMATIONS),
         comment="Animation settings"
     )
     cursor = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
-        default=lambda: {
-            "style": "block",
-            "blink": True,
-            "color": "#ffffff"
-        },
+        default=_DEFAULT_CURSOR.copy,
         comment="Cursor style configuration"
     )
     background = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
-        default=lambda: {
-            "color": "#000000",
-            "image": None,
-            "opacity": 1.0,
-            "blur": 0
-        },
+        default=_DEFAULT_BACKGROUND.copy,
         comment="Background configuration"
     )
 
@@ -162,15 +270,15 @@ class ThemeConfiguration(Base):
     created_at = Column(
         DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
         index=True,
         comment="Theme creation timestamp"
     )
     updated_at = Column(
         DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc),
-        onupdate=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
+        onupdate=func.now(),
         comment="Last update timestamp"
     )
 
@@ -190,37 +298,69 @@ class ThemeConfiguration(Base):
 
     # Additional metadata
     extra_metadata = Column(
-        JSON,
+        JSONVariant,
         nullable=False,
         default=dict,
         comment="Additional theme metadata"
     )
 
-    # Relationships
+    # Relationships. Lazy loads raise so list endpoints cannot fall into
+    # per-theme queries; load them explicitly with selectinload instead.
     terminal_sessions = relationship(
         "TerminalSession",
         foreign_keys="[TerminalSession.theme_id]",
         primaryjoin="ThemeConfiguration.theme_id == TerminalSession.theme_id",
-        back_populates="theme_configuration"
+        back_populates="theme_configuration",
+        lazy="raise"
     )
     user_profiles = relationship(
         "UserProfile",
         secondary="user_theme_associations",
-        back_populates="installed_theme_objects"
+        back_populates="installed_theme_objects",
+        lazy="raise"
     )
 
     # Indexes for performance
     __table_args__ = (
         Index("idx_theme_configs_name_author", "name", "author"),
-        Index("idx_theme_configs_public_rating", "is_public", "rating"),
+        # Covering partial index for public catalog listings on PostgreSQL
+        Index(
+            "idx_theme_configs_public_rating", "is_public", "rating",
+            postgresql_include=["name", "author", "download_count", "created_at"],
+            postgresql_where=text("is_public = true")
+        ),
         Index("idx_theme_configs_created_at", "created_at"),
+        Index(
+            "idx_theme_configs_animations_gin",
+            "animations",
+            postgresql_using="gin",
+            postgresql_ops={"animations": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
     )
 
+    # Fetch database-generated timestamps during the flush so they are
+    # readable afterwards without an extra refresh
+    __mapper_args__ = {"eager_defaults": True}
+
+    # Validators run on attribute assignment only. Rows loaded from the
+    # database populate instance state directly and are not re-validated,
+    # while edits to persistent themes are still checked.
     @validates('version')
     def validate_version(self, key: str, value: str) -> str:
         """Validate semantic version format."""
-        semver_pattern = r'^(\d+)\.(\d+)\.(\d+)(?:-([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?(?:\+([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?$'
-        if not re.match(semver_pattern, value):
+        # Fast path for plain MAJOR.MINOR.PATCH; pre-release and build
+        # suffixes fall through to the full semver pattern
+        if isinstance(value, str):
+            parts = value.split('.', 2)
+            if (
+                len(parts) == 3
+                and parts[0].isdecimal()
+                and parts[1].isdecimal()
+                and parts[2].isdecimal()
+            ):
+                return value
+
+        if not _SEMVER_RE.match(value):
             raise ValueError(f"Version must follow semantic versioning format: {value}")
         return value
 
@@ -230,21 +370,21 @@ class ThemeConfiguration(Base):
         if not isinstance(value, dict):
             raise ValueError("Colors must be a dictionary")
 
-        required_colors = [
-            "background", "foreground", "cursor", "selection",
-            "black", "red", "green", "yellow", "blue", "magenta", "cyan", "white",
-            "brightBlack", "brightRed", "brightGreen", "brightYellow",
-            "brightBlue", "brightMagenta", "brightCyan", "brightWhite"
-        ]
-
-        for color_name in required_colors:
-            if color_name not in value:
-                raise ValueError(f"Missing required color: {color_name}")
+        missing = _REQUIRED_COLOR_SET.difference(value)
+        if missing:
+            color_name = next(name for name in _REQUIRED_COLORS if name in missing)
+            raise ValueError(f"Missing required color: {color_name}")
 
+        for color_name in _REQUIRED_COLORS:
             color_value = value[color_name]
             if not self._is_valid_color(color_value):
                 raise ValueError(f"Invalid color format for {color_name}: {color_value}")
 
+        # Classify the scheme once at write time so it can be read and
+        # filtered on without parsing the background again
+        bg_color = value["background"]
+        self.scheme_type = _scheme_type_for_background(bg_color)
+        self.__dict__["_scheme_type_cache"] = (bg_color, self.scheme_type)
         return value
 
     @validates('fonts')
@@ -304,24 +444,15 @@ class ThemeConfiguration(Base):
         if value is None:
             return value
 
-        # Basic security validation - prevent dangerous CSS
-        dangerous_patterns = [
-            r'@import\s+url\s*\(',  # Prevent external imports
-            r'expression\s*\(',     # Prevent IE expressions
-            r'javascript:',         # Prevent JavaScript URLs
-            r'vbscript:',          # Prevent VBScript URLs
-            r'data:.*script',       # Prevent script data URLs
-        ]
-
-        value_lower = value.lower()
-        for pattern in dangerous_patterns:
-            if re.search(pattern, value_lower):
-                raise ValueError(f"Custom CSS contains potentially dangerous content: {pattern}")
-
-        # Limit CSS size to prevent abuse
+        # Limit CSS size to prevent abuse; checked first so oversized
+        # payloads are rejected before any pattern scan
         if len(value) > 50000:  # 50KB limit
             raise ValueError("Custom CSS cannot exceed 50KB")
 
+        match = _DANGEROUS_CSS_RE.search(value)
+        if match:
+            raise ValueError(f"Custom CSS contains potentially dangerous content: {match.group(0)!r}")
+
         return value
 
     @validates('rating')
@@ -336,14 +467,12 @@ class ThemeConfiguration(Base):
         if not isinstance(color, str):
             return False
 
-        # Hex color validation
-        hex_pattern = r'^#([A-Fa-f0-9]{6}|[A-Fa-f0-9]{3}|[A-Fa-f0-9]{8})$'
-        if re.match(hex_pattern, color):
-            return True
+        # Hex color validation: '#' followed by 3, 6 or 8 hex digits
+        if color[:1] == '#':
+            return len(color) in (4, 7, 9) and not color[1:].strip(_HEX_DIGITS)
 
         # RGBA color validation
-        rgba_pattern = r'^rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*(0?\.\d+|1|0))?\s*\)$'
-        rgba_match = re.match(rgba_pattern, color)
+        rgba_match = _RGBA_COLOR_RE.match(color) if color.startswith('rgb') else None
         if rgba_match:
             r, g, b = int(rgba_match.group(1)), int(rgba_match.group(2)), int(rgba_match.group(3))
             return 0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255
@@ -361,21 +490,30 @@ class ThemeConfiguration(Base):
         self.rating = int(rating * 100)
 
     def increment_download_count(self) -> None:
-        """Increment the download counter."""
-        self.download_count += 1
+        """
+        Increment the download counter.
+
+        The new count is readable straight away. For stored themes the
+        increments made since the last flush are also counted separately and
+        written as ``download_count = download_count + n``, so concurrent
+        downloads from other sessions are not overwritten; the attribute is
+        expired after the flush and reloads the committed count on next access.
+        """
+        self.download_count = (self.download_count or 0) + 1
+        if inspect(self).persistent:
+            self.__dict__['_pending_downloads'] = self.__dict__.get('_pending_downloads', 0) + 1
 
     def is_compatible_with_version(self, min_version: str) -> bool:
         """Check if theme version meets minimum requirement."""
         try:
-            theme_version = [int(x) for x in self.version.split('.')]
-            min_version_parts = [int(x) for x in min_version.split('.')]
-
-            # Pad shorter version with zeros
-            max_len = max(len(theme_version), len(min_version_parts))
-            theme_version += [0] * (max_len - len(theme_version))
-            min_version_parts += [0] * (max_len - len(min_version_parts))
+            theme_version = tuple(map(int, self.version.split('.')))
+            min_version_parts = tuple(map(int, min_version.split('.')))
 
-            return theme_version >= min_version_parts
+            # Compare component-wise, treating missing components as zero
+            for theme_part, min_part in zip_longest(theme_version, min_version_parts, fillvalue=0):
+                if theme_part != min_part:
+                    return theme_part > min_part
+            return True
         except (ValueError, AttributeError):
             return False
 
@@ -383,24 +521,43 @@ class ThemeConfiguration(Base):
         """Determine if theme is light or dark based on background color."""
         bg_color = self.colors.get("background", "#000000")
 
-        if bg_color.startswith("#"):
-            # Convert hex to RGB
-            hex_color = bg_color.lstrip("#")
-            if len(hex_color) == 3:
-                hex_color = ''.join([c*2 for c in hex_color])
-
-            try:
-                r = int(hex_color[0:2], 16)
-                g = int(hex_color[2:4], 16)
-                b = int(hex_color[4:6], 16)
-
-                # Calculate luminance
-                luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
-                return "light" if luminance > 0.5 else "dark"
-            except ValueError:
-                pass
-
-        return "dark"  # Default to dark
+        # Serializing a theme asks for its scheme more than once, so the result
+        # is memoized against the background color it was computed from.
+        cached = self.__dict__.get("_scheme_type_cache")
+        if cached is not None and cached[0] == bg_color:
+            return cached[1]
+
+        if cached is None and self.scheme_type is not None:
+            # Loaded row: the stored column was computed when colors were written
+            scheme_type = self.scheme_type
+        else:
+            scheme_type = _scheme_type_for_background(bg_color)
+        self.__dict__["_scheme_type_cache"] = (bg_color, scheme_type)
+        return scheme_type
+
+    @classmethod
+    def compute_scheme_types(cls, themes: List["ThemeConfiguration"]) -> List[str]:
+        """
+        Determine the color scheme type of many themes at once.
+
+        When NumPy is available the luminance of every hex background is
+        computed in a single vectorized pass. Each theme's memoized scheme
+        type is primed so a following to_dict() or export_config() reuses it.
+        """
+        backgrounds = [theme.colors.get("background", "#000000") for theme in themes]
+        if NUMPY_AVAILABLE:
+            scheme_types = _bulk_scheme_types(backgrounds)
+        else:
+            scheme_types = [_scheme_type_for_background(bg) for bg in backgrounds]
+
+        for theme, bg_color, scheme_type in zip(themes, backgrounds, scheme_types):
+            theme.__dict__["_scheme_type_cache"] = (bg_color, scheme_type)
+        return scheme_types
+
+    @classmethod
+    def with_sessions_query(cls) -> Select:
+        """Build a theme query that eager-loads each theme's terminal sessions."""
+        return select(cls).options(selectinload(cls.terminal_sessions))
 
     def export_config(self) -> Dict[str, Any]:
         """Export theme configuration for sharing."""
@@ -421,26 +578,19 @@ class ThemeConfiguration(Base):
 
     def import_config(self, config: Dict[str, Any]) -> None:
         """Import theme configuration from external source."""
-        # Update basic fields
-        for field in ["name", "description", "version", "author"]:
+        # Only assign changed values so unchanged fields skip their validators
+        for field in _IMPORTABLE_FIELDS:
             if field in config:
-                setattr(self, field, config[field])
-
-        # Update configuration objects
-        for field in ["colors", "fonts", "animations", "cursor", "background"]:
-            if field in config:
-                setattr(self, field, config[field])
-
-        if "custom_css" in config:
-            self.custom_css = config["custom_css"]
-
-        if "extra_metadata" in config:
-            self.extra_metadata = config["extra_metadata"]
+                value = config[field]
+                if getattr(self, field) != value:
+                    setattr(self, field, value)
 
         self.updated_at = datetime.now(timezone.utc)
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert theme configuration to dictionary representation."""
+        created_at = self.created_at
+        updated_at = self.updated_at
         return {
             "theme_id": self.theme_id,
             "name": self.name,
@@ -455,18 +605,33 @@ class ThemeConfiguration(Base):
             "cursor": self.cursor,
             "background": self.background,
             "custom_css": self.custom_css,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": created_at.isoformat() if created_at else None,
+            "updated_at": updated_at.isoformat() if updated_at else None,
             "download_count": self.download_count,
-            "rating": self.get_rating_float(),
+            "rating": self.rating / 100.0,
             "extra_metadata": self.extra_metadata,
             "scheme_type": self.get_color_scheme_type()
         }
 
     def __repr__(self) -> str:
         """String representation of the theme configuration."""
-        return (
-            f"<ThemeConfiguration(theme_id='{self.theme_id}', "
-            f"name='{self.name}', version='{self.version}', "
-            f"author='{self.author}', rating={self.get_rating_float()})>"
-        )
\ No newline at end of file
+        return "<ThemeConfiguration(theme_id=%r, name=%r, version=%r, author=%r, rating=%.2f)>" % (
+            self.theme_id, self.name, self.version, self.author, self.rating / 100.0
+        )
+
+
+@event.listens_for(ThemeConfiguration, "before_update")
+def _apply_pending_downloads(mapper: Any, connection: Any, target: ThemeConfiguration) -> None:
+    """Write pending download increments relative to the stored count."""
+    pending = target.__dict__.pop('_pending_downloads', None)
+    if pending:
+        target.download_count = ThemeConfiguration.download_count + pending
+
+
+@event.listens_for(ThemeConfiguration, "expire")
+@event.listens_for(ThemeConfiguration, "refresh")
+def _drop_pending_downloads(target: ThemeConfiguration, *args: Any) -> None:
+    """Discard pending increments when the count is reloaded, e.g. after a rollback."""
+    if target is None:
+        return
+    target.__dict__.pop('_pending_downloads', None)
@@ -1,14 +1,95 @@
 """User Profile SQLAlchemy model."""
 
+import json
 import uuid
 import re
+import string
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List
-from sqlalchemy import Column, String, DateTime, Boolean, Integer, JSON, Index, BigInteger, Table, ForeignKey
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, Float, Index, BigInteger, Computed, Table, ForeignKey, Select, event, func, select, text
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship, validates
+from sqlalchemy.orm import noload, relationship, validates
+from sqlalchemy.sql.elements import TextClause
 from src.database.base import Base
-
+from src.database.types import MutableJSONDict
+
+# Validation patterns, compiled once at import time and used with fullmatch()
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_AVATAR_URL_RE = re.compile(r'https?://[^\s/$.?#].[^\s]*')
+
+# Translation table deleting every character allowed in a username; any
+# character left over after translate() is invalid
+_USERNAME_ALLOWED_CHARS = str.maketrans('', '', string.ascii_letters + string.digits + '_-')
+
+# Default settings for new profiles
+_DEFAULT_PREFERENCES = {
+    "terminal": {
+        "fontSize": 14,
+        "fontFamily": "monospace",
+        "cursorStyle": "block",
+        "scrollback": 1000,
+        "bellStyle": "sound"
+    },
+    "animations": {
+        "enabled": True,
+        "reducedMotion": False
+    },
+    "media": {
+        "autoLoadImages": True,
+        "maxVideoSize": "50MB",
+        "imageScaling": "fit"
+    },
+    "recordings": {
+        "autoRecord": False,
+        "maxDuration": 3600,
+        "compressionLevel": 5
+    }
+}
+_DEFAULT_KEYBOARD_SHORTCUTS = {
+    "copy": "Ctrl+C",
+    "paste": "Ctrl+V",
+    "clear": "Ctrl+L",
+    "newTab": "Ctrl+T",
+    "closeTab": "Ctrl+W",
+    "search": "Ctrl+F"
+}
+_DEFAULT_AI_SETTINGS = {
+    "enabled": True,
+    "provider": "openai",
+    "model": "gpt-4",
+    "voiceEnabled": True,
+    "voiceLanguage": "en-US",
+    "autoSuggestions": True,
+    "contextSharing": "full",
+    "responseFormat": "text"
+}
+_DEFAULT_RECORDING_SETTINGS = {
+    "defaultEnabled": False,
+    "maxDuration": 3600,
+    "compressionLevel": 5,
+    "retentionDays": 30,
+    "autoDelete": True
+}
+_DEFAULT_PRIVACY_SETTINGS = {
+    "shareUsageData": False,
+    "allowAnalytics": False,
+    "sessionTracking": "minimal",
+    "dataRetention": 30,
+    "exportData": True
+}
+
+
+def _json_server_default(value: Dict[str, Any]) -> TextClause:
+    """Render a JSON template as a SQL literal for use as a column server default."""
+    return text("'" + json.dumps(value).replace("'", "''") + "'")
+
+
+# Installed collection -> (instance index attribute, ID attribute of its items)
+_INSTALLED_INDEXES = {
+    "installed_theme_objects": ("_theme_index", "theme_id"),
+    "installed_extension_objects": ("_extension_index", "extension_id"),
+}
 
 # Association tables for many-to-many relationships
 user_theme_associations = Table(
@@ -26,6 +107,52 @@ user_extension_associations = Table(
 )
 
 
+@dataclass(slots=True, frozen=True)
+class AccountSummary:
+    """Account summary for a user profile."""
+    user_id: str
+    username: str
+    display_name: Optional[str]
+    email: Optional[str]
+    avatar_url: Optional[str]
+    is_active: bool
+    created_at: Optional[str]
+    last_login_at: Optional[str]
+    storage_used: int
+    storage_quota: int
+    storage_percent: float
+    storage_remaining: int
+    themes_installed: int
+    extensions_installed: int
+    active_theme_id: Optional[str]
+    default_shell: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the summary to its JSON representation."""
+        return {
+            "user_id": self.user_id,
+            "username": self.username,
+            "display_name": self.display_name,
+            "email": self.email,
+            "avatar_url": self.avatar_url,
+            "is_active": self.is_active,
+            "created_at": self.created_at,
+            "last_login_at": self.last_login_at,
+            "storage_usage": {
+                "used": self.storage_used,
+                "quota": self.storage_quota,
+                "percent": self.storage_percent,
+                "remaining": self.storage_remaining
+            },
+            "installed_count": {
+                "themes": self.themes_installed,
+                "extensions": self.extensions_installed
+            },
+            "active_theme_id": self.active_theme_id,
+            "default_shell": self.default_shell
+        }
+
+
 class UserProfile(Base):
     """
     User Profile model for preferences, settings, and personalization data.
@@ -69,31 +196,9 @@ class UserProfile(Base):
 
     # User preferences
     preferences = Column(
-        JSON,
+        MutableJSONDict,
         nullable=False,
-        default=lambda: {
-            "terminal": {
-                "fontSize": 14,
-                "fontFamily": "monospace",
-                "cursorStyle": "block",
-                "scrollback": 1000,
-                "bellStyle": "sound"
-            },
-            "animations": {
-                "enabled": True,
-                "reducedMotion": False
-            },
-            "media": {
-                "autoLoadImages": True,
-                "maxVideoSize": "50MB",
-                "imageScaling": "fit"
-            },
-            "recordings": {
-                "autoRecord": False,
-                "maxDuration": 3600,
-                "compressionLevel": 5
-            }
-        },
+        server_default=_json_server_default(_DEFAULT_PREFERENCES),
         comment="User preferences and settings"
     )
 
@@ -113,57 +218,29 @@ class UserProfile(Base):
         comment="Default shell preference"
     )
     keyboard_shortcuts = Column(
-        JSON,
+        MutableJSONDict,
         nullable=False,
-        default=lambda: {
-            "copy": "Ctrl+C",
-            "paste": "Ctrl+V",
-            "clear": "Ctrl+L",
-            "newTab": "Ctrl+T",
-            "closeTab": "Ctrl+W",
-            "search": "Ctrl+F"
-        },
+        server_default=_json_server_default(_DEFAULT_KEYBOARD_SHORTCUTS),
         comment="Custom keyboard shortcuts"
     )
 
     # AI and recording settings
     ai_settings = Column(
-        JSON,
+        MutableJSONDict,
         nullable=False,
-        default=lambda: {
-            "enabled": True,
-            "provider": "openai",
-            "model": "gpt-4",
-            "voiceEnabled": True,
-            "voiceLanguage": "en-US",
-            "autoSuggestions": True,
-            "contextSharing": "full",
-            "responseFormat": "text"
-        },
+        server_default=_json_server_default(_DEFAULT_AI_SETTINGS),
         comment="AI assistant preferences"
     )
     recording_settings = Column(
-        JSON,
+        MutableJSONDict,
         nullable=False,
-        default=lambda: {
-            "defaultEnabled": False,
-            "maxDuration": 3600,
-            "compressionLevel": 5,
-            "retentionDays": 30,
-            "autoDelete": True
-        },
+        server_default=_json_server_default(_DEFAULT_RECORDING_SETTINGS),
         comment="Default recording preferences"
     )
     privacy_settings = Column(
-        JSON,
+        MutableJSONDict,
         nullable=False,
-        default=lambda: {
-            "shareUsageData": False,
-            "allowAnalytics": False,
-            "sessionTracking": "minimal",
-            "dataRetention": 30,
-            "exportData": True
-        },
+        server_default=_json_server_default(_DEFAULT_PRIVACY_SETTINGS),
         comment="Privacy and data retention preferences"
     )
 
@@ -194,19 +271,28 @@ class UserProfile(Base):
         default=0,
         comment="Current storage usage in bytes"
     )
+    storage_used_pct = Column(
+        Float,
+        Computed(
+            "CASE WHEN storage_quota = 0 THEN 0.0 "
+            "ELSE CAST(storage_used AS FLOAT) * 100.0 / storage_quota END",
+            persisted=True
+        ),
+        comment="Storage usage as a percentage of the quota, maintained by the database"
+    )
 
     # Account status and timestamps
     created_at = Column(
         DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
         index=True,
         comment="Account creation timestamp"
     )
     last_login_at = Column(
         DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
         index=True,
         comment="Last login timestamp"
     )
@@ -219,9 +305,9 @@ class UserProfile(Base):
 
     # Additional metadata
     extra_metadata = Column(
-        JSON,
+        MutableJSONDict,
         nullable=False,
-        default=dict,
+        server_default=_json_server_default({}),
         comment="Additional user metadata"
     )
 
@@ -252,16 +338,19 @@ class UserProfile(Base):
         cascade="all, delete-orphan"
     )
 
-    # Many-to-many relationships
+    # Many-to-many relationships. Loaded with selectin so serializing a list
+    # of profiles issues one IN query per collection rather than one per profile.
     installed_theme_objects = relationship(
         "ThemeConfiguration",
         secondary=user_theme_associations,
-        back_populates="user_profiles"
+        back_populates="user_profiles",
+        lazy="selectin"
     )
     installed_extension_objects = relationship(
         "Extension",
         secondary=user_extension_associations,
-        back_populates="user_profiles"
+        back_populates="user_profiles",
+        lazy="selectin"
     )
 
     # Indexes for performance
@@ -270,17 +359,27 @@ class UserProfile(Base):
         Index("idx_user_profiles_email", "email"),
         Index("idx_user_profiles_last_login", "last_login_at"),
         Index("idx_user_profiles_storage", "storage_used"),
+        # Active users ordered by recency
+        Index("idx_user_profiles_active_login", "is_active", "last_login_at"),
+        Index(
+            "idx_user_profiles_active_partial",
+            "last_login_at",
+            postgresql_where=text("is_active"),
+        ).ddl_if(dialect="postgresql"),
     )
 
+    # JSON settings and timestamps are filled in by the database; fetch them
+    # during the flush so they are readable without an extra refresh
+    __mapper_args__ = {"eager_defaults": True}
+
     @validates('username')
     def validate_username(self, key: str, value: str) -> str:
         """Validate username format."""
-        if not value or len(value) < 3 or len(value) > 50:
+        if not value or not 3 <= len(value) <= 50:
             raise ValueError("Username must be between 3 and 50 characters")
 
         # Allow alphanumeric, hyphens, underscores
-        username_pattern = r'^[a-zA-Z0-9_-]+$'
-        if not re.match(username_pattern, value):
+        if value.translate(_USERNAME_ALLOWED_CHARS):
             raise ValueError("Username can only contain alphanumeric characters, hyphens, and underscores")
 
         return value.lower()  # Normalize to lowercase
@@ -288,17 +387,21 @@ class UserProfile(Base):
     @validates('email')
     def validate_email(self, key: str, value: str) -> str:
         """Validate email format."""
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, value):
+        # Cheap substring checks reject obviously invalid input before the regex
+        if '@' not in value or '.' not in value or not _EMAIL_RE.fullmatch(value):
             raise ValueError(f"Invalid email format: {value}")
         return value.lower()  # Normalize to lowercase
 
     @validates('display_name')
     def validate_display_name(self, key: str, value: str) -> str:
         """Validate display name."""
-        if not value or len(value.strip()) < 1 or len(value) > 100:
+        if not value or len(value) > 100:
             raise ValueError("Display name must be between 1 and 100 characters")
-        return value.strip()
+
+        stripped = value.strip()
+        if not stripped:
+            raise ValueError("Display name must be between 1 and 100 characters")
+        return stripped
 
     @validates('avatar_url')
     def validate_avatar_url(self, key: str, value: Optional[str]) -> Optional[str]:
@@ -306,8 +409,7 @@ class UserProfile(Base):
         if value is None:
             return value
 
-        url_pattern = r'^https?://[^\s/$.?#].[^\s]*$'
-        if not re.match(url_pattern, value):
+        if not _AVATAR_URL_RE.fullmatch(value):
             raise ValueError(f"Invalid avatar URL format: {value}")
 
         return value
@@ -374,6 +476,14 @@ class UserProfile(Base):
         if hasattr(self, 'storage_quota') and self.storage_quota and value > self.storage_quota:
             raise ValueError("Storage used cannot exceed storage quota")
 
+        # The stored percentage is stale until the next flush fetches it again
+        self.__dict__.pop('storage_used_pct', None)
+        return value
+
+    @validates('storage_quota')
+    def validate_storage_quota(self, key: str, value: int) -> int:
+        """Invalidate the stored usage percentage when the quota changes."""
+        self.__dict__.pop('storage_used_pct', None)
         return value
 
     @validates('performance_metric_refresh_interval')
@@ -401,6 +511,9 @@ class UserProfile(Base):
 
     def calculate_storage_usage_percent(self) -> float:
         """Calculate storage usage as a percentage."""
+        stored = self.__dict__.get('storage_used_pct')
+        if stored is not None:
+            return float(stored)
         if not self.storage_quota or self.storage_quota == 0:
             return 0.0
         return (self.storage_used / self.storage_quota) * 100.0
@@ -427,76 +540,154 @@ class UserProfile(Base):
     @property
     def installed_themes(self) -> List[str]:
         """Get list of installed theme IDs."""
-        return [theme.theme_id for theme in self.installed_theme_objects or []]
+        return [theme.theme_id for theme in self.installed_theme_objects]
 
     @property
     def installed_extensions(self) -> List[str]:
         """Get list of installed extension IDs."""
-        return [ext.extension_id for ext in self.installed_extension_objects or []]
+        return [ext.extension_id for ext in self.installed_extension_objects]
+
+    @classmethod
+    def profile_query(cls, with_themes: bool = True) -> Select:
+        """
+        Build a profile query, optionally skipping the installed collections.
+
+        With ``with_themes=False`` the installed themes and extensions are not
+        loaded and read as empty, for callers such as authentication that only
+        need the profile's own columns.
+        """
+        query = select(cls)
+        if not with_themes:
+            query = query.options(noload(cls.installed_theme_objects), noload(cls.installed_extension_objects))
+        return query
+
+    @classmethod
+    def installed_theme_ids_query(cls, user_id: str) -> Select:
+        """Build a query selecting only the IDs of a user's installed themes."""
+        return select(user_theme_associations.c.theme_id).where(
+            user_theme_associations.c.user_id == user_id
+        )
+
+    @classmethod
+    def installed_extension_ids_query(cls, user_id: str) -> Select:
+        """Build a query selecting only the IDs of a user's installed extensions."""
+        return select(user_extension_associations.c.extension_id).where(
+            user_extension_associations.c.user_id == user_id
+        )
+
+    def _installed_index(self, collection_name: str) -> Dict[str, Any]:
+        """
+        Get the ID-keyed index of an installed theme or extension collection.
+
+        Built from the collection on first use and kept in sync by the
+        collection's append/remove events, so membership checks and lookups
+        by ID do not scan the list. Items whose ID has not been assigned yet
+        are left out, and the index is only kept once every item has an ID,
+        so themes and extensions are indexed after the flush that gives them
+        their IDs.
+        """
+        index_name, key = _INSTALLED_INDEXES[collection_name]
+        index = self.__dict__.get(index_name)
+        if index is None:
+            items = getattr(self, collection_name)
+            index = {}
+            for item in items:
+                item_id = getattr(item, key)
+                if item_id is not None:
+                    index[item_id] = item
+            if len(index) == len(items):
+                self.__dict__[index_name] = index
+        return index
+
+    def _is_installed(self, collection_name: str, item: Any) -> bool:
+        """Check whether an item is installed, by ID or, before it has one, by identity."""
+        _, key = _INSTALLED_INDEXES[collection_name]
+        item_id = getattr(item, key)
+        if item_id is None:
+            return any(installed is item for installed in getattr(self, collection_name))
+        return item_id in self._installed_index(collection_name)
 
     def install_theme(self, theme_object) -> bool:
         """Install a theme."""
-        if theme_object not in (self.installed_theme_objects or []):
-            if not self.installed_theme_objects:
-                self.installed_theme_objects = []
-            self.installed_theme_objects.append(theme_object)
-            return True
-        return False
+        if self._is_installed("installed_theme_objects", theme_object):
+            return False
+        self.installed_theme_objects.append(theme_object)
+        return True
 
     def uninstall_theme(self, theme_id: str) -> bool:
         """Uninstall a theme."""
-        if self.installed_theme_objects:
-            for theme in self.installed_theme_objects:
-                if theme.theme_id == theme_id:
-                    self.installed_theme_objects.remove(theme)
+        theme = self._installed_index("installed_theme_objects").get(theme_id)
+        if theme is None:
+            return False
+        self.installed_theme_objects.remove(theme)
 
-                    # Clear active theme if it's being uninstalled
-                    if self.active_theme_id == theme_id:
-                        self.active_theme_id = None
+        # Clear active theme if it's being uninstalled
+        if self.active_theme_id == theme_id:
+            self.active_theme_id = None
 
-                    return True
-        return False
+        return True
 
     def install_extension(self, extension_object) -> bool:
         """Install an extension."""
-        if extension_object not in (self.installed_extension_objects or []):
-            if not self.installed_extension_objects:
-                self.installed_extension_objects = []
-            self.installed_extension_objects.append(extension_object)
-            return True
-        return False
+        if self._is_installed("installed_extension_objects", extension_object):
+            return False
+        self.installed_extension_objects.append(extension_object)
+        return True
 
     def uninstall_extension(self, extension_id: str) -> bool:
         """Uninstall an extension."""
-        if self.installed_extension_objects:
-            for ext in self.installed_extension_objects:
-                if ext.extension_id == extension_id:
-                    self.installed_extension_objects.remove(ext)
-                    return True
-        return False
+        ext = self._installed_index("installed_extension_objects").get(extension_id)
+        if ext is None:
+            return False
+        self.installed_extension_objects.remove(ext)
+        return True
 
     def set_active_theme(self, theme_id: str) -> None:
         """Set the active theme."""
-        if theme_id and theme_id not in self.installed_themes:
+        if theme_id and theme_id not in self._installed_index("installed_theme_objects"):
             raise ValueError("Cannot activate theme that is not installed")
         self.active_theme_id = theme_id
 
     def update_preference(self, category: str, key: str, value: Any) -> None:
         """Update a specific preference."""
-        current_prefs = dict(self.preferences or {})
-        if category not in current_prefs:
-            current_prefs[category] = {}
+        if self.preferences is None:
+            self.preferences = {}
 
-        current_prefs[category][key] = value
-        self.preferences = current_prefs
+        # Only the touched category is copied; assigning it back on the
+        # mutable preferences dict marks the column as changed
+        category_prefs = {**self.preferences.get(category, {}), key: value}
+        self.validate_preferences("preferences", {category: category_prefs})
+        self.preferences[category] = category_prefs
 
     def get_preference(self, category: str, key: str, default: Any = None) -> Any:
         """Get a specific preference value."""
         prefs = self.preferences or {}
         return prefs.get(category, {}).get(key, default)
 
+    def _snapshot(self) -> Dict[str, Any]:
+        """Compute the derived values shared by the profile serializers once."""
+        created_at = self.created_at
+        last_login_at = self.last_login_at
+        return {
+            "installed_themes": self.installed_themes,
+            "installed_extensions": self.installed_extensions,
+            "created_at": created_at.isoformat() if created_at else None,
+            "last_login_at": last_login_at.isoformat() if last_login_at else None,
+            "storage_usage_percent": round(self.calculate_storage_usage_percent(), 2),
+            "remaining_storage": self.get_remaining_storage()
+        }
+
+    def _sensitive_fields(self) -> Dict[str, Any]:
+        """Get the fields only included in sensitive exports."""
+        return {
+            "email": self.email,
+            "privacy_settings": self.privacy_settings,
+            "extra_metadata": self.extra_metadata
+        }
+
     def export_profile(self, include_sensitive: bool = False) -> Dict[str, Any]:
         """Export user profile data."""
+        snapshot = self._snapshot()
         data = {
             "username": self.username,
             "display_name": self.display_name,
@@ -505,56 +696,50 @@ class UserProfile(Base):
             "recording_settings": self.recording_settings,
             "keyboard_shortcuts": self.keyboard_shortcuts,
             "default_shell": self.default_shell,
-            "installed_themes": self.installed_themes,
-            "installed_extensions": self.installed_extensions,
+            "installed_themes": snapshot["installed_themes"],
+            "installed_extensions": snapshot["installed_extensions"],
             "active_theme_id": self.active_theme_id,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": snapshot["created_at"]
         }
 
         if include_sensitive:
-            data.update({
-                "email": self.email,
-                "privacy_settings": self.privacy_settings,
-                "extra_metadata": self.extra_metadata
-            })
+            data.update(self._sensitive_fields())
 
         return data
 
-    def get_account_summary(self) -> Dict[str, Any]:
+    def get_account_summary(self) -> AccountSummary:
         """Get account summary information."""
-        return {
-            "user_id": self.user_id,
-            "username": self.username,
-            "display_name": self.display_name,
-            "email": self.email,
-            "avatar_url": self.avatar_url,
-            "is_active": self.is_active,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "last_login_at": self.last_login_at.isoformat() if self.last_login_at else None,
-            "storage_usage": {
-                "used": self.storage_used,
-                "quota": self.storage_quota,
-                "percent": round(self.calculate_storage_usage_percent(), 2),
-                "remaining": self.get_remaining_storage()
-            },
-            "installed_count": {
-                "themes": len(self.installed_themes),
-                "extensions": len(self.installed_extensions)
-            },
-            "active_theme_id": self.active_theme_id,
-            "default_shell": self.default_shell
-        }
+        snapshot = self._snapshot()
+        return AccountSummary(
+            user_id=self.user_id,
+            username=self.username,
+            display_name=self.display_name,
+            email=self.email,
+            avatar_url=self.avatar_url,
+            is_active=self.is_active,
+            created_at=snapshot["created_at"],
+            last_login_at=snapshot["last_login_at"],
+            storage_used=self.storage_used,
+            storage_quota=self.storage_quota,
+            storage_percent=snapshot["storage_usage_percent"],
+            storage_remaining=snapshot["remaining_storage"],
+            themes_installed=len(self.installed_theme_objects),
+            extensions_installed=len(self.installed_extension_objects),
+            active_theme_id=self.active_theme_id,
+            default_shell=self.default_shell
+        )
 
     def to_dict(self, include_sensitive: bool = False) -> Dict[str, Any]:
         """Convert user profile to dictionary representation."""
+        snapshot = self._snapshot()
         result = {
             "user_id": self.user_id,
             "username": self.username,
             "display_name": self.display_name,
             "avatar_url": self.avatar_url,
             "preferences": self.preferences,
-            "installed_themes": self.installed_themes,
-            "installed_extensions": self.installed_extensions,
+            "installed_themes": snapshot["installed_themes"],
+            "installed_extensions": snapshot["installed_extensions"],
             "active_theme_id": self.active_theme_id,
             "default_shell": self.default_shell,
             "keyboard_shortcuts": self.keyboard_shortcuts,
@@ -562,19 +747,15 @@ class UserProfile(Base):
             "recording_settings": self.recording_settings,
             "storage_quota": self.storage_quota,
             "storage_used": self.storage_used,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "last_login_at": self.last_login_at.isoformat() if self.last_login_at else None,
+            "created_at": snapshot["created_at"],
+            "last_login_at": snapshot["last_login_at"],
             "is_active": self.is_active,
-            "storage_usage_percent": round(self.calculate_storage_usage_percent(), 2),
-            "remaining_storage": self.get_remaining_storage()
+            "storage_usage_percent": snapshot["storage_usage_percent"],
+            "remaining_storage": snapshot["remaining_storage"]
         }
 
         if include_sensitive:
-            result.update({
-                "email": self.email,
-                "privacy_settings": self.privacy_settings,
-                "extra_metadata": self.extra_metadata
-            })
+            result.update(self._sensitive_fields())
 
         return result
 
@@ -584,4 +765,42 @@ class UserProfile(Base):
             f"<UserProfile(user_id='{self.user_id}', "
             f"username='{self.username}', email='{self.email}', "
             f"is_active={self.is_active}, storage_used={self.storage_used})>"
-        )
\ No newline at end of file
+        )
+
+
+def _track_installed_index(collection_name: str) -> None:
+    """Keep a profile's ID index in step with changes to an installed collection."""
+    index_name, key = _INSTALLED_INDEXES[collection_name]
+    attribute = getattr(UserProfile, collection_name)
+
+    @event.listens_for(attribute, "append")
+    def _index_appended(target: UserProfile, value: Any, initiator: Any) -> None:
+        index = target.__dict__.get(index_name)
+        if index is not None and value is not None:
+            value_id = getattr(value, key)
+            if value_id is None:
+                # Rebuilt once the new item has been flushed and has an ID
+                del target.__dict__[index_name]
+            else:
+                index[value_id] = value
+
+    @event.listens_for(attribute, "remove")
+    def _unindex_removed(target: UserProfile, value: Any, initiator: Any) -> None:
+        index = target.__dict__.get(index_name)
+        if index is not None and value is not None:
+            index.pop(getattr(value, key), None)
+
+
+for _collection_name in _INSTALLED_INDEXES:
+    _track_installed_index(_collection_name)
+
+
+@event.listens_for(UserProfile, "expire")
+@event.listens_for(UserProfile, "refresh")
+def _drop_installed_indexes(target: UserProfile, *args: Any) -> None:
+    """Discard ID indexes when the collections they mirror are reloaded."""
+    if target is None:
+        # Expiry can reach instances that have already been garbage collected
+        return
+    for index_name, _ in _INSTALLED_INDEXES.values():
+        target.__dict__.pop(index_name, None)
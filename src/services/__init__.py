@@ -1,29 +1,43 @@
-"""Web Terminal core services."""
-
-from .pty_service import PTYService
-from .media_service import MediaService
-from .recording_service import RecordingService
-from .ai_service import AIService
-from .theme_service import ThemeService
-from .extension_service import ExtensionService
-from .ebook_service import EbookService, get_ebook_service
-from .performance_service import PerformanceService, get_performance_service
-from .image_loader_service import ImageLoaderService
-from .image_editor_service import ImageEditorService
-from .session_history_service import SessionHistoryService
-
-__all__ = [
-    "PTYService",
-    "MediaService",
-    "RecordingService",
-    "AIService",
-    "ThemeService",
-    "ExtensionService",
-    "EbookService",
-    "get_ebook_service",
-    "PerformanceService",
-    "get_performance_service",
-    "ImageLoaderService",
-    "ImageEditorService",
-    "SessionHistoryService",
-]
\ No newline at end of file
+"""Web Terminal core services.
+
+Services are imported on first attribute access (PEP 562), so importing one
+service does not pull in the optional dependencies of all the others.
+"""
+
+import importlib
+from typing import Any, List
+
+# Exported name -> submodule that defines it
+_LAZY_EXPORTS = {
+    "PTYService": "pty_service",
+    "MediaService": "media_service",
+    "RecordingService": "recording_service",
+    "AIService": "ai_service",
+    "ThemeService": "theme_service",
+    "ExtensionService": "extension_service",
+    "EbookService": "ebook_service",
+    "get_ebook_service": "ebook_service",
+    "PerformanceService": "performance_service",
+    "get_performance_service": "performance_service",
+    "ImageLoaderService": "image_loader_service",
+    "ImageEditorService": "image_editor_service",
+    "SessionHistoryService": "session_history_service",
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    """Import the submodule defining a service on first access."""
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    """List module attributes including services not yet imported."""
+    return sorted(set(globals()) | set(__all__))
@@ -6,42 +6,89 @@ and voice input/output capabilities.
 """
 
 import asyncio
-import json
+import functools
+import hashlib
+import heapq
+import importlib.util
+import itertools
 import logging
+import random
+import re
 import time
+import uuid
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import aclosing
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional, List, Union, Callable, AsyncGenerator
-from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Set, Tuple, TypeVar, Union, Callable, Awaitable, AsyncGenerator, AsyncIterator, BinaryIO
+from dataclasses import dataclass, field, replace
 from enum import Enum
 
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, insert, inspect as sa_inspect, select, update
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.models.ai_context import AIContext, AIContextMessage
+from src.models.terminal_session import TerminalSession
+from src.database.base import AsyncSessionLocal
+from src.utils import fast_json
+
+if TYPE_CHECKING:
+    import tiktoken
+
+# The provider SDKs and tokenizer are slow to import, so only their presence is
+# checked here; each is imported when a provider first needs it
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+ANTHROPIC_AVAILABLE = importlib.util.find_spec("anthropic") is not None
+TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+# httpx imports h2 itself when an HTTP/2 client is created
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
 
 try:
-    import anthropic
-    ANTHROPIC_AVAILABLE = True
+    import httpx
+    HTTPX_AVAILABLE = True
 except ImportError:
-    ANTHROPIC_AVAILABLE = False
+    HTTPX_AVAILABLE = False
 
 try:
-    import aiohttp
-    AIOHTTP_AVAILABLE = True
+    import blake3
+    BLAKE3_AVAILABLE = True
 except ImportError:
-    AIOHTTP_AVAILABLE = False
+    BLAKE3_AVAILABLE = False
 
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
 
-from src.models.ai_context import AIContext
-from src.models.terminal_session import TerminalSession
-from src.database.base import AsyncSessionLocal
+logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
-logger = logging.getLogger(__name__)
+# Seconds to collect context changes before writing them in one transaction
+CONTEXT_FLUSH_DELAY = 0.05
+# Seconds to wait before retrying a failed context write
+CONTEXT_RETRY_DELAY = 1.0
+
+# Bounds for the in-memory AI context cache
+CONTEXT_CACHE_SIZE = 10_000
+CONTEXT_CACHE_TTL = 600.0  # seconds
+
+# Number of recent terminal commands included with each request
+TERMINAL_CONTEXT_COMMANDS = 3
+
+# Words used to match terminal commands against the user's question
+_WORD_RE = re.compile(r"[\w./-]+")
+
+# A suggestion line: a bullet or list number, then "command: description"
+_SUGGESTION_RE = re.compile(r"^\s*(?:[-•]|\d+[.)])\s*([^:\n]+?):[ \t]*(.+)$", re.MULTILINE)
+
+# Base delay in seconds before retrying a rate-limited provider call
+RATE_LIMIT_BACKOFF = 0.5
+
+# Streamed chunks read ahead of a slow consumer
+STREAM_BUFFER_SIZE = 256
+
+# Conversation history sent per request grows from HISTORY_WINDOW messages
+# up to twice that before older messages are dropped
+HISTORY_WINDOW = 10
 
 
 class AIProvider(str, Enum):
@@ -69,9 +116,13 @@ class MessageRole(str, Enum):
     SYSTEM = "system"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AIConfig:
-    """AI service configuration."""
+    """AI service configuration.
+
+    Frozen, so a service's settings cannot change under in-flight requests
+    and configs can be used as dictionary keys.
+    """
     default_provider: AIProvider = AIProvider.OPENAI
     openai_api_key: Optional[str] = None
     anthropic_api_key: Optional[str] = None
@@ -86,9 +137,17 @@ class AIConfig:
     enable_voice: bool = True
     enable_streaming: bool = True
     context_window: int = 8192
+    response_cache_size: int = 1024  # 0 disables the response cache
+    response_cache_ttl: float = 3600.0  # seconds
+    response_cache_max_temperature: float = 0.1  # only near-deterministic calls are cached
+    rate_limit_per_minute: float = 600.0  # requests per provider and model
+    rate_limit_burst: int = 20
+    rate_limit_retries: int = 2
+    prompt_cache_size: int = 1024  # 0 disables caching of suggestions and explanations
+    prompt_cache_ttl: float = 600.0  # seconds
 
 
-@dataclass
+@dataclass(slots=True)
 class AIMessage:
     """AI conversation message."""
     message_id: str
@@ -118,7 +177,7 @@ class AIMessage:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class AIResponse:
     """AI response with metadata."""
     content: str
@@ -152,6 +211,173 @@ class AIProviderQuotaError(AIProviderError):
     pass
 
 
+@functools.lru_cache(maxsize=32)
+def _get_encoding(model: str) -> Optional["tiktoken.Encoding"]:
+    """Get the BPE encoding for a model, defaulting to cl100k_base for unknown models.
+
+    Returns None when the encoding cannot be loaded, e.g. when its BPE file
+    has to be downloaded while offline.
+    """
+    import tiktoken
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Failed to load tokenizer for {model}, estimating tokens from length: {e}")
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _count_tokens(model: str, text: str) -> int:
+    """Count tokens in text, approximating ~4 characters per token without a tokenizer."""
+    encoding = _get_encoding(model) if TIKTOKEN_AVAILABLE else None
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+async def _iter_sse_data(lines: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+    """Yield the data payload of each complete server-sent event.
+
+    An event ends at a blank line; multi-line data fields are joined with
+    newlines as the SSE spec requires. Comments and other fields are ignored.
+    """
+    data_lines: List[str] = []
+    async for line in lines:
+        if not line:
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+        elif line.startswith("data:"):
+            data = line[5:]
+            data_lines.append(data[1:] if data.startswith(" ") else data)
+
+    # Servers may close the stream without a trailing blank line
+    if data_lines:
+        yield "\n".join(data_lines)
+
+
+async def _buffered_stream(source: AsyncIterator[T],
+                           maxsize: int = STREAM_BUFFER_SIZE) -> AsyncGenerator[T, None]:
+    """Read an async iterator in a background task, up to maxsize items ahead.
+
+    The source keeps being read while the consumer is busy delivering
+    earlier items. Errors from the source are raised to the consumer, and
+    closing or cancelling the consumer cancels the read.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    end = object()
+
+    async def produce() -> None:
+        try:
+            async for item in source:
+                await queue.put((item, None))
+            await queue.put((end, None))
+        except Exception as e:
+            await queue.put((end, e))
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        producer.cancel()
+
+
+async def _single_flight(inflight: Dict[str, asyncio.Future], key: str,
+                         call: Callable[[], Awaitable[T]]) -> T:
+    """Run call once for concurrent callers using the same key.
+
+    The first caller runs it; callers arriving while it is in flight await
+    the same result (or exception) instead of repeating the work.
+    """
+    while (pending := inflight.get(key)) is not None:
+        try:
+            # Shielded so a cancelled follower does not cancel the shared call
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            # The caller running it was cancelled (e.g. its deadline passed); run it again
+
+    pending = asyncio.get_running_loop().create_future()
+    inflight[key] = pending
+    try:
+        result = await call()
+        pending.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        pending.cancel()
+        raise
+    except Exception as e:
+        pending.set_exception(e)
+        # Mark the exception retrieved so asyncio does not warn when nobody was waiting
+        pending.exception()
+        raise
+    finally:
+        del inflight[key]
+
+
+def _relevant_commands(commands: List[Dict[str, Any]], query: str, k: int) -> List[Dict[str, Any]]:
+    """Pick the k terminal commands most relevant to a query, in chronological order.
+
+    Commands are ranked by how many words of the query appear in the command
+    line or its output, with recency breaking ties, so a question about an
+    earlier failure still sees that command. Without any overlap this is
+    simply the last k commands.
+    """
+    if len(commands) <= k:
+        return commands
+
+    query_words = set(_WORD_RE.findall(query.lower()))
+    scored = []
+    for index, cmd in enumerate(commands):
+        text = f"{cmd.get('command', '')} {cmd.get('output', '')}".lower()
+        overlap = len(query_words.intersection(_WORD_RE.findall(text)))
+        scored.append((overlap, index))
+
+    top = sorted(index for _, index in heapq.nlargest(k, scored))
+    return [commands[index] for index in top]
+
+
+def _output_head(output: Union[str, bytes, BinaryIO], limit: int) -> str:
+    """Get the start of command output as text.
+
+    Bytes are sliced before decoding and streams are read only up to the
+    limit, so large output is never decoded or read in full. Both are cut at
+    limit bytes, which never exceeds limit characters.
+    """
+    if isinstance(output, str):
+        return output[:limit]
+    head = output[:limit] if isinstance(output, bytes) else output.read(limit)
+    return head.decode(errors="replace")
+
+
+def _create_http_client(timeout: float) -> "httpx.AsyncClient":
+    """Create a pooled HTTP client, multiplexing over HTTP/2 when h2 is installed.
+
+    The timeout bounds each connect, read and write rather than the whole
+    request, so long streamed responses are only cut off when they stall.
+    """
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=32,
+            keepalive_expiry=60
+        ),
+        timeout=timeout
+    )
+
+
 class BaseAIProvider(ABC):
     """Abstract base class for AI providers."""
 
@@ -178,6 +404,10 @@ class BaseAIProvider(ABC):
         """Validate provider connection and credentials."""
         pass
 
+    async def close(self) -> None:
+        """Release network resources held by the provider."""
+        pass
+
 
 class OpenAIProvider(BaseAIProvider):
     """OpenAI API provider implementation."""
@@ -190,10 +420,23 @@ class OpenAIProvider(BaseAIProvider):
         if not config.openai_api_key:
             raise AIProviderError("OpenAI API key not provided")
 
-        openai.api_key = config.openai_api_key
+        import openai
+
+        # One client per provider so requests share pooled (HTTP/2) connections
+        self.client = openai.AsyncOpenAI(
+            api_key=config.openai_api_key,
+            timeout=config.timeout,
+            http_client=_create_http_client(config.timeout) if HTTPX_AVAILABLE else None
+        )
+
+    async def close(self) -> None:
+        """Close the OpenAI client and its connections."""
+        await self.client.close()
 
     async def generate_response(self, messages: List[AIMessage], **kwargs) -> AIResponse:
         """Generate response using OpenAI API."""
+        import openai
+
         start_time = time.time()
 
         try:
@@ -201,12 +444,11 @@ class OpenAIProvider(BaseAIProvider):
             openai_messages = self._convert_messages(messages)
 
             # Make API call
-            response = await openai.ChatCompletion.acreate(
+            response = await self.client.chat.completions.create(
                 model=kwargs.get("model", self.config.default_model),
                 messages=openai_messages,
                 max_tokens=kwargs.get("max_tokens", self.config.max_tokens),
-                temperature=kwargs.get("temperature", self.config.temperature),
-                timeout=self.config.timeout
+                temperature=kwargs.get("temperature", self.config.temperature)
             )
 
             processing_time = time.time() - start_time
@@ -224,13 +466,13 @@ class OpenAIProvider(BaseAIProvider):
                 metadata={
                     "model": response.model,
                     "finish_reason": choice.finish_reason,
-                    "usage": response.usage
+                    "usage": response.usage.model_dump()
                 }
             )
 
         except openai.RateLimitError as e:
             raise AIProviderRateLimitError(f"OpenAI rate limit exceeded: {e}")
-        except openai.InvalidRequestError as e:
+        except openai.BadRequestError as e:
             raise AIProviderError(f"OpenAI invalid request: {e}")
         except Exception as e:
             processing_time = time.time() - start_time
@@ -246,32 +488,42 @@ class OpenAIProvider(BaseAIProvider):
         try:
             openai_messages = self._convert_messages(messages)
 
-            response = await openai.ChatCompletion.acreate(
+            stream = await self.client.chat.completions.create(
                 model=kwargs.get("model", self.config.default_model),
                 messages=openai_messages,
                 max_tokens=kwargs.get("max_tokens", self.config.max_tokens),
                 temperature=kwargs.get("temperature", self.config.temperature),
-                stream=True,
-                timeout=self.config.timeout
+                stream=True
             )
 
-            async for chunk in response:
-                if chunk.choices[0].delta.get("content"):
-                    yield chunk.choices[0].delta.content
+            # Network reads run ahead of a slow consumer
+            async with aclosing(_buffered_stream(self._iter_deltas(stream))) as deltas:
+                async for delta in deltas:
+                    yield delta
 
         except Exception as e:
             logger.error(f"OpenAI streaming error: {e}")
             yield f"Error: {e}"
 
+    @staticmethod
+    async def _iter_deltas(stream) -> AsyncGenerator[str, None]:
+        """Yield the text deltas of a chat completion stream."""
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Release the connection when the stream is abandoned early
+            await stream.close()
+
     async def estimate_tokens(self, text: str) -> int:
-        """Estimate token count (rough approximation)."""
-        # Simple approximation: ~4 characters per token
-        return len(text) // 4
+        """Estimate token count with the model's tokenizer."""
+        return _count_tokens(self.config.default_model, text)
 
     async def validate_connection(self) -> bool:
         """Validate OpenAI connection."""
         try:
-            await openai.Model.alist()
+            await self.client.models.list()
             return True
         except Exception as e:
             logger.error(f"OpenAI connection validation failed: {e}")
@@ -296,22 +548,23 @@ class AnthropicProvider(BaseAIProvider):
         if not config.anthropic_api_key:
             raise AIProviderError("Anthropic API key not provided")
 
+        import anthropic
+
         self.client = anthropic.AsyncAnthropic(api_key=config.anthropic_api_key)
 
     async def generate_response(self, messages: List[AIMessage], **kwargs) -> AIResponse:
         """Generate response using Anthropic API."""
+        import anthropic
+
         start_time = time.time()
 
         try:
-            # Convert messages to Anthropic format
-            anthropic_messages = self._convert_messages(messages)
-
             # Make API call
             response = await self.client.messages.create(
                 model=kwargs.get("model", "claude-3-sonnet-20240229"),
-                messages=anthropic_messages,
                 max_tokens=kwargs.get("max_tokens", self.config.max_tokens),
-                temperature=kwargs.get("temperature", self.config.temperature)
+                temperature=kwargs.get("temperature", self.config.temperature),
+                **self._request_messages(messages)
             )
 
             processing_time = time.time() - start_time
@@ -341,13 +594,11 @@ class AnthropicProvider(BaseAIProvider):
     async def stream_response(self, messages: List[AIMessage], **kwargs) -> AsyncGenerator[str, None]:
         """Stream response using Anthropic API."""
         try:
-            anthropic_messages = self._convert_messages(messages)
-
             async with self.client.messages.stream(
                 model=kwargs.get("model", "claude-3-sonnet-20240229"),
-                messages=anthropic_messages,
                 max_tokens=kwargs.get("max_tokens", self.config.max_tokens),
-                temperature=kwargs.get("temperature", self.config.temperature)
+                temperature=kwargs.get("temperature", self.config.temperature),
+                **self._request_messages(messages)
             ) as stream:
                 async for text in stream.text_stream:
                     yield text
@@ -382,6 +633,30 @@ class AnthropicProvider(BaseAIProvider):
             if msg.role != MessageRole.SYSTEM  # Anthropic handles system prompts differently
         ]
 
+    def _request_messages(self, messages: List[AIMessage]) -> Dict[str, Any]:
+        """Build the system and messages request parameters.
+
+        Cache breakpoints are set on the system prompt and on the last history
+        message, so the stable prefix is read from Anthropic's prompt cache
+        and only the current turn is processed from scratch.
+        """
+        ephemeral = {"type": "ephemeral"}
+        params: Dict[str, Any] = {}
+
+        system_prompt = "\n\n".join(msg.content for msg in messages if msg.role == MessageRole.SYSTEM)
+        if system_prompt:
+            params["system"] = [{"type": "text", "text": system_prompt, "cache_control": ephemeral}]
+
+        anthropic_messages = self._convert_messages(messages)
+        if len(anthropic_messages) > 1:
+            prefix_end = anthropic_messages[-2]
+            prefix_end["content"] = [
+                {"type": "text", "text": prefix_end["content"], "cache_control": ephemeral}
+            ]
+        params["messages"] = anthropic_messages
+
+        return params
+
 
 class LocalProvider(BaseAIProvider):
     """Local AI provider implementation (OpenAI-compatible endpoints).
@@ -397,8 +672,8 @@ class LocalProvider(BaseAIProvider):
 
     def __init__(self, config: AIConfig):
         super().__init__(config)
-        if not AIOHTTP_AVAILABLE:
-            raise AIProviderError("aiohttp library not available")
+        if not HTTPX_AVAILABLE:
+            raise AIProviderError("httpx library not available")
 
         if not config.local_endpoint:
             raise AIProviderError("Local endpoint not provided")
@@ -406,6 +681,26 @@ class LocalProvider(BaseAIProvider):
         self.endpoint = config.local_endpoint
         self.api_key = config.local_api_key  # Optional, for providers that need auth
 
+        # Shared HTTP client so requests reuse pooled keep-alive connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_lock = asyncio.Lock()
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use."""
+        if self._client is not None and not self._client.is_closed:
+            return self._client
+
+        async with self._client_lock:
+            if self._client is None or self._client.is_closed:
+                self._client = _create_http_client(self.config.timeout)
+            return self._client
+
+    async def close(self) -> None:
+        """Close the shared HTTP client."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
     async def generate_response(self, messages: List[AIMessage], **kwargs) -> AIResponse:
         """Generate response using local endpoint."""
         start_time = time.time()
@@ -416,37 +711,35 @@ class LocalProvider(BaseAIProvider):
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "model": kwargs.get("model", self.config.default_model),
-                    "messages": self._convert_messages(messages),
-                    "max_tokens": kwargs.get("max_tokens", self.config.max_tokens),
-                    "temperature": kwargs.get("temperature", self.config.temperature)
-                }
+            client = await self._get_client()
+            payload = {
+                "model": kwargs.get("model", self.config.default_model),
+                "messages": self._convert_messages(messages),
+                "max_tokens": kwargs.get("max_tokens", self.config.max_tokens),
+                "temperature": kwargs.get("temperature", self.config.temperature)
+            }
 
-                async with session.post(
-                    f"{self.endpoint}/v1/chat/completions",
-                    json=payload,
-                    headers=headers,
-                    timeout=self.config.timeout
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        processing_time = time.time() - start_time
-
-                        choice = data["choices"][0]
-                        return AIResponse(
-                            content=choice["message"]["content"],
-                            tokens=data.get("usage", {}).get("total_tokens", 0),
-                            processing_time=processing_time,
-                            confidence=1.0,
-                            metadata={"model": data.get("model", "unknown")}
-                        )
-                    else:
-                        error_text = await response.text()
-                        raise AIProviderError(f"Local API error: {response.status} - {error_text}")
+            response = await client.post(
+                f"{self.endpoint}/v1/chat/completions",
+                content=fast_json.dumps_bytes(payload),
+                headers=headers
+            )
+            if response.status_code == 200:
+                data = fast_json.loads(response.content)
+                processing_time = time.time() - start_time
 
-        except asyncio.TimeoutError:
+                choice = data["choices"][0]
+                return AIResponse(
+                    content=choice["message"]["content"],
+                    tokens=data.get("usage", {}).get("total_tokens", 0),
+                    processing_time=processing_time,
+                    confidence=1.0,
+                    metadata={"model": data.get("model", "unknown")}
+                )
+            else:
+                raise AIProviderError(f"Local API error: {response.status_code} - {response.text}")
+
+        except (asyncio.TimeoutError, httpx.TimeoutException):
             raise AIProviderTimeoutError("Local AI request timed out")
         except Exception as e:
             processing_time = time.time() - start_time
@@ -465,36 +758,40 @@ class LocalProvider(BaseAIProvider):
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "model": kwargs.get("model", self.config.default_model),
-                    "messages": self._convert_messages(messages),
-                    "stream": True
-                }
+            client = await self._get_client()
+            payload = {
+                "model": kwargs.get("model", self.config.default_model),
+                "messages": self._convert_messages(messages),
+                "stream": True
+            }
 
-                async with session.post(
-                    f"{self.endpoint}/v1/chat/completions",
-                    json=payload,
-                    headers=headers
-                ) as response:
-                    async for line in response.content:
-                        if line.startswith(b"data: "):
-                            try:
-                                data = json.loads(line[6:])
-                                if "choices" in data and data["choices"]:
-                                    delta = data["choices"][0].get("delta", {})
-                                    if "content" in delta:
-                                        yield delta["content"]
-                            except json.JSONDecodeError:
-                                continue
+            async with client.stream(
+                "POST",
+                f"{self.endpoint}/v1/chat/completions",
+                content=fast_json.dumps_bytes(payload),
+                headers=headers
+            ) as response:
+                async for data in _iter_sse_data(response.aiter_lines()):
+                    if data == "[DONE]":
+                        break
+                    try:
+                        event = fast_json.loads(data)
+                    except ValueError:
+                        continue
+
+                    choices = event.get("choices")
+                    if choices:
+                        content = choices[0].get("delta", {}).get("content")
+                        if content:
+                            yield content
 
         except Exception as e:
             logger.error(f"Local AI streaming error: {e}")
             yield f"Error: {e}"
 
     async def estimate_tokens(self, text: str) -> int:
-        """Estimate token count."""
-        return len(text) // 4
+        """Estimate token count, using an OpenAI tokenizer as the approximation."""
+        return _count_tokens(self.config.default_model, text)
 
     async def validate_connection(self) -> bool:
         """Validate local endpoint connection."""
@@ -503,13 +800,13 @@ class LocalProvider(BaseAIProvider):
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.endpoint}/v1/models",
-                    headers=headers,
-                    timeout=5
-                ) as response:
-                    return response.status == 200
+            client = await self._get_client()
+            response = await client.get(
+                f"{self.endpoint}/v1/models",
+                headers=headers,
+                timeout=5
+            )
+            return response.status_code == 200
         except Exception as e:
             logger.error(f"Local AI connection validation failed: {e}")
             return False
@@ -522,27 +819,225 @@ class LocalProvider(BaseAIProvider):
         ]
 
 
+class AsyncTokenBucket:
+    """Token bucket limiting the request rate to an AI provider.
+
+    The refill rate adapts AIMD-style: it is halved whenever the provider
+    reports a rate limit and recovers additively with each successful call,
+    so bursts back off before every queued request hits a 429.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.max_rate = rate_per_minute / 60.0
+        self.min_rate = self.max_rate / 64
+        self.rate = self.max_rate
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last update."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until the requested tokens are available and take them."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def record_rate_limited(self) -> None:
+        """Halve the refill rate after the provider rejected a request."""
+        self._refill()
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def record_success(self) -> None:
+        """Recover the refill rate by a fixed step after a successful request."""
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def _new_hasher():
+    """Create a hasher for cache keys.
+
+    BLAKE3 is several times faster than SHA-256 on long prompts; BLAKE2b is
+    the fastest hash in the standard library.
+    """
+    return blake3.blake3() if BLAKE3_AVAILABLE else hashlib.blake2b(digest_size=32)
+
+
+class ResponseCache:
+    """In-memory LRU cache of provider responses for repeated prompts.
+
+    Only responses to near-deterministic requests are stored; at higher
+    temperatures a repeated prompt is expected to produce a new answer.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expiry time, response)
+        self._entries: OrderedDict[str, Tuple[float, AIResponse]] = OrderedDict()
+
+    @staticmethod
+    def make_key(provider: AIProvider, model: str, messages: List[AIMessage],
+                 temperature: float, max_tokens: int) -> str:
+        """Hash the inputs that determine a provider response."""
+        hasher = _new_hasher()
+
+        # Keys are always built in the same order, so the encoding is
+        # canonical. Messages are hashed one at a time rather than encoded
+        # into one buffer; JSON arrays are self-delimiting, so the
+        # concatenation is unambiguous.
+        hasher.update(fast_json.dumps_bytes([provider, model, temperature, max_tokens]))
+        for msg in messages:
+            hasher.update(fast_json.dumps_bytes([msg.role.value, msg.content]))
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> Optional[AIResponse]:
+        """Get a cached response, marked as a cache hit."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return replace(response, metadata={**response.metadata, "cache_hit": True})
+
+    def put(self, key: str, response: AIResponse) -> None:
+        """Store a successful response, evicting the least recently used entry."""
+        if self.max_entries <= 0 or response.error or not response.content:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, response)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        self._entries.clear()
+
+
+def _context_state(context: AIContext) -> Dict[str, Any]:
+    """Get a context's column values apart from its key and message history."""
+    return {
+        attr.key: getattr(context, attr.key)
+        for attr in sa_inspect(AIContext).column_attrs
+        if attr.key not in ("context_id", "conversation_history")
+    }
+
+
 class ContextManager:
-    """Manages AI conversation context and terminal state."""
+    """Manages AI conversation context and terminal state.
+
+    Context changes are applied in memory immediately and written to the
+    database shortly afterwards: every context changed within
+    CONTEXT_FLUSH_DELAY is written in a single transaction, so a chat turn
+    costs one commit instead of one per message. Messages are stored as
+    ai_messages rows, so a write inserts the new messages rather than
+    rewriting the whole conversation history. A failed write is kept
+    queued and retried after CONTEXT_RETRY_DELAY.
+    """
 
-    def __init__(self):
-        self._context_cache: Dict[str, AIContext] = {}
+    def __init__(self, flush_delay: float = CONTEXT_FLUSH_DELAY,
+                 cache_size: int = CONTEXT_CACHE_SIZE, cache_ttl: float = CONTEXT_CACHE_TTL,
+                 retry_delay: float = CONTEXT_RETRY_DELAY):
+        # LRU cache of session ID -> (expiry time, context)
+        self._context_cache: OrderedDict[str, Tuple[float, AIContext]] = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache_hits = 0
+        self._cache_misses = 0
+        # Database loads in progress, shared by concurrent callers
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.flush_delay = flush_delay
+        self.retry_delay = retry_delay
+        # Contexts changed since the last write, by session ID
+        self._pending_writes: Dict[str, AIContext] = {}
+        # Messages added since the last write, and sessions whose stored
+        # messages must be trimmed to the in-memory history
+        self._pending_messages: Dict[str, List[Dict[str, Any]]] = {}
+        self._pending_prunes: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
 
     async def get_context(self, session_id: str) -> Optional[AIContext]:
         """Get AI context for session."""
-        if session_id in self._context_cache:
-            return self._context_cache[session_id]
+        context = self._get_cached(session_id)
+        if context is not None:
+            self._cache_hits += 1
+            return context
+        self._cache_misses += 1
+
+        # Unwritten changes are newer than the database row
+        context = self._pending_writes.get(session_id)
+        if context is not None:
+            self._cache_context(context)
+            return context
+
+        # Concurrent misses for the same session share one database load
+        return await _single_flight(self._loading, session_id, lambda: self._load_context(session_id))
 
+    async def _load_context(self, session_id: str) -> Optional[AIContext]:
+        """Load a context from the database into the cache."""
         async with AsyncSessionLocal() as db:
             result = await db.execute(
-                select(AIContext).where(AIContext.session_id == session_id)
+                select(AIContext)
+                .options(selectinload(AIContext.messages))
+                .where(AIContext.session_id == session_id)
             )
             context = result.scalar_one_or_none()
 
-            if context:
-                self._context_cache[session_id] = context
-
-            return context
+        if context:
+            set_committed_value(
+                context, "conversation_history", [m.to_message() for m in context.messages]
+            )
+            self._cache_context(context)
+        return context
+
+    def _get_cached(self, session_id: str) -> Optional[AIContext]:
+        """Get a cached context, dropping it if it has expired."""
+        entry = self._context_cache.get(session_id)
+        if entry is None:
+            return None
+
+        expires_at, context = entry
+        if expires_at < time.monotonic():
+            del self._context_cache[session_id]
+            return None
+
+        self._context_cache.move_to_end(session_id)
+        return context
+
+    def _cache_context(self, context: AIContext) -> None:
+        """Cache a context, evicting the least recently used one when full."""
+        self._context_cache[context.session_id] = (time.monotonic() + self.cache_ttl, context)
+        self._context_cache.move_to_end(context.session_id)
+        if len(self._context_cache) > self.cache_size:
+            self._context_cache.popitem(last=False)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get context cache size and hit rate."""
+        lookups = self._cache_hits + self._cache_misses
+        return {
+            "size": len(self._context_cache),
+            "max_size": self.cache_size,
+            "hits": self._cache_hits,
+            "misses": self._cache_misses,
+            "hit_rate": self._cache_hits / lookups if lookups else 0.0
+        }
 
     async def update_context(self, session_id: str, message: AIMessage) -> None:
         """Update context with new message."""
@@ -550,37 +1045,168 @@ class ContextManager:
         if not context:
             return
 
-        # Add message to context
-        message_id = context.add_message(
-            role=message.role.value,
-            content=message.content,
-            message_type=message.message_type.value,
-            tokens=message.tokens,
-            processing_time=message.processing_time,
-            confidence=message.confidence,
-            sources=message.sources
-        )
+        (message_id,) = self._append_messages(context, [message])
+        self.schedule_write(context)
+
+        return message_id
+
+    async def add_exchange(self, session_id: str, user_message: AIMessage,
+                           assistant_message: AIMessage) -> None:
+        """Record a user message and the assistant's reply as one context update."""
+        context = await self.get_context(session_id)
+        if not context:
+            return
+
+        self._append_messages(context, [user_message, assistant_message])
+        self.schedule_write(context)
+
+    def _append_messages(self, context: AIContext, messages: List[AIMessage]) -> List[str]:
+        """Append messages to a context's history and queue them for storage."""
+        previous_count = len(context.conversation_history or [])
+        message_ids = [self._add_message(context, message) for message in messages]
+        pending = self._pending_messages.setdefault(context.session_id, [])
+        pending.extend(context.conversation_history[-len(messages):])
 
         # Prune context if needed
         if context.should_prune_context():
             context.prune_conversation_history()
 
-        # Update database
+        # The history is capped, so adding can drop old messages too
+        if len(context.conversation_history) < previous_count + len(messages):
+            self._pending_prunes.add(context.session_id)
+
+        return message_ids
+
+    async def clear_history(self, session_id: str) -> None:
+        """Drop a session's conversation history, including stored messages.
+
+        A context already in memory is cleared there and written with the
+        next batch; otherwise its messages are deleted directly, without
+        loading the context first.
+        """
+        context = self._get_cached(session_id) or self._pending_writes.get(session_id)
+        if context is not None:
+            context.conversation_history = []
+            self._pending_prunes.add(session_id)
+            self.schedule_write(context)
+            return
+
         async with AsyncSessionLocal() as db:
-            await db.merge(context)
+            await db.execute(
+                delete(AIContextMessage).where(
+                    AIContextMessage.context_id.in_(
+                        select(AIContext.context_id).where(AIContext.session_id == session_id)
+                    )
+                )
+            )
             await db.commit()
 
-        return message_id
+    @staticmethod
+    def _add_message(context: AIContext, message: AIMessage) -> str:
+        """Append a message to the context's conversation history."""
+        return context.add_message(
+            role=message.role.value,
+            content=message.content,
+            message_type=message.message_type.value,
+            tokens=message.tokens,
+            processing_time=message.processing_time,
+            confidence=message.confidence,
+            sources=message.sources
+        )
 
     async def update_terminal_context(self, session_id: str, command: str, output: str, exit_code: int = 0) -> None:
         """Update terminal context."""
         context = await self.get_context(session_id)
         if context:
             context.update_terminal_context(command, output, exit_code)
+            self.schedule_write(context)
+
+    def schedule_write(self, context: AIContext) -> None:
+        """Queue a changed context for the next batched database write."""
+        self._pending_writes[context.session_id] = context
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_delay(self.flush_delay))
+
+    async def _flush_after_delay(self, delay: float) -> None:
+        """Write queued contexts once the batching window has passed."""
+        await asyncio.sleep(delay)
+        # Detach first so the flush below does not cancel this task
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write all queued context changes in one transaction."""
+        # An explicit flush makes the scheduled one redundant
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        async with self._flush_lock:
+            if not self._pending_writes:
+                return
+
+            contexts = list(self._pending_writes.values())
+            pending_messages = self._pending_messages
+            pending_prunes = self._pending_prunes
+            self._pending_writes = {}
+            self._pending_messages = {}
+            self._pending_prunes = set()
+
+            try:
+                async with AsyncSessionLocal() as db:
+                    for context in contexts:
+                        await self._write_context(
+                            db, context,
+                            pending_messages.get(context.session_id, []),
+                            context.session_id in pending_prunes
+                        )
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Failed to write {len(contexts)} AI contexts, retrying: {e}")
+                self._requeue(contexts, pending_messages, pending_prunes)
+
+    def _requeue(self, contexts: List[AIContext], pending_messages: Dict[str, List[Dict[str, Any]]],
+                 pending_prunes: Set[str]) -> None:
+        """Put the changes of a failed write back ahead of those queued since, and retry."""
+        for context in contexts:
+            self._pending_writes.setdefault(context.session_id, context)
+        for session_id, messages in pending_messages.items():
+            self._pending_messages[session_id] = messages + self._pending_messages.get(session_id, [])
+        self._pending_prunes |= pending_prunes
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_delay(self.retry_delay))
+
+    @staticmethod
+    async def _write_context(db: AsyncSession, context: AIContext,
+                             new_messages: List[Dict[str, Any]], pruned: bool) -> None:
+        """Write a context's changed columns and new messages."""
+        history = context.conversation_history or []
+        # Messages pruned or cleared before this write are not stored at all
+        live_ids = {m["messageId"] for m in history}
+        new_messages = [m for m in new_messages if m["messageId"] in live_ids]
+
+        if pruned:
+            new_ids = {m["messageId"] for m in new_messages}
+            kept = [m["seq"] for m in history if m["messageId"] not in new_ids]
+            await db.execute(
+                delete(AIContextMessage).where(
+                    AIContextMessage.context_id == context.context_id,
+                    AIContextMessage.seq.not_in(kept)
+                )
+            )
+
+        if new_messages:
+            await db.execute(
+                insert(AIContextMessage),
+                [AIContextMessage.values_from_message(context.context_id, m) for m in new_messages]
+            )
 
-            async with AsyncSessionLocal() as db:
-                await db.merge(context)
-                await db.commit()
+        await db.execute(
+            update(AIContext)
+            .where(AIContext.context_id == context.context_id)
+            .values(**_context_state(context))
+        )
 
     def clear_cache(self, session_id: str = None) -> None:
         """Clear context cache."""
@@ -597,6 +1223,18 @@ class AIService:
         self.config = config or AIConfig()
         self.providers: Dict[AIProvider, BaseAIProvider] = {}
         self.context_manager = ContextManager()
+        self.response_cache = ResponseCache(
+            max_entries=self.config.response_cache_size,
+            ttl=self.config.response_cache_ttl
+        )
+        # Answers to suggestion and explanation prompts, whatever the conversation
+        self.prompt_cache = ResponseCache(
+            max_entries=self.config.prompt_cache_size,
+            ttl=self.config.prompt_cache_ttl
+        )
+        self._rate_limiters: Dict[Tuple[AIProvider, str], AsyncTokenBucket] = {}
+        # Provider calls in progress, by response cache key
+        self._inflight: Dict[str, asyncio.Future] = {}
         self._initialize_providers()
 
     def _initialize_providers(self) -> None:
@@ -614,7 +1252,7 @@ class AIService:
             logger.warning(f"Failed to initialize Anthropic provider: {e}")
 
         try:
-            if self.config.local_endpoint and AIOHTTP_AVAILABLE:
+            if self.config.local_endpoint and HTTPX_AVAILABLE:
                 self.providers[AIProvider.LOCAL] = LocalProvider(self.config)
         except Exception as e:
             logger.warning(f"Failed to initialize Local provider: {e}")
@@ -626,8 +1264,14 @@ class AIService:
                               response_type: ResponseType = ResponseType.TEXT,
                               provider: Optional[AIProvider] = None,
                               **kwargs) -> AIResponse:
-        """Generate AI response for user input."""
+        """Generate AI response for user input.
+
+        config.timeout bounds the whole turn, including context loading,
+        rate-limit waits and retries, rather than each HTTP request alone.
+        """
         start_time = time.time()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.timeout
 
         try:
             # Get provider
@@ -641,7 +1285,9 @@ class AIService:
                 )
 
             # Get context
-            context = await self.context_manager.get_context(session_id)
+            context = await asyncio.wait_for(
+                self.context_manager.get_context(session_id), deadline - loop.time()
+            )
             if not context:
                 return AIResponse(
                     content="Context not found",
@@ -651,34 +1297,32 @@ class AIService:
             # Build messages
             messages = await self._build_messages(context, user_input, response_type)
 
-            # Generate response
-            response = await ai_provider.generate_response(messages, **kwargs)
-
-            # Update context
-            if response.content and not response.error:
-                # Add user message
-                user_message = AIMessage(
-                    message_id="",
-                    role=MessageRole.USER,
-                    content=user_input,
-                    timestamp=datetime.now(timezone.utc),
-                    message_type=response_type
+            # Generate response, reusing cached answers to near-deterministic prompts
+            temperature = kwargs.get("temperature", self.config.temperature)
+            cache_key = None
+            if temperature <= self.config.response_cache_max_temperature:
+                cache_key = ResponseCache.make_key(
+                    provider,
+                    kwargs.get("model", self.config.default_model),
+                    messages,
+                    temperature,
+                    kwargs.get("max_tokens", self.config.max_tokens)
                 )
-                await self.context_manager.update_context(session_id, user_message)
 
-                # Add assistant response
-                assistant_message = AIMessage(
-                    message_id="",
-                    role=MessageRole.ASSISTANT,
-                    content=response.content,
-                    timestamp=datetime.now(timezone.utc),
-                    message_type=response.message_type,
-                    tokens=response.tokens,
-                    processing_time=response.processing_time,
-                    confidence=response.confidence,
-                    sources=response.sources
-                )
-                await self.context_manager.update_context(session_id, assistant_message)
+            response = self.response_cache.get(cache_key) if cache_key else None
+            if response is None:
+                if cache_key:
+                    # Identical prompts already in flight share one provider call
+                    call = _single_flight(
+                        self._inflight, cache_key,
+                        lambda: self._call_and_cache(cache_key, provider, ai_provider, messages, **kwargs)
+                    )
+                else:
+                    call = self._call_provider(provider, ai_provider, messages, **kwargs)
+                response = await asyncio.wait_for(call, deadline - loop.time())
+
+            # Update context; the database write happens in the background
+            await self._record_exchange(session_id, user_input, response_type, response)
 
             # Log performance
             total_time = time.time() - start_time
@@ -690,6 +1334,13 @@ class AIService:
 
             return response
 
+        except asyncio.TimeoutError:
+            logger.warning(f"AI response exceeded the {self.config.timeout}s deadline")
+            return AIResponse(
+                content="",
+                processing_time=time.time() - start_time,
+                error="AI response timed out"
+            )
         except Exception as e:
             logger.error(f"Error generating AI response: {e}")
             return AIResponse(
@@ -716,6 +1367,7 @@ class AIService:
                 return
 
             messages = await self._build_messages(context, user_input, ResponseType.TEXT)
+            await self._get_rate_limiter(provider, kwargs.get("model", self.config.default_model)).acquire()
 
             # Stream response
             full_response = ""
@@ -725,26 +1377,89 @@ class AIService:
 
             # Update context after streaming
             if full_response:
+                now = datetime.now(timezone.utc)
                 user_message = AIMessage(
                     message_id="",
                     role=MessageRole.USER,
                     content=user_input,
-                    timestamp=datetime.now(timezone.utc)
+                    timestamp=now
                 )
-                await self.context_manager.update_context(session_id, user_message)
-
                 assistant_message = AIMessage(
                     message_id="",
                     role=MessageRole.ASSISTANT,
                     content=full_response,
-                    timestamp=datetime.now(timezone.utc)
+                    timestamp=now
                 )
-                await self.context_manager.update_context(session_id, assistant_message)
+                await self.context_manager.add_exchange(session_id, user_message, assistant_message)
 
         except Exception as e:
             logger.error(f"Error streaming AI response: {e}")
             yield f"Error: {e}"
 
+    async def _record_exchange(self, session_id: str, user_input: str,
+                               response_type: ResponseType, response: AIResponse) -> None:
+        """Add a successful turn to the session's conversation history."""
+        if not response.content or response.error:
+            return
+
+        now = datetime.now(timezone.utc)
+        user_message = AIMessage(
+            message_id="",
+            role=MessageRole.USER,
+            content=user_input,
+            timestamp=now,
+            message_type=response_type
+        )
+        assistant_message = AIMessage(
+            message_id="",
+            role=MessageRole.ASSISTANT,
+            content=response.content,
+            timestamp=now,
+            message_type=response.message_type,
+            tokens=response.tokens,
+            processing_time=response.processing_time,
+            confidence=response.confidence,
+            sources=response.sources
+        )
+        await self.context_manager.add_exchange(session_id, user_message, assistant_message)
+
+    def _get_rate_limiter(self, provider: AIProvider, model: str) -> AsyncTokenBucket:
+        """Get the token bucket shared by all calls to a provider model."""
+        key = (provider, model)
+        limiter = self._rate_limiters.get(key)
+        if limiter is None:
+            limiter = AsyncTokenBucket(self.config.rate_limit_per_minute, self.config.rate_limit_burst)
+            self._rate_limiters[key] = limiter
+        return limiter
+
+    async def _call_provider(self, provider: AIProvider, ai_provider: BaseAIProvider,
+                             messages: List[AIMessage], **kwargs) -> AIResponse:
+        """Call a provider within its rate limit, retrying with backoff when throttled."""
+        limiter = self._get_rate_limiter(provider, kwargs.get("model", self.config.default_model))
+
+        for attempt in range(self.config.rate_limit_retries + 1):
+            await limiter.acquire()
+            try:
+                response = await ai_provider.generate_response(messages, **kwargs)
+            except AIProviderRateLimitError:
+                limiter.record_rate_limited()
+                if attempt == self.config.rate_limit_retries:
+                    raise
+                # Exponential backoff with jitter so throttled callers do not retry in lockstep
+                await asyncio.sleep(RATE_LIMIT_BACKOFF * 2 ** attempt * (0.5 + random.random()))
+                continue
+
+            if not response.error:
+                limiter.record_success()
+            return response
+
+    async def _call_and_cache(self, cache_key: str, provider: AIProvider, ai_provider: BaseAIProvider,
+                              messages: List[AIMessage], **kwargs) -> AIResponse:
+        """Call a provider and cache its response."""
+        response = await self._call_provider(provider, ai_provider, messages, **kwargs)
+        self.response_cache.put(cache_key, response)
+        return response
+
     async def chat(self, session_id: str, user_id: str, message: str,
                    include_context: bool = True, stream: bool = False, **kwargs):
         """Chat with AI assistant.
@@ -759,9 +1474,6 @@ class AIService:
         Returns:
             Dict with response data or async generator for streaming
         """
-        import uuid
-        from datetime import datetime, timezone
-
         if stream:
             # Return streaming response
             return self.stream_response(session_id, message, **kwargs)
@@ -775,7 +1487,7 @@ class AIService:
             )
 
             return {
-                "message_id": str(uuid.uuid4()),
+                "message_id": uuid.uuid4().hex,
                 "response": response.content,
                 "response_time": response.processing_time,
                 "token_count": response.tokens,
@@ -785,16 +1497,42 @@ class AIService:
     async def explain_command(self, session_id: str, command: str) -> AIResponse:
         """Explain a terminal command."""
         prompt = f"Explain this terminal command in simple terms: {command}"
-        return await self.generate_response(
-            session_id, prompt, ResponseType.EXPLANATION
-        )
+        return await self._cached_generate(session_id, prompt, ResponseType.EXPLANATION)
 
     async def suggest_commands(self, session_id: str, goal: str) -> AIResponse:
         """Suggest commands to achieve a goal."""
         prompt = f"Suggest terminal commands to: {goal}"
-        return await self.generate_response(
-            session_id, prompt, ResponseType.SUGGESTION
-        )
+        return await self._cached_generate(session_id, prompt, ResponseType.SUGGESTION)
+
+    async def _cached_generate(self, session_id: str, prompt: str,
+                               response_type: ResponseType) -> AIResponse:
+        """Generate a response to a suggestion or explanation prompt, reusing recent answers.
+
+        A prompt repeated in the same session within config.prompt_cache_ttl
+        is answered from memory without a provider call, even at temperatures
+        the response cache skips. Answers depend on the session's history and
+        terminal context, so they are never shared between sessions; a reused
+        answer is still added to the session's history.
+        """
+        hasher = _new_hasher()
+        hasher.update(fast_json.dumps_bytes([
+            session_id,
+            response_type,
+            # Whitespace differences do not change the question
+            " ".join(prompt.split()),
+            self.config.default_provider,
+            self.config.default_model,
+            self.config.temperature
+        ]))
+        key = hasher.hexdigest()
+
+        response = self.prompt_cache.get(key)
+        if response is None:
+            response = await self.generate_response(session_id, prompt, response_type)
+            self.prompt_cache.put(key, response)
+        else:
+            await self._record_exchange(session_id, prompt, response_type, response)
+        return response
 
     async def process_voice(self, session_id: str, user_id: str, audio_data: bytes,
                           language: str = "en-US", enable_tts: bool = False, **kwargs):
@@ -810,12 +1548,10 @@ class AIService:
         Returns:
             Dict with transcription and response
         """
-        import uuid
-
         # TODO: Implement actual speech recognition
         # For now, return a placeholder response
         return {
-            "message_id": str(uuid.uuid4()),
+            "message_id": uuid.uuid4().hex,
             "transcription": "Voice recognition not yet implemented",
             "response": "Please use text input for now. Voice recognition requires additional services.",
             "response_time": 0.1,
@@ -837,8 +1573,6 @@ class AIService:
         Returns:
             Dict with suggestions and response time
         """
-        import time
-
         start_time = time.time()
 
         # Build prompt
@@ -850,30 +1584,18 @@ class AIService:
             prompt = "Suggest useful terminal commands"
 
         # Get suggestions from AI
-        response = await self.generate_response(
-            session_id=session_id,
-            user_input=prompt,
-            response_type=ResponseType.SUGGESTION
-        )
-
-        # Parse response into suggestions (simple parsing)
-        suggestions = []
-        if response.content:
-            lines = response.content.split('\n')
-            for line in lines[:max_suggestions]:
-                line = line.strip()
-                if line and (line.startswith('-') or line.startswith('•') or line[0].isdigit()):
-                    # Extract command from bullet point
-                    parts = line.split(':', 1)
-                    if len(parts) == 2:
-                        cmd = parts[0].strip('- •0123456789.').strip()
-                        desc = parts[1].strip()
-                        suggestions.append({
-                            "command": cmd,
-                            "description": desc,
-                            "confidence": 0.8,
-                            "category": "general"
-                        })
+        response = await self._cached_generate(session_id, prompt, ResponseType.SUGGESTION)
+
+        # Parse list items of the form "command: description"
+        suggestions = [
+            {
+                "command": match.group(1).strip(),
+                "description": match.group(2).strip(),
+                "confidence": 0.8,
+                "category": "general"
+            }
+            for match in itertools.islice(_SUGGESTION_RE.finditer(response.content or ""), max_suggestions)
+        ]
 
         return {
             "suggestions": suggestions,
@@ -881,35 +1603,34 @@ class AIService:
         }
 
     async def explain_output(self, session_id: str, user_id: str,
-                           command: str, output: str, explain_errors: bool = True, **kwargs):
+                           command: str, output: Union[str, bytes, BinaryIO],
+                           explain_errors: bool = True, max_output_chars: int = 500, **kwargs):
         """Explain command output.
 
+        Only the first max_output_chars of the output are sent to the model.
+
         Args:
             session_id: Terminal session ID
             user_id: User ID
             command: Command that was executed
-            output: Command output
+            output: Command output, as text, raw bytes or an unread binary stream
             explain_errors: Focus on error explanation
+            max_output_chars: Length of the output prefix to explain
 
         Returns:
             Dict with explanation and suggestions
         """
-        import time
-
         start_time = time.time()
 
         # Build prompt
+        head = _output_head(output, max_output_chars)
         if explain_errors:
-            prompt = f"Explain this error from command '{command}':\n{output[:500]}"
+            prompt = f"Explain this error from command '{command}':\n{head}"
         else:
-            prompt = f"Explain this output from command '{command}':\n{output[:500]}"
+            prompt = f"Explain this output from command '{command}':\n{head}"
 
         # Get explanation from AI
-        response = await self.generate_response(
-            session_id=session_id,
-            user_input=prompt,
-            response_type=ResponseType.EXPLANATION
-        )
+        response = await self._cached_generate(session_id, prompt, ResponseType.EXPLANATION)
 
         return {
             "explanation": response.content,
@@ -941,7 +1662,7 @@ class AIService:
         return {
             "messages": messages,
             "total_messages": len(messages),
-            "context_tokens": sum(msg.get("tokens", 0) for msg in messages)
+            "context_tokens": context.calculate_total_tokens()
         }
 
     async def clear_context(self, session_id: str, **kwargs):
@@ -950,17 +1671,7 @@ class AIService:
         Args:
             session_id: Terminal session ID
         """
-        self.context_manager.clear_cache(session_id)
-
-        # Also clear from database
-        context = await self.context_manager.get_context(session_id)
-        if context:
-            context.conversation_history = []
-            context.total_tokens = 0
-
-            async with AsyncSessionLocal() as db:
-                await db.merge(context)
-                await db.commit()
+        await self.context_manager.clear_history(session_id)
 
     async def update_terminal_context(self, session_id: str, command: str, output: str, exit_code: int = 0) -> None:
         """Update terminal context with command execution."""
@@ -1004,44 +1715,95 @@ class AIService:
 
         return results
 
+    async def close(self) -> None:
+        """Write pending context changes and close all provider network resources."""
+        await self.context_manager.flush()
+        await asyncio.gather(
+            *(provider.close() for provider in self.providers.values()),
+            return_exceptions=True
+        )
+
     async def _build_messages(self, context: AIContext, user_input: str,
                             response_type: ResponseType) -> List[AIMessage]:
-        """Build message list for AI provider."""
+        """Build message list for AI provider.
+
+        Messages are ordered from most to least stable so providers can reuse
+        their cached prompt prefix across turns: the static system prompt,
+        then the conversation history, then the current turn, which carries
+        everything that changes per request (terminal state, response type).
+        """
+        now = datetime.now(timezone.utc)
         messages = []
 
         # System message
-        system_prompt = self._build_system_prompt(context, response_type)
         messages.append(AIMessage(
             message_id="system",
             role=MessageRole.SYSTEM,
-            content=system_prompt,
-            timestamp=datetime.now(timezone.utc)
+            content=self._build_system_prompt(context),
+            timestamp=now
         ))
 
-        # Recent conversation history
-        for msg_data in context.get_recent_messages(10):
-            messages.append(AIMessage(
-                message_id=msg_data["messageId"],
-                role=MessageRole(msg_data["role"]),
-                content=msg_data["content"],
-                timestamp=datetime.fromisoformat(msg_data["timestamp"].replace('Z', '+00:00')),
-                message_type=ResponseType(msg_data.get("type", "text"))
-            ))
-
-        # Current user input
+        # Conversation history
+        messages.extend(self._history_messages(context))
+
+        # Current user input, prefixed with the per-turn context
         messages.append(AIMessage(
             message_id="current",
             role=MessageRole.USER,
-            content=user_input,
-            timestamp=datetime.now(timezone.utc),
+            content=f"{self._build_turn_context(context, user_input, response_type)}\n\n{user_input}",
+            timestamp=now,
             message_type=response_type
         ))
 
         return messages
 
-    def _build_system_prompt(self, context: AIContext, response_type: ResponseType) -> str:
-        """Build system prompt based on context and response type."""
-        base_prompt = context.system_prompt or "You are a helpful AI assistant integrated into a terminal environment."
+    def _history_messages(self, context: AIContext) -> List[AIMessage]:
+        """Get the history window as messages, reusing those built on earlier turns.
+
+        Messages are kept on the context instance by message ID, so each
+        stored history entry is parsed once rather than on every turn.
+        """
+        built: Dict[str, AIMessage] = context.__dict__.get("_history_messages", {})
+        current: Dict[str, AIMessage] = {}
+
+        for msg_data in self._history_window(context):
+            message_id = msg_data["messageId"]
+            message = built.get(message_id)
+            if message is None:
+                message = AIMessage(
+                    message_id=message_id,
+                    role=MessageRole(msg_data["role"]),
+                    content=msg_data["content"],
+                    timestamp=datetime.fromisoformat(msg_data["timestamp"].replace('Z', '+00:00')),
+                    message_type=ResponseType(msg_data.get("type", "text"))
+                )
+            current[message_id] = message
+
+        # Only the current window is kept, so pruned messages are released
+        context.__dict__["_history_messages"] = current
+        return list(current.values())
+
+    @staticmethod
+    def _history_window(context: AIContext) -> List[Dict[str, Any]]:
+        """Get the conversation history to send with a request.
+
+        The window starts on a multiple of HISTORY_WINDOW, so it grows by
+        appending for several turns and only drops older messages in blocks.
+        A window that slid by one turn at a time would change the prompt
+        prefix on every request.
+        """
+        history = context.conversation_history or []
+        start = max(0, len(history) - HISTORY_WINDOW) // HISTORY_WINDOW * HISTORY_WINDOW
+        return history[start:]
+
+    def _build_system_prompt(self, context: AIContext) -> str:
+        """Build the system prompt, which stays the same for the whole session."""
+        return context.system_prompt or "You are a helpful AI assistant integrated into a terminal environment."
+
+    def _build_turn_context(self, context: AIContext, user_input: str,
+                            response_type: ResponseType) -> str:
+        """Build the per-request context sent with the current user input."""
+        parts = []
 
         # Add terminal context
         terminal_context = context.terminal_context or {}
@@ -1050,23 +1812,23 @@ class AIService:
         if recent_commands:
             recent_cmd_text = "\n".join([
                 f"$ {cmd.get('command', '')} (exit: {cmd.get('exitCode', 0)})"
-                for cmd in recent_commands[-3:]  # Last 3 commands
+                for cmd in _relevant_commands(recent_commands, user_input, TERMINAL_CONTEXT_COMMANDS)
             ])
-            base_prompt += f"\n\nRecent terminal activity:\n{recent_cmd_text}"
+            parts.append(f"Recent terminal activity:\n{recent_cmd_text}")
 
         # Add current directory
         current_dir = terminal_context.get("currentDirectory", "/")
-        base_prompt += f"\n\nCurrent directory: {current_dir}"
+        parts.append(f"Current directory: {current_dir}")
 
         # Customize for response type
         if response_type == ResponseType.EXPLANATION:
-            base_prompt += "\n\nProvide clear, concise explanations suitable for users learning terminal commands."
+            parts.append("Provide clear, concise explanations suitable for users learning terminal commands.")
         elif response_type == ResponseType.SUGGESTION:
-            base_prompt += "\n\nSuggest practical terminal commands with brief explanations."
+            parts.append("Suggest practical terminal commands with brief explanations.")
         elif response_type == ResponseType.COMMAND:
-            base_prompt += "\n\nProvide specific terminal commands to solve the user's request."
+            parts.append("Provide specific terminal commands to solve the user's request.")
 
-        return base_prompt
+        return "\n\n".join(parts)
 
 
 # Global service instance
@@ -9,17 +9,20 @@ This service provides functionality for:
 T023: CertService implementation.
 """
 
+import asyncio
+import functools
+import hashlib
 import ssl
-import socket
 import certifi
 import httpx
+from dataclasses import replace
 from datetime import datetime, timezone
 from typing import Optional, List, Tuple, Dict, Any
 from pathlib import Path
 
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, dsa, ec, ed25519
 from cryptography.x509.oid import ExtensionOID, NameOID, AuthorityInformationAccessOID
 
@@ -31,6 +34,34 @@ from src.models.certificate import (
     TrustStatus
 )
 
+# Parsed certificates kept by DER encoding; intermediates recur across fetches
+CERT_CACHE_SIZE = 512
+
+
+def _format_fingerprint(digest: bytes) -> str:
+    """Format a digest as colon-separated uppercase hex pairs."""
+    return digest.hex(":").upper()
+
+
+def _validity_status(cert: Certificate, now: datetime) -> Optional[TrustStatus]:
+    """Trust status implied by the validity period, or None while it is valid."""
+    if now > cert.not_after:
+        return TrustStatus.EXPIRED
+    if now < cert.not_before:
+        return TrustStatus.NOT_YET_VALID
+    return None
+
+
+def _ca_issuer_url(aia: Optional[x509.AuthorityInformationAccess]) -> Optional[str]:
+    """URL of the certificate's issuer from its AIA extension, if any."""
+    if aia is None:
+        return None
+
+    for access_description in aia:
+        if access_description.access_method == AuthorityInformationAccessOID.CA_ISSUERS:
+            return access_description.access_location.value
+    return None
+
 
 class CertService:
     """Service for certificate operations."""
@@ -38,6 +69,34 @@ class CertService:
     def __init__(self):
         """Initialize certificate service with system trust store."""
         self.trust_store_path = certifi.where()
+        self._parse_der_cached = functools.lru_cache(maxsize=CERT_CACHE_SIZE)(self._parse_der)
+
+    @functools.cached_property
+    def _ssl_context(self) -> ssl.SSLContext:
+        """TLS context verifying against the trust store.
+
+        Loading the CA bundle is the expensive part of creating a context,
+        so one context is created on first use and shared by all fetches.
+        """
+        context = ssl.create_default_context(cafile=self.trust_store_path)
+        context.check_hostname = True
+        context.verify_mode = ssl.CERT_REQUIRED
+        return context
+
+    @functools.cached_property
+    def _http(self) -> httpx.AsyncClient:
+        """HTTP client for AIA issuer downloads, keeping connections open between fetches."""
+        return httpx.AsyncClient(
+            timeout=10.0,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+
+    async def close(self) -> None:
+        """Close the HTTP client's pooled connections."""
+        client = self.__dict__.pop("_http", None)
+        if client is not None:
+            await client.aclose()
 
     async def fetch_remote_cert(
         self,
@@ -57,58 +116,66 @@ class CertService:
 
         Raises:
             ssl.SSLError: If SSL/TLS connection fails
-            socket.error: If network connection fails
+            OSError: If network connection fails or times out
             ValueError: If hostname is invalid
         """
-        context = ssl.create_default_context(cafile=self.trust_store_path)
-        context.check_hostname = True
-        context.verify_mode = ssl.CERT_REQUIRED
+        # Connect and fetch certificates; the TLS handshake runs on the event
+        # loop instead of blocking it
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                hostname, port, ssl=self._ssl_context, server_hostname=hostname
+            ),
+            timeout=timeout
+        )
+        try:
+            # Get peer certificate in DER format (binary)
+            der_cert_bytes = writer.get_extra_info("ssl_object").getpeercert(binary_form=True)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ssl.SSLError, OSError):
+                # The certificate is already read; a failed TLS shutdown does not matter
+                pass
+
+        if not der_cert_bytes:
+            raise ValueError("No certificate received from server")
+
+        # Parse the leaf certificate
+        leaf = self._parse_der_certificate(der_cert_bytes)
+
+        # Fetch intermediate certificates from AIA extension
+        intermediates = await self._fetch_intermediate_certs(leaf)
+
+        # Try to identify the root certificate
+        root = None
+        if intermediates:
+            # The last intermediate might be the root or issued by root
+            last_intermediate_cert = intermediates[-1]
+            if last_intermediate_cert.is_self_signed:
+                # Last intermediate is actually the root
+                root = intermediates.pop()
+
+        # Build chain structure
+        chain = CertificateChain(
+            leaf=leaf,
+            intermediates=intermediates,
+            root=root,
+            hostname=hostname,
+            port=port,
+            fetch_time=datetime.now(timezone.utc)
+        )
 
-        # Connect and fetch certificates
-        with socket.create_connection((hostname, port), timeout=timeout) as sock:
-            with context.wrap_socket(sock, server_hostname=hostname) as secure_sock:
-                # Get peer certificate in DER format (binary)
-                der_cert_bytes = secure_sock.getpeercert(binary_form=True)
-
-                if not der_cert_bytes:
-                    raise ValueError("No certificate received from server")
-
-                # Parse the leaf certificate
-                cert = x509.load_der_x509_certificate(der_cert_bytes, default_backend())
-                leaf = self._parse_x509_certificate(cert)
-
-                # Fetch intermediate certificates from AIA extension
-                intermediates = await self._fetch_intermediate_certs(cert)
-
-                # Try to identify the root certificate
-                root = None
-                if intermediates:
-                    # The last intermediate might be the root or issued by root
-                    last_intermediate_cert = intermediates[-1]
-                    if last_intermediate_cert.is_self_signed:
-                        # Last intermediate is actually the root
-                        root = intermediates.pop()
-
-                # Build chain structure
-                chain = CertificateChain(
-                    leaf=leaf,
-                    intermediates=intermediates,
-                    root=root,
-                    hostname=hostname,
-                    port=port,
-                    fetch_time=datetime.now(timezone.utc)
-                )
-
-                # Update trust status
-                self._validate_chain_trust(chain)
-
-                return chain
+        # Update trust status
+        self._validate_chain_trust(chain)
+
+        return chain
 
     async def parse_local_cert(self, file_path: str) -> Certificate:
         """Parse certificate from local file.
 
         Supports PEM and DER formats. For PEM files with multiple certificates,
-        only the first one is returned.
+        only the first one is returned; use parse_local_chain() for all of them.
 
         Args:
             file_path: Path to certificate file
@@ -120,25 +187,55 @@ class CertService:
             FileNotFoundError: If file doesn't exist
             ValueError: If file cannot be parsed as certificate
         """
+        cert = self._parse_x509_certificate(self._load_local_certs(file_path)[0])
+
+        # Without a chain, only the validity period says anything about trust
+        cert.trust_status = _validity_status(cert, datetime.now(timezone.utc)) or TrustStatus.UNKNOWN
+        return cert
+
+    async def parse_local_chain(self, file_path: str) -> CertificateChain:
+        """Parse every certificate in a local file as a chain.
+
+        The first certificate is the leaf, as in a fullchain.pem. A trailing
+        self-signed certificate is taken as the root.
+
+        Args:
+            file_path: Path to certificate file
+
+        Returns:
+            CertificateChain with all certificates from the file
+
+        Raises:
+            FileNotFoundError: If file doesn't exist
+            ValueError: If file cannot be parsed as certificate
+        """
+        certs = [self._parse_x509_certificate(c) for c in self._load_local_certs(file_path)]
+
+        leaf, intermediates = certs[0], certs[1:]
+        root = intermediates.pop() if intermediates and intermediates[-1].is_self_signed else None
+
+        chain = CertificateChain(leaf=leaf, intermediates=intermediates, root=root)
+        self._validate_chain_trust(chain)
+        return chain
+
+    @staticmethod
+    def _load_local_certs(file_path: str) -> List[x509.Certificate]:
+        """Load all certificates from a PEM file, or the one in a DER file."""
         path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"Certificate file not found: {file_path}")
 
         cert_data = path.read_bytes()
 
-        # Try PEM first
+        # Try PEM first; one call loads every certificate in the file
         try:
-            cert = x509.load_pem_x509_certificate(cert_data, default_backend())
-            return self._parse_x509_certificate(cert)
+            return x509.load_pem_x509_certificates(cert_data)
         except ValueError:
-            pass
-
-        # Try DER
-        try:
-            cert = x509.load_der_x509_certificate(cert_data, default_backend())
-            return self._parse_x509_certificate(cert)
-        except ValueError as e:
-            raise ValueError(f"Invalid certificate format: {e}")
+            # Try DER
+            try:
+                return [x509.load_der_x509_certificate(cert_data, default_backend())]
+            except ValueError as e:
+                raise ValueError(f"Invalid certificate format: {e}")
 
     def validate_chain(self, chain: CertificateChain) -> bool:
         """Validate certificate chain integrity and trust.
@@ -166,6 +263,15 @@ class CertService:
         Returns:
             Dictionary with comparison results
         """
+        # The same encoding means the same certificate, field for field
+        if cert1.der_data is not None and cert1.der_data == cert2.der_data:
+            return {
+                "identical": True,
+                "difference_count": 0,
+                "differences": [],
+                "serial_match": True
+            }
+
         differences = []
 
         # Compare subjects
@@ -208,8 +314,8 @@ class CertService:
             })
 
         # Compare SANs
-        san1_set = set(cert1.san)
-        san2_set = set(cert2.san)
+        san1_set = cert1.san_set
+        san2_set = cert2.san_set
         if san1_set != san2_set:
             differences.append({
                 "field": "san",
@@ -224,6 +330,22 @@ class CertService:
             "serial_match": cert1.serial_number == cert2.serial_number
         }
 
+    def _parse_der_certificate(self, der_data: bytes) -> Certificate:
+        """Parse a DER-encoded certificate, reusing earlier parses of the same bytes.
+
+        Args:
+            der_data: DER-encoded certificate
+
+        Returns:
+            Our Certificate dataclass
+        """
+        # Callers set the trust status, so each one gets its own copy
+        return replace(self._parse_der_cached(der_data))
+
+    def _parse_der(self, der_data: bytes) -> Certificate:
+        """Parse a DER-encoded certificate without caching."""
+        return self._parse_x509_certificate(x509.load_der_x509_certificate(der_data, default_backend()))
+
     def _parse_x509_certificate(self, cert: x509.Certificate) -> Certificate:
         """Parse cryptography x509.Certificate to our Certificate model.
 
@@ -245,66 +367,48 @@ class CertService:
         except (IndexError, AttributeError):
             issuer_cn = str(cert.issuer)
 
+        # Get DER data first; fingerprints hash it and the PEM form is derived
+        # from it on demand
+        der_data = cert.public_bytes(serialization.Encoding.DER)
+
         # Parse public key
         public_key = cert.public_key()
-        key_info = self._parse_public_key(public_key, cert)
+        key_info = self._parse_public_key(public_key, der_data)
+
+        # Index the extensions once instead of searching them for each lookup
+        extensions = {ext.oid: ext.value for ext in cert.extensions}
 
         # Extract SANs
         san_list = []
-        try:
-            san_ext = cert.extensions.get_extension_for_oid(ExtensionOID.SUBJECT_ALTERNATIVE_NAME)
-            san_list = [str(name) for name in san_ext.value]
-        except x509.ExtensionNotFound:
-            pass
+        san = extensions.get(ExtensionOID.SUBJECT_ALTERNATIVE_NAME)
+        if san is not None:
+            san_list = [str(name) for name in san]
 
         # Check if self-signed
         is_self_signed = cert.issuer == cert.subject
 
         # Check if CA
         is_ca = False
-        try:
-            basic_constraints = cert.extensions.get_extension_for_oid(
-                ExtensionOID.BASIC_CONSTRAINTS
-            )
-            is_ca = basic_constraints.value.ca
-        except x509.ExtensionNotFound:
-            pass
+        basic_constraints = extensions.get(ExtensionOID.BASIC_CONSTRAINTS)
+        if basic_constraints is not None:
+            is_ca = basic_constraints.ca
 
         # Extract key usage
         key_usage_list = []
-        try:
-            ku_ext = cert.extensions.get_extension_for_oid(ExtensionOID.KEY_USAGE)
-            ku = ku_ext.value
+        ku = extensions.get(ExtensionOID.KEY_USAGE)
+        if ku is not None:
             if ku.digital_signature:
                 key_usage_list.append("Digital Signature")
             if ku.key_encipherment:
                 key_usage_list.append("Key Encipherment")
             if ku.key_cert_sign:
                 key_usage_list.append("Certificate Sign")
-        except x509.ExtensionNotFound:
-            pass
 
         # Extract extended key usage
         extended_key_usage_list = []
-        try:
-            eku_ext = cert.extensions.get_extension_for_oid(ExtensionOID.EXTENDED_KEY_USAGE)
-            extended_key_usage_list = [str(oid) for oid in eku_ext.value]
-        except x509.ExtensionNotFound:
-            pass
-
-        # Get PEM data
-        pem_data = cert.public_bytes(serialization.Encoding.PEM).decode('utf-8')
-
-        # Get DER data
-        der_data = cert.public_bytes(serialization.Encoding.DER)
-
-        # Determine initial trust status based on validity
-        trust_status = TrustStatus.UNKNOWN
-        now = datetime.now(timezone.utc)
-        if now > cert.not_valid_after_utc:
-            trust_status = TrustStatus.EXPIRED
-        elif now < cert.not_valid_before_utc:
-            trust_status = TrustStatus.NOT_YET_VALID
+        eku = extensions.get(ExtensionOID.EXTENDED_KEY_USAGE)
+        if eku is not None:
+            extended_key_usage_list = [str(oid) for oid in eku]
 
         return Certificate(
             subject=str(cert.subject),
@@ -316,10 +420,9 @@ class CertService:
             san=san_list,
             is_self_signed=is_self_signed,
             is_ca=is_ca,
-            trust_status=trust_status,
             key_usage=key_usage_list,
             extended_key_usage=extended_key_usage_list,
-            pem_data=pem_data,
+            ca_issuer_url=_ca_issuer_url(extensions.get(ExtensionOID.AUTHORITY_INFORMATION_ACCESS)),
             der_data=der_data,
             version=cert.version.value,
             signature_algorithm=cert.signature_algorithm_oid._name
@@ -328,13 +431,13 @@ class CertService:
     def _parse_public_key(
         self,
         public_key,
-        cert: x509.Certificate
+        der_data: bytes
     ) -> PublicKeyInfo:
         """Parse public key information from certificate.
 
         Args:
             public_key: Public key object from certificate
-            cert: Full certificate for fingerprinting
+            der_data: DER encoding of the full certificate, for fingerprinting
 
         Returns:
             PublicKeyInfo with algorithm and fingerprints
@@ -356,87 +459,68 @@ class CertService:
             algorithm = KeyAlgorithm.UNKNOWN
             size_bits = 0
 
-        # Calculate fingerprints
-        sha256_fingerprint = cert.fingerprint(hashes.SHA256()).hex().upper()
-        sha1_fingerprint = cert.fingerprint(hashes.SHA1()).hex().upper()
-
-        # Format fingerprints with colons
-        sha256_formatted = ":".join(sha256_fingerprint[i:i+2] for i in range(0, len(sha256_fingerprint), 2))
-        sha1_formatted = ":".join(sha1_fingerprint[i:i+2] for i in range(0, len(sha1_fingerprint), 2))
-
         return PublicKeyInfo(
             algorithm=algorithm,
             size_bits=size_bits,
-            fingerprint_sha256=sha256_formatted,
-            fingerprint_sha1=sha1_formatted
+            fingerprint_sha256=_format_fingerprint(hashlib.sha256(der_data).digest()),
+            fingerprint_sha1=_format_fingerprint(hashlib.sha1(der_data).digest())
         )
 
-    async def _fetch_intermediate_certs(self, leaf_cert: x509.Certificate) -> List[Certificate]:
+    async def _fetch_intermediate_certs(self, leaf: Certificate) -> List[Certificate]:
         """Fetch intermediate certificates from AIA extension.
 
+        The download of each issuer starts as soon as the certificate naming
+        it is parsed, before that certificate is added to the chain.
+
         Args:
-            leaf_cert: The leaf certificate to extract AIA from
+            leaf: The parsed leaf certificate, naming its issuer by AIA
 
         Returns:
             List of intermediate Certificate objects
         """
         intermediates = []
-        current_cert = leaf_cert
         max_depth = 10  # Prevent infinite loops
         depth = 0
 
-        while depth < max_depth:
-            try:
-                # Get Authority Information Access extension
-                aia_ext = current_cert.extensions.get_extension_for_oid(
-                    ExtensionOID.AUTHORITY_INFORMATION_ACCESS
-                )
-
-                # Find CA Issuers URL
-                ca_issuer_url = None
-                for access_description in aia_ext.value:
-                    if access_description.access_method == AuthorityInformationAccessOID.CA_ISSUERS:
-                        ca_issuer_url = access_description.access_location.value
-                        break
-
-                if not ca_issuer_url:
-                    # No more issuers to fetch
-                    break
+        fetch = asyncio.create_task(self._http.get(leaf.ca_issuer_url)) if leaf.ca_issuer_url else None
 
+        try:
+            while fetch is not None and depth < max_depth:
                 # Fetch the intermediate certificate
-                async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-                    response = await client.get(ca_issuer_url)
-                    response.raise_for_status()
-
-                    # Parse the certificate (usually in DER format)
-                    try:
-                        intermediate_cert = x509.load_der_x509_certificate(
-                            response.content,
-                            default_backend()
-                        )
-                    except ValueError:
-                        # Try PEM format
-                        intermediate_cert = x509.load_pem_x509_certificate(
-                            response.content,
-                            default_backend()
-                        )
-
-                    # Parse and add to chain
-                    parsed_intermediate = self._parse_x509_certificate(intermediate_cert)
-                    intermediates.append(parsed_intermediate)
-
-                    # Check if this is self-signed (root)
-                    if intermediate_cert.issuer == intermediate_cert.subject:
-                        # Found the root, stop here
-                        break
-
-                    # Continue with the next level
-                    current_cert = intermediate_cert
-                    depth += 1
-
-            except (x509.ExtensionNotFound, httpx.RequestError, ValueError) as e:
-                # No AIA extension or fetch failed, stop here
-                break
+                response = await fetch
+                fetch = None
+                response.raise_for_status()
+
+                # Parse the certificate (usually in DER format)
+                try:
+                    intermediate = self._parse_der_certificate(response.content)
+                except ValueError:
+                    # Try PEM format
+                    intermediate_cert = x509.load_pem_x509_certificate(
+                        response.content,
+                        default_backend()
+                    )
+                    intermediate = self._parse_der_certificate(
+                        intermediate_cert.public_bytes(serialization.Encoding.DER)
+                    )
+                depth += 1
+
+                # Start fetching the next level unless this is the root
+                if not intermediate.is_self_signed and intermediate.ca_issuer_url and depth < max_depth:
+                    fetch = asyncio.create_task(self._http.get(intermediate.ca_issuer_url))
+
+                # Add to chain
+                intermediates.append(intermediate)
+
+        except (httpx.HTTPError, ValueError):
+            # Fetch failed, stop here
+            pass
+        finally:
+            if fetch is not None:
+                fetch.cancel()
+                # Retrieve a failure that already happened so asyncio does not report it
+                if fetch.done() and not fetch.cancelled():
+                    fetch.exception()
 
         return intermediates
 
@@ -450,38 +534,22 @@ class CertService:
         """
         # Simple validation based on expiry and self-signed status
         # More sophisticated validation would use OpenSSL verify
+        now = datetime.now(timezone.utc)
 
         # Check leaf certificate
-        if chain.leaf.is_expired:
-            chain.leaf.trust_status = TrustStatus.EXPIRED
-        elif chain.leaf.is_not_yet_valid:
-            chain.leaf.trust_status = TrustStatus.NOT_YET_VALID
-        elif chain.leaf.is_self_signed and not chain.is_complete:
-            chain.leaf.trust_status = TrustStatus.UNTRUSTED
-        elif chain.is_complete:
-            chain.leaf.trust_status = TrustStatus.TRUSTED
-        else:
-            chain.leaf.trust_status = TrustStatus.UNTRUSTED
+        chain.leaf.trust_status = _validity_status(chain.leaf, now) or (
+            TrustStatus.TRUSTED if chain.is_complete else TrustStatus.UNTRUSTED
+        )
 
         # Update intermediates
         for intermediate in chain.intermediates:
-            if intermediate.is_expired:
-                intermediate.trust_status = TrustStatus.EXPIRED
-            elif intermediate.is_not_yet_valid:
-                intermediate.trust_status = TrustStatus.NOT_YET_VALID
-            else:
-                intermediate.trust_status = TrustStatus.TRUSTED
+            intermediate.trust_status = _validity_status(intermediate, now) or TrustStatus.TRUSTED
 
         # Update root
         if chain.root:
-            if chain.root.is_expired:
-                chain.root.trust_status = TrustStatus.EXPIRED
-            elif chain.root.is_not_yet_valid:
-                chain.root.trust_status = TrustStatus.NOT_YET_VALID
-            elif chain.root.is_ca:
-                chain.root.trust_status = TrustStatus.TRUSTED
-            else:
-                chain.root.trust_status = TrustStatus.UNTRUSTED
+            chain.root.trust_status = _validity_status(chain.root, now) or (
+                TrustStatus.TRUSTED if chain.root.is_ca else TrustStatus.UNTRUSTED
+            )
 
 
 # Singleton instance
@@ -461,7 +461,7 @@ class PerformanceService:
 
         try:
             # Get user profile
-            query = select(UserProfile).where(UserProfile.user_id == user_id)
+            query = UserProfile.profile_query(with_themes=False).where(UserProfile.user_id == user_id)
             result = await db.execute(query)
             user = result.scalar_one_or_none()
 
@@ -10,7 +10,7 @@ import json
 import logging
 import time
 from collections import deque
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List, Union, Callable
 from dataclasses import dataclass, field
 from enum import Enum
@@ -60,7 +60,7 @@ class RecordingConfig:
     retention_days: int = 30
 
 
-@dataclass
+@dataclass(slots=True)
 class RecordingEvent:
     """Individual recording event."""
     timestamp: str
@@ -94,7 +94,7 @@ class RecordingEvent:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class RecordingCheckpoint:
     """Recording checkpoint for seeking."""
     timestamp: str
@@ -859,10 +859,8 @@ class RecordingService:
             try:
                 async with AsyncSessionLocal() as db:
                     # Find expired recordings
-                    cutoff_date = datetime.now(timezone.utc) - timedelta(days=self.config.retention_days)
-
                     result = await db.execute(
-                        select(Recording).where(Recording.end_time <= cutoff_date)
+                        Recording.expired_query(self.config.retention_days)
                     )
                     expired_recordings = result.scalars().all()
 
@@ -489,20 +489,15 @@ class ThemeMarketplace:
 
     async def get_themes_by_category(self, category: str, limit: int = 20) -> List[ThemeConfiguration]:
         """Get themes by category (light/dark)."""
-        # Determine theme type based on background color
-        if category.lower() == "light":
-            # Themes with lighter backgrounds
-            color_condition = ThemeConfiguration.colors["background"].astext.notlike("#0%")
-        else:
-            # Themes with darker backgrounds
-            color_condition = ThemeConfiguration.colors["background"].astext.like("#0%")
+        # Scheme type is derived from the background luminance when colors are saved
+        scheme_type = "light" if category.lower() == "light" else "dark"
 
         result = await self.db.execute(
             select(ThemeConfiguration)
             .where(
                 and_(
                     ThemeConfiguration.is_public == True,
-                    color_condition
+                    ThemeConfiguration.scheme_type == scheme_type
                 )
             )
             .order_by(ThemeConfiguration.download_count.desc())
@@ -0,0 +1,37 @@
+"""JSON helpers backed by orjson when it is installed.
+
+orjson is several times faster than the stdlib json module for the large
+event and message payloads stored in JSON columns. Both helpers fall back
+to the stdlib transparently so orjson stays an optional dependency.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps(value: Any) -> str:
+    """Serialize a value to a compact JSON string."""
+    if ORJSON_AVAILABLE:
+        # Non-string keys are accepted by the stdlib encoder, keep parity
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value, separators=(",", ":"))
+
+
+def dumps_bytes(value: Any) -> bytes:
+    """Serialize a value to compact UTF-8 encoded JSON."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """Deserialize a JSON document."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
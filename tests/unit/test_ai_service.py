@@ -0,0 +1,917 @@
+"""
+Unit tests for the AI service providers.
+
+Tests:
+- Slotted and frozen data classes
+- Local provider HTTP client reuse and shutdown
+- Local provider streaming
+- Response cache keys, expiry and eviction
+- Caching of suggestion and explanation prompts
+- Suggestion parsing
+- Prompt layout for provider prefix caching
+- Token estimation
+- Batched context writes and retries
+- Per-message context storage
+- Context cache bounds and concurrent loads
+- Context token statistics
+- Provider rate limiting
+- Coalescing of identical in-flight calls
+- Read-ahead buffering of streamed responses
+- Relevant terminal command selection
+- Truncation of output to explain
+- Whole-turn response deadline
+"""
+
+import asyncio
+import dataclasses
+import io
+import json
+import pytest
+import sys
+import types
+from datetime import datetime, timezone
+
+from aiohttp import web
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.base import Base
+from src.models.ai_context import AIContext, AIContextMessage
+
+from src.services import ai_service
+from src.services.ai_service import (
+    HISTORY_WINDOW, AIConfig, AIMessage, AIProvider, AIProviderRateLimitError, AIResponse, AIService,
+    AsyncTokenBucket, BaseAIProvider, ContextManager, LocalProvider, MessageRole, ResponseCache, ResponseType
+)
+
+
+def _message(content: str) -> AIMessage:
+    return AIMessage(
+        message_id="m1",
+        role=MessageRole.USER,
+        content=content,
+        timestamp=datetime.now(timezone.utc)
+    )
+
+
+@pytest.fixture
+async def local_endpoint():
+    """Run an OpenAI-compatible endpoint on localhost."""
+    async def chat_completions(request):
+        body = await request.json()
+        if body.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            await response.write(b": keep-alive\n\n")
+            for token in ("Hello", ", ", "world"):
+                chunk = json.dumps({"choices": [{"delta": {"content": token}}]})
+                # Split each event across writes to exercise reassembly
+                payload = f"data: {chunk}\n\n".encode()
+                await response.write(payload[:7])
+                await response.write(payload[7:])
+            await response.write(b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n')
+            await response.write(b"data: [DONE]\n\n")
+            await response.write(b'data: {"choices": [{"delta": {"content": "late"}}]}\n\n')
+            await response.write_eof()
+            return response
+        return web.json_response({
+            "model": body["model"],
+            "choices": [{"message": {"content": f"echo: {body['messages'][-1]['content']}"}}],
+            "usage": {"total_tokens": 3}
+        })
+
+    async def models(request):
+        return web.json_response({"data": []})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/v1/models", models)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    await runner.cleanup()
+
+
+class TestDataClasses:
+    """Tests for the AI service data classes."""
+
+    def test_messages_and_responses_are_slotted(self):
+        """Test messages and responses carry no per-instance __dict__."""
+        assert not hasattr(_message("ls"), "__dict__")
+        assert not hasattr(AIResponse(content="ok"), "__dict__")
+
+    def test_config_is_frozen_and_hashable(self):
+        """Test configs cannot be changed and can be used as keys."""
+        config = AIConfig(default_model="m")
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            config.default_model = "other"
+        assert {config: 1}[AIConfig(default_model="m")] == 1
+
+
+class TestLocalProviderSession:
+    """Tests for LocalProvider's shared HTTP client."""
+
+    async def test_client_reused_across_calls(self, local_endpoint):
+        """Test requests share one pooled client."""
+        provider = LocalProvider(AIConfig(local_endpoint=local_endpoint))
+
+        first = await provider.generate_response([_message("hi")])
+        client = provider._client
+        second = await provider.generate_response([_message("again")])
+
+        assert first.content == "echo: hi"
+        assert second.content == "echo: again"
+        assert provider._client is client
+        assert await provider.validate_connection()
+        assert provider._client is client
+
+        await provider.close()
+
+    async def test_close_releases_client(self, local_endpoint):
+        """Test closing the service closes provider clients and allows reuse."""
+        service = AIService(AIConfig(local_endpoint=local_endpoint))
+        provider = service.providers[AIProvider.LOCAL]
+        await provider.generate_response([_message("hi")])
+        client = provider._client
+
+        await service.close()
+
+        assert client.is_closed
+        assert provider._client is None
+        assert (await provider.generate_response([_message("back")])).content == "echo: back"
+        await service.close()
+
+
+class TestLocalProviderStreaming:
+    """Tests for LocalProvider.stream_response()."""
+
+    async def test_stream_yields_deltas(self, local_endpoint):
+        """Test streamed SSE deltas are yielded in order."""
+        provider = LocalProvider(AIConfig(local_endpoint=local_endpoint))
+
+        chunks = [chunk async for chunk in provider.stream_response([_message("hi")])]
+
+        assert chunks == ["Hello", ", ", "world"]
+        await provider.close()
+
+    async def test_sse_events_reassembled(self):
+        """Test multi-line data fields are joined and events end at blank lines."""
+        async def lines():
+            for line in ["data: first", "data: second", "", ": comment", "event: ping", "data:tail"]:
+                yield line
+
+        assert [data async for data in ai_service._iter_sse_data(lines())] == ["first\nsecond", "tail"]
+
+
+class TestResponseCache:
+    """Tests for ResponseCache."""
+
+    def _key(self, content: str, temperature: float = 0.0) -> str:
+        return ResponseCache.make_key(AIProvider.LOCAL, "model", [_message(content)], temperature, 100)
+
+    def test_key_ignores_message_metadata(self):
+        """Test keys depend on prompt content and parameters, not timestamps or IDs."""
+        first = _message("ls -la")
+        second = _message("ls -la")
+        second.message_id = "other"
+
+        assert (ResponseCache.make_key(AIProvider.LOCAL, "model", [first], 0.0, 100)
+                == ResponseCache.make_key(AIProvider.LOCAL, "model", [second], 0.0, 100))
+        assert self._key("ls -la") != self._key("ls -l")
+        assert self._key("ls -la") != self._key("ls -la", temperature=0.1)
+
+    def test_key_respects_message_boundaries(self):
+        """Test the same text split differently across messages gives a different key."""
+        split = [_message("ls -"), _message("la")]
+        joined = [_message("ls"), _message("-la")]
+
+        assert (ResponseCache.make_key(AIProvider.LOCAL, "model", split, 0.0, 100)
+                != ResponseCache.make_key(AIProvider.LOCAL, "model", joined, 0.0, 100))
+
+    def test_hit_marked_in_metadata(self):
+        """Test cached responses are returned as copies marked as hits."""
+        cache = ResponseCache()
+        response = AIResponse(content="lists files")
+        cache.put(self._key("ls"), response)
+
+        hit = cache.get(self._key("ls"))
+
+        assert hit.content == "lists files"
+        assert hit.metadata["cache_hit"] is True
+        assert "cache_hit" not in response.metadata
+
+    def test_errors_not_cached(self):
+        """Test failed responses are never stored."""
+        cache = ResponseCache()
+        cache.put(self._key("ls"), AIResponse(content="", error="boom"))
+
+        assert cache.get(self._key("ls")) is None
+
+    def test_lru_eviction_and_expiry(self):
+        """Test the least recently used entry is evicted and expired entries dropped."""
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", AIResponse(content="a"))
+        cache.put("b", AIResponse(content="b"))
+        cache.get("a")
+        cache.put("c", AIResponse(content="c"))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+
+        expired = ResponseCache(ttl=-1)
+        expired.put("a", AIResponse(content="a"))
+        assert expired.get("a") is None
+
+
+class TestPromptCache:
+    """Tests for reusing answers to suggestion and explanation prompts."""
+
+    async def test_repeated_prompt_skips_provider(self):
+        """Test a repeated prompt is answered from the cache at any temperature."""
+        class CountingProvider(BaseAIProvider):
+            calls = 0
+
+            async def generate_response(self, messages, **kwargs):
+                self.calls += 1
+                return AIResponse(content="missing file")
+
+            async def stream_response(self, messages, **kwargs):
+                yield ""
+
+            async def estimate_tokens(self, text):
+                return 0
+
+            async def validate_connection(self):
+                return True
+
+        service = AIService(AIConfig(default_provider=AIProvider.LOCAL, temperature=0.7))
+        provider = CountingProvider(service.config)
+        service.providers[AIProvider.LOCAL] = provider
+        service.context_manager = ContextManager(flush_delay=60)
+        context = AIContext(session_id="s1", user_id="u1", context_window=8192)
+        service.context_manager._cache_context(context)
+        service.context_manager._cache_context(AIContext(session_id="s2", user_id="u2", context_window=8192))
+
+        first = await service.explain_output("s1", "u1", "cat a", "No such file")
+        second = await service.explain_output("s1", "u1", "cat a", "No such  file\n")
+        await service.suggest_commands("s1", "No such file")
+
+        assert first["explanation"] == second["explanation"] == "missing file"
+        assert provider.calls == 2
+        # The cached answer is still part of the conversation
+        assert [m["content"] for m in context.conversation_history].count("missing file") == 3
+
+        # Answers depend on the session's context, so other sessions ask again
+        await service.explain_output("s2", "u2", "cat a", "No such file")
+        assert provider.calls == 3
+
+        # Context writes are not under test
+        service.context_manager._pending_writes.clear()
+        await service.context_manager.flush()
+
+
+class TestSuggestionParsing:
+    """Tests for parsing suggestions out of a response."""
+
+    async def test_list_items_parsed(self):
+        """Test bulleted and numbered "command: description" items become suggestions."""
+        class ListProvider(BaseAIProvider):
+            async def generate_response(self, messages, **kwargs):
+                return AIResponse(content=(
+                    "Here are some options:\n"
+                    "1. ls -la: list all files\n"
+                    "- du -sh *: show directory sizes\n"
+                    "Note: run these in your project\n"
+                    "• df -h:  show free space\n"
+                    "2) find . -name '*.py': find Python files"
+                ))
+
+            async def stream_response(self, messages, **kwargs):
+                yield ""
+
+            async def estimate_tokens(self, text):
+                return 0
+
+            async def validate_connection(self):
+                return True
+
+        service = AIService(AIConfig(default_provider=AIProvider.LOCAL))
+        service.providers[AIProvider.LOCAL] = ListProvider(service.config)
+        service.context_manager = ContextManager(flush_delay=60)
+        service.context_manager._cache_context(AIContext(session_id="s1", user_id="u1", context_window=8192))
+
+        result = await service.get_suggestions("s1", "u1", goal="inspect files", max_suggestions=3)
+
+        assert [(s["command"], s["description"]) for s in result["suggestions"]] == [
+            ("ls -la", "list all files"),
+            ("du -sh *", "show directory sizes"),
+            ("df -h", "show free space"),
+        ]
+
+        # Context writes are not under test
+        service.context_manager._pending_writes.clear()
+        await service.context_manager.flush()
+
+
+class TestPromptLayout:
+    """Tests for AIService._build_messages()."""
+
+    @pytest.fixture
+    def context(self):
+        """Create an in-memory AIContext."""
+        context = AIContext(session_id="s1", user_id="u1", system_prompt="Be brief.")
+        context.conversation_history = []
+        context.terminal_context = {"currentDirectory": "/tmp"}
+        return context
+
+    async def test_dynamic_context_follows_static_prefix(self, context):
+        """Test terminal state and response type only appear in the current turn."""
+        service = AIService(AIConfig())
+        context.add_message("user", "hello")
+        context.add_message("assistant", "hi")
+        context.update_terminal_context("ls", "", 0)
+
+        messages = await service._build_messages(context, "what now?", ResponseType.SUGGESTION)
+
+        assert messages[0].content == "Be brief."
+        assert [m.content for m in messages[1:3]] == ["hello", "hi"]
+        assert messages[-1].content.endswith("\n\nwhat now?")
+        assert "$ ls (exit: 0)" in messages[-1].content
+        assert "Current directory: /tmp" in messages[-1].content
+
+    async def test_prefix_stable_across_turns(self, context):
+        """Test consecutive turns share the previous prompt prefix until the window advances."""
+        service = AIService(AIConfig())
+        for i in range(HISTORY_WINDOW):
+            context.add_message("user", f"q{i}")
+
+        before = await service._build_messages(context, "next", ResponseType.TEXT)
+        context.add_message("user", "next")
+        after = await service._build_messages(context, "again", ResponseType.TEXT)
+
+        assert [m.content for m in after[:len(before) - 1]] == [m.content for m in before[:-1]]
+
+    async def test_history_messages_reused_across_turns(self, context):
+        """Test history entries are converted once and reused on later turns."""
+        service = AIService(AIConfig())
+        context.add_message("user", "hello")
+
+        first = await service._build_messages(context, "one", ResponseType.TEXT)
+        context.add_message("assistant", "hi")
+        second = await service._build_messages(context, "two", ResponseType.TEXT)
+
+        assert second[1] is first[1]
+        assert [m.content for m in second[1:3]] == ["hello", "hi"]
+
+    def test_history_window_advances_in_blocks(self, context):
+        """Test the history window drops old messages a block at a time."""
+        for i in range(HISTORY_WINDOW * 2 + 5):
+            context.add_message("user", str(i))
+
+        window = AIService._history_window(context)
+
+        assert window[0]["content"] == str(HISTORY_WINDOW)
+        assert HISTORY_WINDOW <= len(window) < HISTORY_WINDOW * 2
+
+
+class TestTokenEstimation:
+    """Tests for provider token estimation."""
+
+    @pytest.fixture(autouse=True)
+    def clear_caches(self):
+        ai_service._get_encoding.cache_clear()
+        ai_service._count_tokens.cache_clear()
+        yield
+        ai_service._get_encoding.cache_clear()
+        ai_service._count_tokens.cache_clear()
+
+    async def test_local_provider_estimate(self, monkeypatch):
+        """Test estimates use the model's tokenizer and are cached."""
+        class FakeEncoding:
+            def encode(self, text, disallowed_special=()):
+                return text.split()
+
+        monkeypatch.setattr(ai_service, "TIKTOKEN_AVAILABLE", True)
+        monkeypatch.setattr(ai_service, "_get_encoding", lambda model: FakeEncoding())
+        provider = LocalProvider(AIConfig(local_endpoint="http://127.0.0.1:1"))
+        text = "ls -la /var/log | grep error"
+
+        tokens = await provider.estimate_tokens(text)
+
+        assert tokens == 6
+        assert await provider.estimate_tokens(text) == tokens
+
+    async def test_estimate_without_tokenizer(self, monkeypatch):
+        """Test estimates fall back to ~4 chars/token when tiktoken is not installed."""
+        monkeypatch.setattr(ai_service, "TIKTOKEN_AVAILABLE", False)
+        provider = LocalProvider(AIConfig(local_endpoint="http://127.0.0.1:1"))
+        text = "ls -la /var/log | grep error"
+
+        assert await provider.estimate_tokens(text) == len(text) // 4
+
+    async def test_estimate_when_encoding_fails_to_load(self, monkeypatch):
+        """Test estimates fall back to ~4 chars/token when the BPE file cannot be loaded."""
+        def unavailable(name):
+            raise OSError("network unreachable")
+
+        monkeypatch.setattr(ai_service, "TIKTOKEN_AVAILABLE", True)
+        monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(
+            encoding_for_model=unavailable, get_encoding=unavailable
+        ))
+        provider = LocalProvider(AIConfig(local_endpoint="http://127.0.0.1:1"))
+        text = "ls -la /var/log | grep error"
+
+        assert await provider.estimate_tokens(text) == len(text) // 4
+
+
+class TestBatchedContextWrites:
+    """Tests for ContextManager's batched database writes."""
+
+    @pytest.fixture
+    async def session_factory(self, tmp_path, monkeypatch):
+        """Point the AI service at a temporary database holding one context."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ai.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as db:
+            db.add(AIContext(session_id="s1", user_id="u1"))
+            await db.commit()
+
+        monkeypatch.setattr(ai_service, "AsyncSessionLocal", factory)
+        commits = []
+        event.listen(engine.sync_engine, "commit", lambda conn: commits.append(conn))
+        yield factory, commits
+        await engine.dispose()
+
+    async def test_turn_written_in_one_commit(self, session_factory):
+        """Test messages added within the batching window share one commit."""
+        factory, commits = session_factory
+        manager = ContextManager(flush_delay=0.01)
+
+        await manager.update_context("s1", _message("question"))
+        await manager.update_context("s1", _message("answer"))
+        await manager.update_terminal_context("s1", "ls", "", 0)
+        await asyncio.sleep(0.05)
+
+        assert len(commits) == 1
+        async with factory() as db:
+            stored = (await db.execute(select(AIContext))).scalar_one()
+            rows = (await db.execute(select(AIContextMessage).order_by(AIContextMessage.seq))).scalars().all()
+        assert [(m.seq, m.content) for m in rows] == [(0, "question"), (1, "answer")]
+        assert stored.terminal_context["recentCommands"][0]["command"] == "ls"
+
+    async def test_exchange_recorded_in_order(self, session_factory):
+        """Test a user message and reply are added together without waiting for the write."""
+        factory, commits = session_factory
+        manager = ContextManager(flush_delay=60)
+        reply = _message("answer")
+        reply.role = MessageRole.ASSISTANT
+
+        await manager.add_exchange("s1", _message("question"), reply)
+        context = await manager.get_context("s1")
+
+        assert [(m["role"], m["content"]) for m in context.conversation_history] == [
+            ("user", "question"), ("assistant", "answer")
+        ]
+        assert commits == []
+
+        await manager.flush()
+        assert len(commits) == 1
+
+    async def test_pending_changes_survive_cache_clear(self, session_factory):
+        """Test a context reloaded before its write lands keeps the unwritten changes."""
+        manager = ContextManager(flush_delay=60)
+
+        await manager.update_context("s1", _message("question"))
+        manager.clear_cache("s1")
+        context = await manager.get_context("s1")
+        await manager.flush()
+
+        assert [m["content"] for m in context.conversation_history] == ["question"]
+
+    async def test_failed_write_retried(self, session_factory, monkeypatch):
+        """Test changes from a failed write are kept and written by the retry."""
+        factory, commits = session_factory
+        manager = ContextManager(flush_delay=60, retry_delay=0.01)
+        failures = []
+
+        def flaky_factory():
+            if not failures:
+                failures.append(True)
+                raise ConnectionError("database unavailable")
+            return factory()
+
+        await manager.update_context("s1", _message("question"))
+        monkeypatch.setattr(ai_service, "AsyncSessionLocal", flaky_factory)
+        await manager.flush()
+        assert commits == []
+
+        await manager.update_context("s1", _message("answer"))
+        await asyncio.sleep(0.05)
+
+        assert len(commits) == 1
+        async with factory() as db:
+            rows = (await db.execute(select(AIContextMessage).order_by(AIContextMessage.seq))).scalars().all()
+        assert [(m.seq, m.content) for m in rows] == [(0, "question"), (1, "answer")]
+
+
+class TestContextMessageStorage:
+    """Tests for storing context messages as ai_messages rows."""
+
+    @pytest.fixture
+    async def factory(self, tmp_path, monkeypatch):
+        """Point the AI service at a temporary database holding one context."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ai.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as db:
+            db.add(AIContext(session_id="s1", user_id="u1"))
+            await db.commit()
+
+        monkeypatch.setattr(ai_service, "AsyncSessionLocal", factory)
+        statements = []
+        event.listen(
+            engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement)
+        )
+        yield factory, statements
+        await engine.dispose()
+
+    async def test_write_inserts_only_new_messages(self, factory):
+        """Test a turn inserts its messages without rewriting the stored history."""
+        _, statements = factory
+        manager = ContextManager(flush_delay=60)
+        await manager.update_context("s1", _message("first"))
+        await manager.flush()
+        statements.clear()
+
+        await manager.update_context("s1", _message("second"))
+        await manager.flush()
+
+        inserts = [s for s in statements if s.startswith("INSERT")]
+        assert len(inserts) == 1 and "ai_messages" in inserts[0]
+        assert not any("conversation_history" in s for s in statements)
+
+    async def test_history_reloaded_from_messages(self, factory):
+        """Test a reloaded context gets its history from the stored messages."""
+        manager = ContextManager(flush_delay=60)
+        await manager.update_context("s1", _message("question"))
+        await manager.flush()
+
+        context = await ContextManager().get_context("s1")
+
+        assert [(m["seq"], m["content"]) for m in context.conversation_history] == [(0, "question")]
+
+    async def test_pruned_and_cleared_messages_deleted(self, factory):
+        """Test pruning and clearing the history delete the dropped rows."""
+        session_factory, _ = factory
+        manager = ContextManager(flush_delay=60)
+        for i in range(100):
+            await manager.update_context("s1", _message(str(i)))
+        await manager.flush()
+
+        # The history keeps the last 100 messages
+        await manager.update_context("s1", _message("100"))
+        await manager.flush()
+
+        async with session_factory() as db:
+            rows = (await db.execute(select(AIContextMessage).order_by(AIContextMessage.seq))).scalars().all()
+        assert len(rows) == 100
+        assert (rows[0].seq, rows[-1].seq) == (1, 100)
+
+        await manager.clear_history("s1")
+        await manager.update_context("s1", _message("fresh"))
+        await manager.flush()
+
+        async with session_factory() as db:
+            rows = (await db.execute(select(AIContextMessage))).scalars().all()
+        assert [(m.seq, m.content) for m in rows] == [(0, "fresh")]
+
+    async def test_clear_without_loading_context(self, factory):
+        """Test clearing an uncached session deletes its messages without loading it."""
+        session_factory, statements = factory
+        manager = ContextManager(flush_delay=60)
+        await manager.update_context("s1", _message("question"))
+        await manager.flush()
+        statements.clear()
+
+        await ContextManager().clear_history("s1")
+
+        assert len(statements) == 1 and statements[0].startswith("DELETE FROM ai_messages")
+        async with session_factory() as db:
+            assert (await db.execute(select(AIContextMessage))).scalars().all() == []
+
+
+class TestContextCache:
+    """Tests for ContextManager's bounded context cache."""
+
+    def _context(self, session_id: str) -> AIContext:
+        return AIContext(session_id=session_id, user_id="u1")
+
+    def test_lru_eviction_and_expiry(self):
+        """Test the cache evicts the least recently used context and drops expired ones."""
+        manager = ContextManager(cache_size=2)
+        manager._cache_context(self._context("a"))
+        manager._cache_context(self._context("b"))
+        manager._get_cached("a")
+        manager._cache_context(self._context("c"))
+
+        assert manager._get_cached("b") is None
+        assert manager._get_cached("a") is not None
+
+        expired = ContextManager(cache_ttl=-1)
+        expired._cache_context(self._context("a"))
+        assert expired._get_cached("a") is None
+
+    async def test_concurrent_misses_share_one_load(self, monkeypatch):
+        """Test concurrent lookups of an uncached session run a single query."""
+        queries = []
+
+        class FakeResult:
+            def scalar_one_or_none(self):
+                return AIContext(session_id="s1", user_id="u1")
+
+        class FakeSession:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def execute(self, statement):
+                queries.append(statement)
+                await asyncio.sleep(0.01)
+                return FakeResult()
+
+        monkeypatch.setattr(ai_service, "AsyncSessionLocal", FakeSession)
+        manager = ContextManager()
+
+        contexts = await asyncio.gather(*(manager.get_context("s1") for _ in range(5)))
+
+        assert len(queries) == 1
+        assert all(context is contexts[0] for context in contexts)
+        assert (await manager.get_context("s1")) is contexts[0]
+        assert manager.get_cache_stats()["hits"] == 1
+
+
+class TestContextStats:
+    """Tests for AIService context statistics."""
+
+    async def test_stats_use_maintained_token_counter(self):
+        """Test token counts come from the context's usage totals rather than its messages."""
+        service = AIService(AIConfig(default_provider=AIProvider.LOCAL))
+        service.context_manager = ContextManager(flush_delay=60)
+        context = AIContext(session_id="s1", user_id="u1")
+        context.add_message("user", "hello", tokens=3)
+        context.add_message("assistant", "hi there", tokens=5)
+        service.context_manager._cache_context(context)
+
+        context_data = await service.get_context("s1", limit=1)
+        stats = await service.get_context_stats("s1")
+
+        assert context_data["total_messages"] == 1
+        assert context_data["context_tokens"] == 8
+        assert stats["total_tokens"] == 8
+
+
+class TestRateLimiting:
+    """Tests for AsyncTokenBucket and throttled provider calls."""
+
+    async def test_bucket_allows_burst_then_waits(self):
+        """Test the bucket serves a burst immediately and refills at its rate."""
+        bucket = AsyncTokenBucket(rate_per_minute=600, burst=2)
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        await bucket.acquire()
+        await bucket.acquire()
+        assert loop.time() - start < 0.05
+
+        await bucket.acquire()
+        assert loop.time() - start >= 0.09
+
+    def test_rate_adapts_to_rate_limits(self):
+        """Test the rate halves on rate limits and recovers additively."""
+        bucket = AsyncTokenBucket(rate_per_minute=600, burst=1)
+
+        bucket.record_rate_limited()
+        bucket.record_rate_limited()
+        assert bucket.rate == pytest.approx(2.5)
+
+        bucket.record_success()
+        assert bucket.rate == pytest.approx(3.0)
+        for _ in range(50):
+            bucket.record_success()
+        assert bucket.rate == pytest.approx(10.0)
+
+    async def test_rate_limited_calls_retried(self, monkeypatch):
+        """Test a throttled provider call is retried and slows the bucket."""
+        monkeypatch.setattr(ai_service, "RATE_LIMIT_BACKOFF", 0)
+
+        class ThrottledProvider(BaseAIProvider):
+            calls = 0
+
+            async def generate_response(self, messages, **kwargs):
+                self.calls += 1
+                if self.calls == 1:
+                    raise AIProviderRateLimitError("slow down")
+                return AIResponse(content="ok")
+
+            async def stream_response(self, messages, **kwargs):
+                yield ""
+
+            async def estimate_tokens(self, text):
+                return 0
+
+            async def validate_connection(self):
+                return True
+
+        service = AIService(AIConfig())
+        provider = ThrottledProvider(service.config)
+
+        response = await service._call_provider(AIProvider.LOCAL, provider, [_message("hi")])
+
+        assert response.content == "ok"
+        assert provider.calls == 2
+        limiter = service._get_rate_limiter(AIProvider.LOCAL, service.config.default_model)
+        assert limiter.rate < limiter.max_rate
+
+
+class TestSingleFlight:
+    """Tests for coalescing identical in-flight calls."""
+
+    async def test_concurrent_calls_share_result(self):
+        """Test callers with the same key share one call while it is in flight."""
+        inflight = {}
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return AIResponse(content="shared")
+
+        results = await asyncio.gather(*(ai_service._single_flight(inflight, "k", call) for _ in range(3)))
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert inflight == {}
+
+        await ai_service._single_flight(inflight, "k", call)
+        assert len(calls) == 2
+
+    async def test_errors_reach_every_caller(self):
+        """Test a failed call raises in all callers waiting on it."""
+        inflight = {}
+
+        async def call():
+            await asyncio.sleep(0.01)
+            raise AIProviderRateLimitError("slow down")
+
+        results = await asyncio.gather(
+            *(ai_service._single_flight(inflight, "k", call) for _ in range(2)),
+            return_exceptions=True
+        )
+
+        assert all(isinstance(result, AIProviderRateLimitError) for result in results)
+
+    async def test_follower_reruns_after_cancelled_call(self):
+        """Test waiting callers run the call themselves when the running caller is cancelled."""
+        inflight = {}
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.05 if len(calls) == 1 else 0)
+            return "done"
+
+        leader = asyncio.create_task(ai_service._single_flight(inflight, "k", call))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(ai_service._single_flight(inflight, "k", call))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "done"
+        assert len(calls) == 2
+
+
+class TestBufferedStream:
+    """Tests for reading provider streams ahead of the consumer."""
+
+    async def test_source_read_ahead_of_slow_consumer(self):
+        """Test the source is drained into the buffer while the consumer waits."""
+        read = []
+
+        async def source():
+            for i in range(5):
+                read.append(i)
+                yield i
+
+        stream = ai_service._buffered_stream(source(), maxsize=10)
+        assert await stream.__anext__() == 0
+        await asyncio.sleep(0.01)
+
+        assert read == [0, 1, 2, 3, 4]
+        assert [item async for item in stream] == [1, 2, 3, 4]
+
+    async def test_source_error_raised_to_consumer(self):
+        """Test an error reading the source ends the stream with that error."""
+        async def source():
+            yield "partial"
+            raise RuntimeError("connection reset")
+
+        received = []
+        with pytest.raises(RuntimeError, match="connection reset"):
+            async for item in ai_service._buffered_stream(source()):
+                received.append(item)
+        assert received == ["partial"]
+
+    async def test_closing_consumer_stops_source(self):
+        """Test abandoning the stream cancels the background read."""
+        closed = asyncio.Event()
+
+        async def source():
+            try:
+                while True:
+                    yield "token"
+            finally:
+                closed.set()
+
+        stream = ai_service._buffered_stream(source(), maxsize=2)
+        await stream.__anext__()
+        await stream.aclose()
+
+        await asyncio.wait_for(closed.wait(), timeout=1)
+
+
+class TestRelevantCommands:
+    """Tests for selecting terminal commands relevant to the user's question."""
+
+    def _commands(self, *lines):
+        return [{"command": line, "output": "", "exitCode": 0} for line in lines]
+
+    def test_defaults_to_most_recent(self):
+        """Test the latest commands are chosen when nothing matches the query."""
+        commands = self._commands("a", "b", "c", "d", "e")
+
+        picked = ai_service._relevant_commands(commands, "what now?", 3)
+
+        assert [c["command"] for c in picked] == ["c", "d", "e"]
+
+    def test_matching_older_command_included(self):
+        """Test an older command matching the query is kept, in chronological order."""
+        commands = self._commands("docker build .", "ls", "cd src", "git status", "pwd")
+        commands[0]["output"] = "error: failed to solve"
+
+        picked = ai_service._relevant_commands(commands, "why did docker build fail?", 3)
+
+        assert [c["command"] for c in picked] == ["docker build .", "git status", "pwd"]
+
+
+class TestOutputHead:
+    """Tests for truncating command output before explaining it."""
+
+    def test_text_bytes_and_streams(self):
+        """Test each kind of output is cut to the limit, reading no further from a stream."""
+        stream = io.BytesIO(b"x" * 10_000)
+
+        assert ai_service._output_head("abcdef", 3) == "abc"
+        assert ai_service._output_head("caf\u00e9 au lait".encode(), 4) == "caf\ufffd"
+        assert ai_service._output_head(stream, 5) == "xxxxx"
+        assert stream.tell() == 5
+
+
+class TestResponseDeadline:
+    """Tests for the whole-turn deadline in AIService.generate_response()."""
+
+    async def test_slow_provider_times_out(self):
+        """Test a provider call running past config.timeout returns a timeout error."""
+        class SlowProvider(BaseAIProvider):
+            async def generate_response(self, messages, **kwargs):
+                await asyncio.sleep(1)
+                return AIResponse(content="late")
+
+            async def stream_response(self, messages, **kwargs):
+                yield ""
+
+            async def estimate_tokens(self, text):
+                return 0
+
+            async def validate_connection(self):
+                return True
+
+        service = AIService(AIConfig(default_provider=AIProvider.LOCAL, timeout=0.05))
+        service.providers[AIProvider.LOCAL] = SlowProvider(service.config)
+        service.context_manager._cache_context(AIContext(session_id="s1", user_id="u1"))
+
+        response = await service.generate_response("s1", "hello")
+
+        assert response.error == "AI response timed out"
+        assert response.processing_time < 0.5
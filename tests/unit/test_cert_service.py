@@ -0,0 +1,341 @@
+"""
+Unit tests for the certificate service.
+
+Tests:
+- Fingerprint formatting
+- Reuse of parsed certificates
+- PEM export
+- Trust status of local certificates
+- Parsing local certificate chains
+- Shared TLS context
+- Certificate comparison
+- Fetching certificates from a TLS server
+- Fetching AIA intermediates
+"""
+
+import asyncio
+import hashlib
+import ssl
+import pytest
+from datetime import datetime, timezone, timedelta
+
+from aiohttp import web
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import AuthorityInformationAccessOID, NameOID
+
+from src.models.certificate import TrustStatus
+from src.services.cert_service import CertService
+
+
+def _make_cert(common_name: str = "example.com", days: int = 30) -> x509.Certificate:
+    """Create a self-signed certificate."""
+    return _make_key_and_cert(common_name, days)[1]
+
+
+def _make_key_and_cert(common_name: str, days: int = 30):
+    """Create a private key and a self-signed certificate for it."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=days))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName(common_name)]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    return key, cert
+
+
+def _issue_chain(base_url: str, depth: int):
+    """Create a root CA, depth - 1 intermediates and a leaf, each pointing at its issuer by AIA.
+
+    Returns the leaf and a map of URL path to issuer DER bytes.
+    """
+    now = datetime.now(timezone.utc)
+    issuer_key = ec.generate_private_key(ec.SECP256R1())
+    issuer_name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Root CA")])
+    issuer_cert = (
+        x509.CertificateBuilder()
+        .subject_name(issuer_name)
+        .issuer_name(issuer_name)
+        .public_key(issuer_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=30))
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(issuer_key, hashes.SHA256())
+    )
+    served = {}
+
+    for level in range(depth):
+        path = f"/ca{level}.der"
+        served[path] = issuer_cert.public_bytes(serialization.Encoding.DER)
+        key = ec.generate_private_key(ec.SECP256R1())
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, f"Level {level}")])
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(issuer_cert.subject)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(days=1))
+            .not_valid_after(now + timedelta(days=30))
+            .add_extension(x509.BasicConstraints(ca=level < depth - 1, path_length=None), critical=True)
+            .add_extension(x509.AuthorityInformationAccess([
+                x509.AccessDescription(
+                    AuthorityInformationAccessOID.CA_ISSUERS,
+                    x509.UniformResourceIdentifier(base_url + path)
+                )
+            ]), critical=False)
+            .sign(issuer_key, hashes.SHA256())
+        )
+        issuer_key, issuer_cert = key, cert
+
+    return issuer_cert, served
+
+
+@pytest.fixture
+def service():
+    """Create a CertService instance."""
+    return CertService()
+
+
+@pytest.fixture
+def der_data():
+    """DER encoding of a self-signed certificate."""
+    return _make_cert().public_bytes(serialization.Encoding.DER)
+
+
+class TestFingerprints:
+    """Tests for certificate fingerprints."""
+
+    def test_fingerprints_are_colon_separated_hex(self, service, der_data):
+        """Test fingerprints are the uppercase digests of the DER encoding."""
+        cert = service._parse_der_certificate(der_data)
+
+        expected = ":".join(f"{b:02X}" for b in hashlib.sha256(der_data).digest())
+        assert cert.public_key.fingerprint_sha256 == expected
+        assert cert.public_key.fingerprint_sha1 == ":".join(f"{b:02X}" for b in hashlib.sha1(der_data).digest())
+
+
+class TestPemData:
+    """Tests for the PEM encoding of parsed certificates."""
+
+    def test_pem_matches_certificate_encoding(self, service):
+        """Test the PEM derived from DER matches the certificate's own PEM encoding."""
+        cert = _make_cert()
+        parsed = service._parse_der_certificate(cert.public_bytes(serialization.Encoding.DER))
+
+        assert parsed.pem_data == cert.public_bytes(serialization.Encoding.PEM).decode()
+        assert parsed.to_dict()["pem_data"] == parsed.pem_data
+
+
+class TestParseLocalCert:
+    """Tests for CertService.parse_local_cert()."""
+
+    async def test_trust_status_from_validity(self, service, tmp_path):
+        """Test a local certificate's trust status reflects its validity period."""
+        valid_path = tmp_path / "valid.pem"
+        expired_path = tmp_path / "expired.der"
+        valid_path.write_bytes(_make_cert().public_bytes(serialization.Encoding.PEM))
+        expired_path.write_bytes(_make_cert(days=-0.5).public_bytes(serialization.Encoding.DER))
+
+        assert (await service.parse_local_cert(str(valid_path))).trust_status == TrustStatus.UNKNOWN
+        assert (await service.parse_local_cert(str(expired_path))).trust_status == TrustStatus.EXPIRED
+
+    async def test_first_certificate_of_fullchain(self, service, tmp_path):
+        """Test a PEM file with several certificates parses to its first one."""
+        leaf, issuers = _issue_chain("http://127.0.0.1", depth=2)
+        path = tmp_path / "fullchain.pem"
+        path.write_bytes(leaf.public_bytes(serialization.Encoding.PEM) + b"".join(
+            x509.load_der_x509_certificate(issuers[p]).public_bytes(serialization.Encoding.PEM)
+            for p in ("/ca1.der", "/ca0.der")
+        ))
+
+        cert = await service.parse_local_cert(str(path))
+        chain = await service.parse_local_chain(str(path))
+
+        assert "CN=Level 1" in cert.subject
+        assert chain.leaf.der_data == cert.der_data
+        assert ["CN=Level 0" in c.subject for c in chain.intermediates] == [True]
+        assert chain.root.is_self_signed
+        assert chain.leaf.trust_status == TrustStatus.TRUSTED
+
+
+class TestParseCache:
+    """Tests for reusing parses of the same DER bytes."""
+
+    def test_repeated_parse_reuses_result(self, service, der_data):
+        """Test parsing the same bytes twice parses them once."""
+        first = service._parse_der_certificate(der_data)
+        second = service._parse_der_certificate(der_data)
+
+        assert first == second
+        assert service._parse_der_cached.cache_info().hits == 1
+
+    def test_parsed_copies_are_independent(self, service, der_data):
+        """Test updating one parse's trust status does not change later parses."""
+        first = service._parse_der_certificate(der_data)
+        first.trust_status = TrustStatus.TRUSTED
+
+        assert service._parse_der_certificate(der_data).trust_status == TrustStatus.UNKNOWN
+
+
+class TestCompareCertificates:
+    """Tests for CertService.compare_certificates()."""
+
+    def test_same_certificate_is_identical(self, service, der_data):
+        """Test two parses of the same certificate compare identical."""
+        first = service._parse_der_certificate(der_data)
+        second = service._parse_der_certificate(der_data)
+
+        result = service.compare_certificates(first, second)
+
+        assert result["identical"] and result["serial_match"]
+
+    def test_differences_reported(self, service):
+        """Test differing certificates report their changed fields."""
+        first = service._parse_der_certificate(_make_cert("a.example.com").public_bytes(serialization.Encoding.DER))
+        second = service._parse_der_certificate(_make_cert("b.example.com").public_bytes(serialization.Encoding.DER))
+
+        result = service.compare_certificates(first, second)
+
+        fields = {d["field"]: d for d in result["differences"]}
+        assert not result["identical"]
+        assert fields["san"]["added"] == ["<DNSName(value='b.example.com')>"]
+        assert {"subject", "issuer", "public_key"} <= fields.keys()
+
+
+class TestSSLContext:
+    """Tests for the TLS context used to fetch remote certificates."""
+
+    def test_context_created_once_and_verifies(self, service):
+        """Test fetches share one verifying context."""
+        context = service._ssl_context
+
+        assert service._ssl_context is context
+        assert context.verify_mode == ssl.CERT_REQUIRED
+        assert context.check_hostname
+
+
+class TestFetchRemoteCert:
+    """Tests for CertService.fetch_remote_cert()."""
+
+    @pytest.fixture
+    async def tls_server(self, tmp_path):
+        """Serve TLS on localhost with a self-signed certificate."""
+        key, cert = _make_key_and_cert("localhost")
+        cert_path = tmp_path / "cert.pem"
+        key_path = tmp_path / "key.pem"
+        cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+        key_path.write_bytes(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ))
+
+        server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_context.load_cert_chain(cert_path, key_path)
+
+        async def handle(reader, writer):
+            await reader.read()
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0, ssl=server_context)
+        port = server.sockets[0].getsockname()[1]
+        yield cert_path, port
+        server.close()
+        await server.wait_closed()
+
+    async def test_fetch_without_blocking_the_loop(self, tls_server):
+        """Test the certificate is fetched over an asyncio connection."""
+        cert_path, port = tls_server
+        service = CertService()
+        service.trust_store_path = str(cert_path)
+
+        chain = await service.fetch_remote_cert("localhost", port, timeout=5)
+
+        assert "CN=localhost" in chain.leaf.subject
+        assert chain.leaf.is_self_signed
+        assert chain.leaf.trust_status == TrustStatus.UNTRUSTED
+        assert chain.port == port
+
+    async def test_untrusted_certificate_rejected(self, tls_server):
+        """Test a certificate outside the trust store fails verification."""
+        _, port = tls_server
+
+        with pytest.raises(ssl.SSLError):
+            await CertService().fetch_remote_cert("localhost", port, timeout=5)
+
+
+class TestIntermediateFetch:
+    """Tests for fetching intermediates named by the AIA extension."""
+
+    @pytest.fixture
+    async def issuer_server(self):
+        """Serve issuer certificates over HTTP, recording the requested paths."""
+        served = {}
+        requests = []
+
+        async def handle(request):
+            requests.append(request.path)
+            if request.path not in served:
+                return web.Response(status=404)
+            return web.Response(body=served[request.path])
+
+        app = web.Application()
+        app.router.add_get("/{name}", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        yield f"http://127.0.0.1:{port}", served, requests
+        await runner.cleanup()
+
+    async def test_chain_walked_to_root(self, service, issuer_server):
+        """Test each issuer is fetched in turn until the self-signed root."""
+        base_url, served, requests = issuer_server
+        leaf, issuers = _issue_chain(base_url, depth=3)
+        served.update(issuers)
+
+        intermediates = await service._fetch_intermediate_certs(
+            service._parse_der_certificate(leaf.public_bytes(serialization.Encoding.DER))
+        )
+        await service.close()
+
+        assert [c.is_self_signed for c in intermediates] == [False, False, True]
+        assert requests == ["/ca2.der", "/ca1.der", "/ca0.der"]
+
+    async def test_failed_fetch_keeps_earlier_intermediates(self, service, issuer_server):
+        """Test a missing issuer ends the chain with the intermediates already fetched."""
+        base_url, served, requests = issuer_server
+        leaf, issuers = _issue_chain(base_url, depth=3)
+        del issuers["/ca0.der"]
+        served.update(issuers)
+
+        intermediates = await service._fetch_intermediate_certs(
+            service._parse_der_certificate(leaf.public_bytes(serialization.Encoding.DER))
+        )
+        await service.close()
+
+        assert len(intermediates) == 2
+        assert requests == ["/ca2.der", "/ca1.der", "/ca0.der"]
+
+    async def test_http_client_shared_until_closed(self, service):
+        """Test fetches share one HTTP client, replaced after close."""
+        client = service._http
+        assert service._http is client
+
+        await service.close()
+
+        assert client.is_closed
+        assert service._http is not client
+        await service.close()
@@ -0,0 +1,225 @@
+"""
+Unit tests for the Recording model.
+
+Tests:
+- Checkpoint lookup by timestamp
+- Incremental event validation
+- Compression statistics
+- Event delta times
+- Retention expiry
+- Event buffering
+- Event range iteration
+"""
+
+import json
+import pytest
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.database.base import Base
+from src.models import Recording
+from src.models.recording import EVENT_FLUSH_THRESHOLD
+
+
+@pytest.fixture
+def recording():
+    """Create an in-memory Recording instance."""
+    return Recording(
+        session_id="test-session-123",
+        user_id="test-user-123",
+        status="recording",
+        events=[],
+        checkpoints=[],
+        file_size=0,
+        event_count=0,
+    )
+
+
+class TestCheckpointLookup:
+    """Tests for Recording.get_checkpoint_at_time()."""
+
+    def test_no_checkpoints(self, recording):
+        """Test lookup on a recording without checkpoints."""
+        assert recording.get_checkpoint_at_time(datetime.now(timezone.utc)) is None
+
+    def test_nearest_checkpoint_before_target(self, recording):
+        """Test lookup returns the last checkpoint at or before the target."""
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        recording.checkpoints = [
+            {"timestamp": (base + timedelta(seconds=i)).isoformat(), "eventIndex": i}
+            for i in range(0, 100, 10)
+        ]
+
+        assert recording.get_checkpoint_at_time(base - timedelta(seconds=1)) is None
+        assert recording.get_checkpoint_at_time(base)["eventIndex"] == 0
+        assert recording.get_checkpoint_at_time(base + timedelta(seconds=25))["eventIndex"] == 20
+        assert recording.get_checkpoint_at_time(base + timedelta(seconds=500))["eventIndex"] == 90
+
+    def test_lookup_sees_new_checkpoints(self, recording):
+        """Test lookup cache is refreshed after adding a checkpoint."""
+        recording.add_checkpoint("first", "")
+        first = recording.get_checkpoint_at_time(datetime.now(timezone.utc))
+        assert first["description"] == "first"
+
+        recording.add_checkpoint("second", "")
+        latest = recording.get_checkpoint_at_time(datetime.now(timezone.utc))
+        assert latest["description"] == "second"
+
+    def test_lookup_sees_replaced_checkpoints(self, recording):
+        """Test lookup cache is refreshed when checkpoints are replaced by a list of the same length."""
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        recording.checkpoints = [{"timestamp": base.isoformat(), "eventIndex": 0}]
+        assert recording.get_checkpoint_at_time(base)["eventIndex"] == 0
+
+        later = base + timedelta(seconds=10)
+        recording.checkpoints = [{"timestamp": later.isoformat(), "eventIndex": 5}]
+
+        assert recording.get_checkpoint_at_time(base) is None
+        assert recording.get_checkpoint_at_time(later)["eventIndex"] == 5
+
+
+class TestEventValidation:
+    """Tests for Recording.validate_events()."""
+
+    def test_appended_events_track_last_timestamp(self, recording):
+        """Test appending events keeps the last validated timestamp current."""
+        for i in range(3):
+            recording.add_event("output", f"line {i}")
+        recording.flush_events()
+
+        assert recording.event_count == 3
+        assert recording._last_event_ts_ms == recording.events[-1]["ts_ms"]
+
+    def test_replacing_events_revalidates_full_list(self, recording):
+        """Test assigning an unrelated list validates it from the start."""
+        recording.add_event("output", "line")
+        recording.flush_events()
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        recording.events = [
+            {"timestamp": (base + timedelta(seconds=i)).isoformat()} for i in range(5)
+        ]
+
+        expected = int((base + timedelta(seconds=4)).timestamp() * 1000)
+        assert recording._last_event_ts_ms == expected
+
+
+class TestCompressionSavings:
+    """Tests for Recording.calculate_compression_savings()."""
+
+    def test_original_size_is_json_size(self, recording):
+        """Test original size is measured on the serialized JSON events."""
+        recording.add_event("output", "hello")
+        recording.add_event("output", "world")
+
+        stats = recording.calculate_compression_savings()
+
+        assert stats["original_size"] == len(json.dumps(recording.events, separators=(",", ":")))
+        assert stats["compressed_size"] == recording.file_size
+
+
+class TestAddEvent:
+    """Tests for Recording.add_event()."""
+
+    def test_delta_time_from_previous_event(self, recording):
+        """Test deltaTime is measured from the previous event timestamp."""
+        past = datetime.now(timezone.utc) - timedelta(seconds=2)
+        recording.events = [{"timestamp": past.isoformat(), "deltaTime": 0}]
+
+        recording.add_event("output", "line")
+        recording.flush_events()
+
+        assert 2000 <= recording.events[-1]["deltaTime"] < 3000
+
+    def test_event_timestamps_in_epoch_milliseconds(self, recording):
+        """Test events carry an integer ts_ms matching their ISO timestamp."""
+        recording.add_event("output", "first")
+        recording.add_event("output", "second")
+        recording.flush_events()
+
+        first, second = recording.events
+        assert isinstance(first["ts_ms"], int)
+        assert second["deltaTime"] == second["ts_ms"] - first["ts_ms"]
+        parsed = datetime.fromisoformat(second["timestamp"])
+        epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        assert (parsed - epoch) // timedelta(milliseconds=1) == second["ts_ms"]
+
+
+class TestRetention:
+    """Tests for Recording retention helpers."""
+
+    def test_expired_query_filters_on_end_time(self):
+        """Test the expired query compares end_time against the cutoff."""
+        sql = str(Recording.expired_query(30).compile())
+
+        assert "recordings.end_time IS NOT NULL" in sql
+        assert "recordings.end_time <" in sql
+
+    def test_is_expired(self, recording):
+        """Test is_expired uses the retention window."""
+        recording.end_time = datetime.now(timezone.utc) - timedelta(days=31)
+        assert recording.is_expired(30)
+        assert not recording.is_expired(60)
+
+
+class TestEventBuffering:
+    """Tests for buffered Recording.add_event() writes."""
+
+    def test_events_buffered_until_flush(self, recording):
+        """Test add_event buffers events and flush_events writes them once."""
+        recording.add_event("output", "first")
+        recording.add_event("output", "second")
+
+        assert recording.events == []
+        assert recording.event_count == 2
+
+        recording.flush_events()
+
+        assert [e["data"] for e in recording.events] == ["first", "second"]
+
+    def test_threshold_triggers_flush(self, recording):
+        """Test reaching the buffer threshold writes the events column."""
+        for i in range(EVENT_FLUSH_THRESHOLD):
+            recording.add_event("output", str(i))
+
+        assert len(recording.events) == EVENT_FLUSH_THRESHOLD
+
+    def test_stop_recording_flushes(self, recording):
+        """Test stopping the recording writes buffered events."""
+        recording.add_event("output", "line")
+        recording.stop_recording()
+
+        assert len(recording.events) == 1
+
+    def test_session_flush_writes_buffered_events(self, recording):
+        """Test the ORM before_flush hook writes buffered events."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(recording)
+            recording.add_event("output", "line")
+            session.flush()
+
+            assert len(recording.events) == 1
+
+
+class TestEventsInRange:
+    """Tests for Recording.get_events_in_range()."""
+
+    def test_range_is_lazy_iterator(self, recording):
+        """Test the range is an iterator over the requested events."""
+        for i in range(5):
+            recording.add_event("output", str(i))
+
+        events = recording.get_events_in_range(1, 3)
+
+        assert not isinstance(events, list)
+        assert [e["data"] for e in events] == ["1", "2"]
+
+    def test_range_is_clamped(self, recording):
+        """Test out-of-bounds indexes are clamped to the event list."""
+        recording.add_event("output", "only")
+
+        assert len(list(recording.get_events_in_range(-5, 50))) == 1
+        assert list(recording.get_events_in_range(3, 5)) == []
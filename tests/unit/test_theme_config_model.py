@@ -0,0 +1,457 @@
+"""
+Unit tests for the ThemeConfiguration model.
+
+Tests:
+- Version, color and custom CSS validation
+- Version compatibility checks
+- Color scheme detection, including bulk classification
+- Dictionary serialization and repr
+- Validation on load versus assignment
+- Relationship loading
+- Download counting
+- Config import
+- Database-generated timestamps
+"""
+
+import json
+import pytest
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import InvalidRequestError
+
+from src.database.base import Base
+
+from src.models import ThemeConfiguration
+
+REQUIRED_COLORS = [
+    "background", "foreground", "cursor", "selection",
+    "black", "red", "green", "yellow", "blue", "magenta", "cyan", "white",
+    "brightBlack", "brightRed", "brightGreen", "brightYellow",
+    "brightBlue", "brightMagenta", "brightCyan", "brightWhite"
+]
+
+
+@pytest.fixture
+def theme():
+    """Create an in-memory ThemeConfiguration instance."""
+    return ThemeConfiguration(name="Test Theme", author="tester")
+
+
+class TestVersionValidation:
+    """Tests for ThemeConfiguration.validate_version()."""
+
+    @pytest.mark.parametrize("version", ["1.0.0", "10.20.30", "1.0.0-beta.1", "1.0.0+build.5", "2.1.0-rc.1+sha.abc"])
+    def test_valid_versions(self, theme, version):
+        """Test semantic versions are accepted."""
+        theme.version = version
+        assert theme.version == version
+
+    @pytest.mark.parametrize("version", ["1.0", "1.0.0.0", "v1.0.0", "1.a.0", "1.0.0-", ""])
+    def test_invalid_versions(self, theme, version):
+        """Test malformed versions are rejected."""
+        with pytest.raises(ValueError):
+            theme.version = version
+
+
+class TestVersionCompatibility:
+    """Tests for ThemeConfiguration.is_compatible_with_version()."""
+
+    @pytest.mark.parametrize("version,minimum,expected", [
+        ("1.2.3", "1.2.3", True),
+        ("1.2.3", "1.2", True),
+        ("1.2.0", "1.2", True),
+        ("1.2.3", "1.3", False),
+        ("2.0.0", "1.9.9", True),
+        ("1.0.0", "1.0.0.1", False),
+        ("1.0.0-beta", "1.0.0", False),
+    ])
+    def test_compatibility(self, theme, version, minimum, expected):
+        """Test version comparison pads missing components with zeros."""
+        theme.version = version
+        assert theme.is_compatible_with_version(minimum) is expected
+
+
+class TestColorValidation:
+    """Tests for ThemeConfiguration color validation."""
+
+    @pytest.mark.parametrize("color", ["#fff", "#a1b2c3", "#ffffff40", "rgb(0, 0, 0)", "rgba(255,255,255,0.5)"])
+    def test_valid_colors(self, theme, color):
+        """Test hex and rgba colors are accepted."""
+        assert theme._is_valid_color(color)
+
+    @pytest.mark.parametrize("color", ["fff", "#ffff", "#ggg", "#0xabcd", "#-fffff", "rgb(256, 0, 0)", "red", None, "#"])
+    def test_invalid_colors(self, theme, color):
+        """Test malformed colors are rejected."""
+        assert not theme._is_valid_color(color)
+
+    def test_complete_palette_accepted(self, theme):
+        """Test a palette defining every required color is accepted."""
+        colors = {name: "#000000" for name in REQUIRED_COLORS}
+        theme.colors = colors
+        assert theme.colors == colors
+
+    def test_missing_required_color(self, theme):
+        """Test a palette missing a required color is rejected."""
+        with pytest.raises(ValueError, match="Missing required color: foreground"):
+            theme.colors = {"background": "#000000"}
+
+    def test_invalid_palette_color(self, theme):
+        """Test a palette with a malformed color is rejected."""
+        colors = {name: "#000000" for name in REQUIRED_COLORS}
+        colors["red"] = "not-a-color"
+        with pytest.raises(ValueError, match="Invalid color format for red"):
+            theme.colors = colors
+
+
+class TestCustomCssValidation:
+    """Tests for ThemeConfiguration.validate_custom_css()."""
+
+    @pytest.mark.parametrize("css", [
+        "@import url(http://evil)",
+        "width: expression(alert(1))",
+        "background: url(JavaScript:alert(1))",
+        "background: url(vbscript:foo)",
+        "background: url(data:text/html;script)",
+    ])
+    def test_dangerous_css_rejected(self, theme, css):
+        """Test dangerous CSS constructs are rejected."""
+        with pytest.raises(ValueError, match="potentially dangerous"):
+            theme.custom_css = css
+
+    def test_oversized_css_rejected(self, theme):
+        """Test custom CSS above 50KB is rejected."""
+        with pytest.raises(ValueError, match="50KB"):
+            theme.custom_css = "a" * 50001
+
+    def test_size_checked_before_patterns(self, theme):
+        """Test oversized CSS is rejected on size even if it is also dangerous."""
+        with pytest.raises(ValueError, match="50KB"):
+            theme.custom_css = "@import url(x);" + "a" * 50000
+
+    def test_safe_css_accepted(self, theme):
+        """Test ordinary CSS is accepted."""
+        theme.custom_css = ".terminal { color: #fff; }"
+        assert theme.custom_css == ".terminal { color: #fff; }"
+
+
+class TestColorSchemeType:
+    """Tests for ThemeConfiguration.get_color_scheme_type()."""
+
+    @pytest.mark.parametrize("background,expected", [
+        ("#000000", "dark"),
+        ("#ffffff", "light"),
+        ("#fff", "light"),
+        ("rgb(255, 255, 255)", "dark"),
+    ])
+    def test_scheme_type(self, theme, background, expected):
+        """Test the scheme type follows background luminance."""
+        theme.colors = {color: "#000000" for color in REQUIRED_COLORS} | {"background": background}
+        assert theme.get_color_scheme_type() == expected
+
+    def test_cache_follows_background_changes(self, theme):
+        """Test the memoized scheme type is recomputed when the background changes."""
+        theme.colors = {color: "#000000" for color in REQUIRED_COLORS}
+        assert theme.get_color_scheme_type() == "dark"
+
+        theme.import_config({"colors": {color: "#ffffff" for color in REQUIRED_COLORS}})
+        assert theme.get_color_scheme_type() == "light"
+
+        theme.colors["background"] = "#000000"
+        assert theme.get_color_scheme_type() == "dark"
+
+    def test_scheme_type_stored_when_colors_set(self, theme):
+        """Test assigning colors stores the derived scheme type column."""
+        theme.colors = {color: "#ffffff" for color in REQUIRED_COLORS}
+
+        assert theme.scheme_type == "light"
+
+    def test_loaded_theme_reads_stored_scheme_type(self):
+        """Test loaded themes use the stored column without reclassifying."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(ThemeConfiguration(
+                theme_id="stored", name="Stored", author="tester",
+                colors={color: "#ffffff" for color in REQUIRED_COLORS},
+            ))
+            session.commit()
+            session.expunge_all()
+
+            theme = session.get(ThemeConfiguration, "stored")
+            assert "_scheme_type_cache" not in theme.__dict__
+            assert theme.get_color_scheme_type() == "light"
+
+
+class TestBulkColorSchemeTypes:
+    """Tests for ThemeConfiguration.compute_scheme_types()."""
+
+    BACKGROUNDS = ["#000000", "#ffffff", "#fff", "#808080", "#7f7f7f", "#ffffff80", "rgb(255, 255, 255)"]
+
+    def _themes(self):
+        themes = []
+        for background in self.BACKGROUNDS:
+            theme = ThemeConfiguration(name="Bulk", author="tester")
+            theme.colors = {color: "#000000" for color in REQUIRED_COLORS} | {"background": background}
+            themes.append(theme)
+        return themes
+
+    def test_matches_per_theme_result(self):
+        """Test bulk classification matches get_color_scheme_type()."""
+        expected = [theme.get_color_scheme_type() for theme in self._themes()]
+        assert ThemeConfiguration.compute_scheme_types(self._themes()) == expected
+
+    def test_vectorized_path_matches_scalar_path(self):
+        """Test the NumPy path agrees with the scalar luminance formula."""
+        pytest.importorskip("numpy")
+        from src.models.theme_config import _bulk_scheme_types, _scheme_type_for_background
+
+        assert _bulk_scheme_types(self.BACKGROUNDS) == [
+            _scheme_type_for_background(background) for background in self.BACKGROUNDS
+        ]
+
+    def test_primes_scheme_type_cache(self):
+        """Test bulk classification is reused by later per-theme lookups."""
+        themes = self._themes()
+        ThemeConfiguration.compute_scheme_types(themes)
+
+        assert themes[1].__dict__["_scheme_type_cache"] == ("#ffffff", "light")
+        assert themes[1].get_color_scheme_type() == "light"
+
+
+class TestToDict:
+    """Tests for ThemeConfiguration.to_dict()."""
+
+    def test_serialized_fields(self, theme):
+        """Test timestamps, rating and scheme type are converted."""
+        theme.colors = {color: "#ffffff" for color in REQUIRED_COLORS}
+        theme.rating = 425
+        theme.created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+        data = theme.to_dict()
+
+        assert data["rating"] == 4.25
+        assert data["created_at"] == "2025-01-01T00:00:00+00:00"
+        assert data["updated_at"] is None
+        assert data["scheme_type"] == "light"
+
+    def test_repr(self, theme):
+        """Test repr shows identifying fields and the rating to two decimals."""
+        theme.theme_id = "abc"
+        theme.version = "1.2.3"
+        theme.rating = 450
+
+        assert repr(theme) == (
+            "<ThemeConfiguration(theme_id='abc', name='Test Theme', "
+            "version='1.2.3', author='tester', rating=4.50)>"
+        )
+
+
+class TestValidationOnLoad:
+    """Tests for validator behaviour on database-loaded themes."""
+
+    @pytest.fixture
+    def session(self):
+        """Create a SQLite session holding one theme row inserted without validation."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.execute(insert(ThemeConfiguration).values(
+                theme_id="loaded-theme",
+                name="Loaded",
+                author="tester",
+                version="legacy",
+                colors={"background": "#000000"},
+            ))
+            yield session
+
+    def test_loaded_rows_are_not_revalidated(self, session):
+        """Test loading a stored theme does not run the attribute validators."""
+        theme = session.scalars(select(ThemeConfiguration)).one()
+
+        assert theme.version == "legacy"
+
+    def test_persistent_edits_are_validated(self, session):
+        """Test assigning to a loaded theme still runs the validators."""
+        theme = session.scalars(select(ThemeConfiguration)).one()
+
+        with pytest.raises(ValueError):
+            theme.custom_css = "body { background: url(javascript:alert(1)) }"
+
+
+class TestRelationshipLoading:
+    """Tests for ThemeConfiguration relationship loading."""
+
+    @pytest.fixture
+    def session(self):
+        """Create a SQLite session holding one stored theme."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(ThemeConfiguration(name="Stored", author="tester"))
+            session.commit()
+            session.expunge_all()
+            yield session
+
+    def test_lazy_load_raises(self, session):
+        """Test implicit relationship loads are rejected."""
+        theme = session.scalars(select(ThemeConfiguration)).one()
+
+        with pytest.raises(InvalidRequestError):
+            theme.terminal_sessions
+        with pytest.raises(InvalidRequestError):
+            theme.user_profiles
+
+    def test_with_sessions_query_eager_loads(self, session):
+        """Test the eager-loading query populates terminal sessions."""
+        theme = session.scalars(ThemeConfiguration.with_sessions_query()).one()
+
+        assert theme.terminal_sessions == []
+
+
+class TestDownloadCount:
+    """Tests for ThemeConfiguration.increment_download_count()."""
+
+    def test_transient_theme_increments_in_python(self, theme):
+        """Test unsaved themes count downloads locally."""
+        theme.increment_download_count()
+        theme.increment_download_count()
+
+        assert theme.download_count == 2
+
+    def test_concurrent_increments_are_not_lost(self):
+        """Test increments from separate sessions are applied atomically."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(ThemeConfiguration(theme_id="counted", name="Counted", author="tester", download_count=0))
+            session.commit()
+
+        with Session(engine) as first, Session(engine) as second:
+            first_theme = first.get(ThemeConfiguration, "counted")
+            second_theme = second.get(ThemeConfiguration, "counted")
+            assert first_theme.download_count == second_theme.download_count == 0
+
+            first_theme.increment_download_count()
+            first.commit()
+            second_theme.increment_download_count()
+            second.commit()
+
+            assert second_theme.download_count == 2
+
+    def test_increments_readable_before_flush(self):
+        """Test stored themes expose the new count and serialize before the flush."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(ThemeConfiguration(theme_id="counted", name="Counted", author="tester", download_count=0))
+            session.commit()
+
+            theme = session.get(ThemeConfiguration, "counted")
+            theme.increment_download_count()
+            theme.increment_download_count()
+
+            assert theme.download_count == 2
+            assert json.loads(json.dumps(theme.to_dict()))["download_count"] == 2
+
+            session.commit()
+            assert theme.download_count == 2
+
+    def test_double_increment_with_concurrent_download(self):
+        """Test several pending increments are added to the count stored by other sessions."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(ThemeConfiguration(theme_id="counted", name="Counted", author="tester", download_count=0))
+            session.commit()
+
+        with Session(engine) as first, Session(engine) as second:
+            first_theme = first.get(ThemeConfiguration, "counted")
+            second_theme = second.get(ThemeConfiguration, "counted")
+            second_theme.increment_download_count()
+            second.commit()
+
+            first_theme.increment_download_count()
+            first_theme.increment_download_count()
+            first.commit()
+
+            assert first_theme.download_count == 3
+
+    def test_rolled_back_increments_discarded(self):
+        """Test increments undone by a rollback are not written by a later flush."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(ThemeConfiguration(theme_id="counted", name="Counted", author="tester", download_count=0))
+            session.commit()
+
+            theme = session.get(ThemeConfiguration, "counted")
+            theme.increment_download_count()
+            session.rollback()
+            theme.name = "Renamed"
+            session.commit()
+
+            assert theme.download_count == 0
+
+
+class TestImportConfig:
+    """Tests for ThemeConfiguration.import_config()."""
+
+    def test_unchanged_fields_skip_validation(self, theme, monkeypatch):
+        """Test re-importing identical values does not re-run validators."""
+        palette = {color: "#000000" for color in REQUIRED_COLORS}
+        theme.import_config({"colors": palette, "version": "1.0.0"})
+
+        calls = []
+        original = ThemeConfiguration._is_valid_color
+        monkeypatch.setattr(
+            ThemeConfiguration, "_is_valid_color",
+            lambda self, color: calls.append(color) or original(self, color)
+        )
+        theme.import_config({"colors": dict(palette), "version": "1.0.0"})
+
+        assert calls == []
+        assert theme.updated_at is not None
+
+    def test_changed_fields_are_assigned(self, theme):
+        """Test imported values replace differing fields."""
+        theme.import_config({"name": "Imported", "custom_css": ".a { color: red }", "unknown": 1})
+
+        assert theme.name == "Imported"
+        assert theme.custom_css == ".a { color: red }"
+
+
+class TestTimestamps:
+    """Tests for ThemeConfiguration timestamp server defaults."""
+
+    def test_timestamps_generated_on_insert(self):
+        """Test created_at and updated_at are fetched during the insert flush."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            theme = ThemeConfiguration(name="Timestamped", author="tester")
+            session.add(theme)
+            session.flush()
+
+            assert "created_at" in theme.__dict__
+            assert isinstance(theme.created_at, datetime)
+            assert isinstance(theme.updated_at, datetime)
+
+    def test_updated_at_refreshed_on_update(self):
+        """Test updating a theme regenerates updated_at."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            theme = ThemeConfiguration(
+                name="Timestamped", author="tester",
+                updated_at=datetime(2020, 1, 1, tzinfo=timezone.utc),
+            )
+            session.add(theme)
+            session.flush()
+
+            theme.name = "Renamed"
+            session.flush()
+
+            assert "updated_at" in theme.__dict__
+            assert theme.updated_at.year > 2020
@@ -0,0 +1,462 @@
+"""
+Unit tests for the UserProfile model.
+
+Tests:
+- Username, email, display name and avatar URL validation
+- Column defaults
+- Theme installation bookkeeping
+- Installed collection loading, with and without the collections
+- Preference updates
+- Database-generated timestamps
+- Database-computed storage usage
+- Serialization
+"""
+
+import pytest
+from dataclasses import FrozenInstanceError
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+from src.database.base import Base
+
+from src.models import ThemeConfiguration, UserProfile
+from src.models.user_profile import AccountSummary
+
+
+@pytest.fixture
+def profile():
+    """Create an in-memory UserProfile instance."""
+    return UserProfile(username="tester", email="tester@example.com", display_name="Tester")
+
+
+class TestUsernameValidation:
+    """Tests for UserProfile.validate_username()."""
+
+    @pytest.mark.parametrize("username", ["abc", "User_Name-1", "a" * 50])
+    def test_valid_usernames(self, profile, username):
+        """Test usernames are accepted and normalized to lowercase."""
+        profile.username = username
+        assert profile.username == username.lower()
+
+    @pytest.mark.parametrize("username", ["", "ab", "a" * 51, "bad name", "bad.name", "name\n", "ünï"])
+    def test_invalid_usernames(self, profile, username):
+        """Test malformed usernames are rejected."""
+        with pytest.raises(ValueError):
+            profile.username = username
+
+
+class TestEmailValidation:
+    """Tests for UserProfile.validate_email()."""
+
+    def test_valid_email_normalized(self, profile):
+        """Test emails are accepted and normalized to lowercase."""
+        profile.email = "First.Last+tag@Example.ORG"
+        assert profile.email == "first.last+tag@example.org"
+
+    @pytest.mark.parametrize("email", ["", "plain", "no-at.example.com", "user@host", "user@example.com\n"])
+    def test_invalid_emails(self, profile, email):
+        """Test malformed emails are rejected."""
+        with pytest.raises(ValueError):
+            profile.email = email
+
+
+class TestDisplayNameValidation:
+    """Tests for UserProfile.validate_display_name()."""
+
+    def test_display_name_stripped(self, profile):
+        """Test surrounding whitespace is removed."""
+        profile.display_name = "  Tester  "
+        assert profile.display_name == "Tester"
+
+    @pytest.mark.parametrize("name", ["", "   ", "x" * 101])
+    def test_invalid_display_names(self, profile, name):
+        """Test empty, blank and overlong display names are rejected."""
+        with pytest.raises(ValueError):
+            profile.display_name = name
+
+
+class TestAvatarUrlValidation:
+    """Tests for UserProfile.validate_avatar_url()."""
+
+    @pytest.mark.parametrize("url", [None, "https://example.com/a.png", "http://cdn.example.com/x"])
+    def test_valid_urls(self, profile, url):
+        """Test http(s) URLs and None are accepted."""
+        profile.avatar_url = url
+        assert profile.avatar_url == url
+
+    @pytest.mark.parametrize("url", ["ftp://example.com/a.png", "https://", "https://exa mple.com", "https://example.com\n"])
+    def test_invalid_urls(self, profile, url):
+        """Test non-http or malformed URLs are rejected."""
+        with pytest.raises(ValueError):
+            profile.avatar_url = url
+
+
+class TestDefaults:
+    """Tests for UserProfile column defaults."""
+
+    def test_defaults_are_independent_copies(self):
+        """Test each new profile gets its own copy of the default settings."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            first = UserProfile(username="first", email="first@example.com", display_name="First")
+            second = UserProfile(username="second", email="second@example.com", display_name="Second")
+            session.add_all([first, second])
+            session.flush()
+
+            assert first.preferences == second.preferences
+            assert first.preferences["terminal"]["fontSize"] == 14
+            assert first.keyboard_shortcuts["copy"] == "Ctrl+C"
+            assert first.preferences["terminal"] is not second.preferences["terminal"]
+            assert first.ai_settings is not second.ai_settings
+
+    def test_json_settings_filled_by_database(self):
+        """Test JSON settings come from server defaults and are loaded on insert."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            profile = UserProfile(username="fresh", email="fresh@example.com", display_name="Fresh")
+            assert profile.preferences is None
+
+            session.add(profile)
+            session.flush()
+
+            assert "preferences" in profile.__dict__
+            assert profile.privacy_settings["sessionTracking"] == "minimal"
+            assert profile.extra_metadata == {}
+
+    def test_bulk_insert_is_batched(self):
+        """Test adding many profiles flushes as a single batched INSERT."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        inserts = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def record_insert(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO user_profiles"):
+                inserts.append(statement)
+
+        with Session(engine) as session:
+            session.add_all([
+                UserProfile(username=f"user{i}", email=f"user{i}@example.com", display_name=f"User {i}")
+                for i in range(20)
+            ])
+            session.flush()
+
+        assert len(inserts) == 1
+
+
+class TestThemeInstallation:
+    """Tests for UserProfile.install_theme() and uninstall_theme()."""
+
+    @staticmethod
+    def _theme(theme_id):
+        return ThemeConfiguration(theme_id=theme_id, name=theme_id, author="tester")
+
+    def test_install_and_uninstall(self, profile):
+        """Test themes are installed once and removed by ID."""
+        theme = self._theme("t1")
+
+        assert profile.install_theme(theme)
+        assert not profile.install_theme(self._theme("t1"))
+        assert profile.installed_themes == ["t1"]
+
+        assert profile.uninstall_theme("t1")
+        assert not profile.uninstall_theme("t1")
+        assert profile.installed_themes == []
+
+    def test_set_active_theme_requires_installed(self, profile):
+        """Test only installed themes can be activated."""
+        profile.install_theme(self._theme("t1"))
+        profile.installed_theme_objects.append(self._theme("t2"))
+
+        profile.set_active_theme("t2")
+        assert profile.active_theme_id == "t2"
+        with pytest.raises(ValueError):
+            profile.set_active_theme("t3")
+
+    def test_installed_ids_keep_install_order(self, profile):
+        """Test installed theme IDs are listed in installation order."""
+        for theme_id in ("b", "a", "c"):
+            profile.install_theme(self._theme(theme_id))
+        profile.uninstall_theme("a")
+
+        assert profile.installed_themes == ["b", "c"]
+        assert profile.installed_themes == [t.theme_id for t in profile.installed_theme_objects]
+
+    def test_uninstall_clears_active_theme(self, profile):
+        """Test uninstalling the active theme clears the selection."""
+        profile.install_theme(self._theme("t1"))
+        profile.set_active_theme("t1")
+
+        profile.uninstall_theme("t1")
+
+        assert profile.active_theme_id is None
+
+    def test_index_follows_direct_collection_changes(self, profile):
+        """Test the ID index tracks changes made outside install/uninstall."""
+        profile.install_theme(self._theme("t1"))
+
+        profile.installed_theme_objects.append(self._theme("t2"))
+        backref_theme = self._theme("t3")
+        backref_theme.user_profiles.append(profile)
+        profile.installed_theme_objects.pop(0)
+
+        assert not profile.uninstall_theme("t1")
+        assert profile.uninstall_theme("t2")
+        assert profile.uninstall_theme("t3")
+
+    def test_index_follows_collection_assignment(self, profile):
+        """Test replacing the collection re-indexes its themes."""
+        profile.install_theme(self._theme("t1"))
+
+        profile.installed_theme_objects = [self._theme("t2")]
+
+        assert not profile.uninstall_theme("t1")
+        assert profile.uninstall_theme("t2")
+
+    def test_index_dropped_when_expired(self):
+        """Test expiring a profile discards its index so reloads are re-indexed."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            profile = UserProfile(username="indexed", email="indexed@example.com", display_name="Indexed")
+            profile.install_theme(self._theme("t1"))
+            session.add(profile)
+            session.commit()
+
+            assert "_theme_index" not in profile.__dict__
+            assert profile.uninstall_theme("t1")
+            session.commit()
+            assert profile.installed_themes == []
+
+    def test_unflushed_themes_indexed_after_commit(self):
+        """Test themes installed before their IDs are assigned can be managed after commit."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine, expire_on_commit=False) as session:
+            profile = UserProfile(username="pending", email="pending@example.com", display_name="Pending")
+            first = ThemeConfiguration(name="First", author="tester")
+            second = ThemeConfiguration(name="Second", author="tester")
+
+            assert profile.install_theme(first)
+            assert profile.install_theme(second)
+            assert not profile.install_theme(first)
+            session.add(profile)
+            session.commit()
+
+            assert profile.installed_themes == [first.theme_id, second.theme_id]
+            profile.set_active_theme(second.theme_id)
+            assert profile.uninstall_theme(first.theme_id)
+            assert profile.uninstall_theme(second.theme_id)
+            assert profile.active_theme_id is None
+
+
+class TestInstalledCollectionLoading:
+    """Tests for eager loading of installed themes and extensions."""
+
+    def test_collections_loaded_with_profiles(self):
+        """Test loading profiles batches their installed collections."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            for i in range(3):
+                profile = UserProfile(username=f"user{i}", email=f"user{i}@example.com", display_name="User")
+                profile.install_theme(ThemeConfiguration(theme_id=f"t{i}", name="Theme", author="tester"))
+                session.add(profile)
+            session.commit()
+            session.expunge_all()
+
+            statements = []
+            event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+            profiles = session.scalars(select(UserProfile).order_by(UserProfile.username)).all()
+
+            assert [p.installed_themes for p in profiles] == [["t0"], ["t1"], ["t2"]]
+            assert len(statements) == 3
+
+    def test_profile_query_without_themes(self):
+        """Test profiles can be loaded in one query when their collections are not needed."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            profile = UserProfile(user_id="u1", username="plain", email="plain@example.com", display_name="Plain")
+            profile.install_theme(ThemeConfiguration(theme_id="t1", name="Theme", author="tester"))
+            session.add(profile)
+            session.commit()
+            session.expunge_all()
+
+            statements = []
+            event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+            plain = session.scalars(UserProfile.profile_query(with_themes=False).where(UserProfile.user_id == "u1")).one()
+            assert len(statements) == 1
+            session.expunge_all()
+
+            full = session.scalars(UserProfile.profile_query().where(UserProfile.user_id == "u1")).one()
+            assert len(statements) == 4
+            assert plain.username == "plain"
+            assert full.installed_themes == ["t1"]
+
+    def test_installed_id_queries(self):
+        """Test ID queries read the association tables without loading objects."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            profile = UserProfile(user_id="u1", username="ids", email="ids@example.com", display_name="Ids")
+            profile.install_theme(ThemeConfiguration(theme_id="t1", name="Theme", author="tester"))
+            session.add(profile)
+            session.commit()
+
+            assert session.scalars(UserProfile.installed_theme_ids_query("u1")).all() == ["t1"]
+            assert session.scalars(UserProfile.installed_extension_ids_query("u1")).all() == []
+            assert session.scalars(UserProfile.installed_theme_ids_query("missing")).all() == []
+
+
+class TestUpdatePreference:
+    """Tests for UserProfile.update_preference()."""
+
+    def test_update_persisted(self):
+        """Test updating a nested preference is written on flush."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            profile = UserProfile(user_id="u1", username="prefs", email="prefs@example.com", display_name="Prefs")
+            session.add(profile)
+            session.commit()
+
+            profile.update_preference("terminal", "fontSize", 18)
+            profile.update_preference("editor", "tabSize", 4)
+            session.commit()
+            session.expire_all()
+
+            assert profile.get_preference("terminal", "fontSize") == 18
+            assert profile.get_preference("terminal", "scrollback") == 1000
+            assert profile.get_preference("editor", "tabSize") == 4
+
+    def test_invalid_update_rejected(self, profile):
+        """Test invalid values are rejected without changing preferences."""
+        profile.update_preference("terminal", "fontSize", 12)
+
+        with pytest.raises(ValueError):
+            profile.update_preference("terminal", "fontSize", 100)
+
+        assert profile.get_preference("terminal", "fontSize") == 12
+
+
+class TestTimestamps:
+    """Tests for UserProfile timestamp server defaults."""
+
+    def test_timestamps_generated_by_database(self):
+        """Test creation and login timestamps are fetched during the flush."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            profile = UserProfile(username="clock", email="clock@example.com", display_name="Clock")
+            session.add(profile)
+            session.flush()
+
+            assert isinstance(profile.__dict__["created_at"], datetime)
+            assert isinstance(profile.__dict__["last_login_at"], datetime)
+
+            profile.last_login_at = datetime(2020, 1, 1)
+            session.flush()
+            profile.update_last_login()
+            session.flush()
+
+            assert isinstance(profile.__dict__["last_login_at"], datetime)
+            assert profile.last_login_at.year > 2020
+
+
+class TestStorageUsage:
+    """Tests for the database-computed storage usage percentage."""
+
+    def test_percent_computed_by_database(self):
+        """Test the stored percentage is fetched during each flush."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            profile = UserProfile(
+                username="disk", email="disk@example.com", display_name="Disk", storage_quota=1000
+            )
+            session.add(profile)
+            session.flush()
+
+            assert profile.__dict__["storage_used_pct"] == 0
+
+            profile.increment_storage_used(250)
+            session.flush()
+
+            assert profile.__dict__["storage_used_pct"] == 25
+            assert session.scalar(
+                select(UserProfile.storage_used_pct).where(UserProfile.user_id == profile.user_id)
+            ) == 25
+
+    def test_pending_changes_computed_in_python(self, profile):
+        """Test storage changes not yet flushed invalidate the stored percentage."""
+        profile.storage_quota = 1000
+        profile.storage_used = 100
+        profile.__dict__["storage_used_pct"] = 10.0
+
+        profile.increment_storage_used(150)
+
+        assert "storage_used_pct" not in profile.__dict__
+        assert profile.calculate_storage_usage_percent() == 25.0
+
+
+class TestSerialization:
+    """Tests for UserProfile serializers."""
+
+    @pytest.fixture
+    def stored_profile(self, profile):
+        profile.storage_quota = 1000
+        profile.storage_used = 250
+        profile.created_at = datetime(2025, 1, 1)
+        profile.install_theme(ThemeConfiguration(theme_id="t1", name="Theme", author="tester"))
+        return profile
+
+    def test_to_dict(self, stored_profile):
+        """Test to_dict includes derived storage and installation values."""
+        data = stored_profile.to_dict()
+
+        assert data["installed_themes"] == ["t1"]
+        assert data["created_at"] == "2025-01-01T00:00:00"
+        assert data["last_login_at"] is None
+        assert data["storage_usage_percent"] == 25.0
+        assert data["remaining_storage"] == 750
+        assert "email" not in data
+        assert stored_profile.to_dict(include_sensitive=True)["email"] == "tester@example.com"
+
+    def test_to_dict_after_login(self, stored_profile):
+        """Test a new login timestamp is serialized before the profile is flushed."""
+        stored_profile.update_last_login()
+
+        data = stored_profile.to_dict()
+
+        assert datetime.fromisoformat(data["last_login_at"]) == stored_profile.last_login_at
+        assert stored_profile.get_account_summary().last_login_at == data["last_login_at"]
+
+    def test_account_summary(self, stored_profile):
+        """Test the account summary nests storage and installation counts."""
+        summary = stored_profile.get_account_summary().to_dict()
+
+        assert summary["storage_usage"] == {"used": 250, "quota": 1000, "percent": 25.0, "remaining": 750}
+        assert summary["installed_count"] == {"themes": 1, "extensions": 0}
+
+    def test_account_summary_is_slotted(self, stored_profile):
+        """Test the account summary is an immutable slotted dataclass."""
+        summary = stored_profile.get_account_summary()
+
+        assert isinstance(summary, AccountSummary)
+        assert not hasattr(summary, "__dict__")
+        assert summary.themes_installed == 1
+        with pytest.raises(FrozenInstanceError):
+            summary.storage_used = 0
+
+    def test_export_profile(self, stored_profile):
+        """Test the export includes installed themes and optional sensitive fields."""
+        exported = stored_profile.export_profile(include_sensitive=True)
+
+        assert exported["installed_themes"] == ["t1"]
+        assert exported["created_at"] == "2025-01-01T00:00:00"
+        assert exported["email"] == "tester@example.com"